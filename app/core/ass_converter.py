@@ -0,0 +1,127 @@
+"""
+ASS Converter - Chuyển SRT sang ASS dạng streaming
+- Cue đi thẳng từ parser sang writer, không dựng list trung gian
+- Header (Script Info + Styles) render 1 lần cho mỗi bộ style (cache)
+- Batch: convert nhiều SRT cùng style song song trên process pool
+Module chỉ phụ thuộc parser/writer để process con import nhanh.
+"""
+import os
+import logging
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import lru_cache
+from typing import Iterable, List, NamedTuple, Optional, Tuple
+
+try:
+    from app.core.srt_parser import iter_srt_lines
+    from app.core.subtitle_writer import write_ass
+except ImportError:
+    from core.srt_parser import iter_srt_lines
+    from core.subtitle_writer import write_ass
+
+
+class AssStyle(NamedTuple):
+    """Bộ style của 1 file ASS (hashable -> dùng làm key cache header)"""
+    video_resolution: Tuple[int, int] = (1920, 1080)
+    font_name: str = "Arial"
+    font_size: int = 48
+    font_color: str = "#FFFFFF"
+    margin_v: int = 50
+    shadow: int = 2
+    alignment: int = 2
+
+
+class AssConvertResult(NamedTuple):
+    srt_path: str
+    ass_path: str
+    success: bool
+    count: int
+    error: str
+
+
+def hex_to_ass_color(hex_color):
+    """Convert HEX color (#RRGGBB) to ASS color (&H00BBGGRR)"""
+    hex_color = hex_color.lstrip('#')
+    if len(hex_color) == 6:
+        r, g, b = hex_color[0:2], hex_color[2:4], hex_color[4:6]
+        # ASS uses BGR format
+        return f"&H00{b.upper()}{g.upper()}{r.upper()}"
+    return "&H00FFFFFF"
+
+
+@lru_cache(maxsize=64)
+def render_ass_header(style: AssStyle) -> str:
+    """Header ASS (Script Info + V4+ Styles + Events Format) cho 1 bộ style"""
+    w, h = style.video_resolution
+    ass_color = hex_to_ass_color(style.font_color)
+    return f"""[Script Info]
+Title: Converted by CapCutTool
+ScriptType: v4.00+
+PlayResX: {w}
+PlayResY: {h}
+ScaledBorderAndShadow: no
+
+[V4+ Styles]
+Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, Shadow, Alignment, MarginL, MarginR, MarginV, Encoding
+Style: Default,{style.font_name},{style.font_size},{ass_color},&H000000FF,&H00000000,&HFF000000,0,0,0,0,100,100,0,0,1,2,{style.shadow},{style.alignment},10,10,{style.margin_v},1
+
+[Events]
+Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text
+"""
+
+
+def write_srt_as_ass(srt_path: str, ass_path: str, header: str,
+                     position: Optional[Tuple[int, int]] = None) -> int:
+    """Stream cue từ SRT ra file ASS với header đã render sẵn. Trả về số dialogue."""
+    # Mở SRT trước khi tạo file ASS: file nguồn lỗi thì không để lại output rỗng
+    with open(srt_path, 'r', encoding='utf-8-sig') as f:
+        cues = iter_srt_lines(f)
+        return write_ass(ass_path, header, (cue for cue in cues if cue.text), position=position)
+
+
+def convert_srt_file_to_ass(srt_path: str, ass_path: str, style: AssStyle = AssStyle(),
+                            position: Optional[Tuple[int, int]] = None) -> int:
+    """Convert 1 file SRT -> ASS, trả về số dialogue đã ghi"""
+    return write_srt_as_ass(srt_path, ass_path, render_ass_header(style), position)
+
+
+def _convert_job(srt_path: str, ass_path: str, header: str, position) -> AssConvertResult:
+    try:
+        count = write_srt_as_ass(srt_path, ass_path, header, position)
+        return AssConvertResult(srt_path, ass_path, True, count, "")
+    except Exception as e:
+        return AssConvertResult(srt_path, ass_path, False, 0, str(e))
+
+
+def convert_srt_batch_to_ass(pairs: Iterable[Tuple[str, str]], style: AssStyle = AssStyle(),
+                             position: Optional[Tuple[int, int]] = None,
+                             max_workers: Optional[int] = None) -> List[AssConvertResult]:
+    """
+    Convert nhiều cặp (srt_path, ass_path) cùng 1 style.
+    Header render 1 lần rồi gửi cho các process con. Kết quả giữ thứ tự input.
+    """
+    pairs = list(pairs)
+    header = render_ass_header(style)
+    workers = min(max(1, max_workers or os.cpu_count() or 1), max(1, len(pairs)))
+
+    if workers == 1:
+        results = [_convert_job(srt, ass, header, position) for srt, ass in pairs]
+    else:
+        results: List[Optional[AssConvertResult]] = [None] * len(pairs)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(_convert_job, srt, ass, header, position): i
+                for i, (srt, ass) in enumerate(pairs)
+            }
+            for future in as_completed(futures):
+                i = futures[future]
+                try:
+                    results[i] = future.result()
+                except Exception as e:
+                    srt, ass = pairs[i]
+                    results[i] = AssConvertResult(srt, ass, False, 0, str(e))
+
+    failed = [r for r in results if not r.success]
+    for r in failed:
+        logging.error(f"Lỗi convert ASS {os.path.basename(r.srt_path)}: {r.error}")
+    logging.info(f"Convert ASS: {len(results) - len(failed)}/{len(results)} file thành công")
+    return results
@@ -0,0 +1,189 @@
+"""
+Audio Backup - Giữ bản gốc trước khi trim với chi phí IO thấp nhất
+- reflink: clone copy-on-write (Btrfs/XFS/...), không chép dữ liệu
+- hardlink: thêm 1 tên cho cùng inode (cùng ổ đĩa), không chép dữ liệu
+- copy: shutil.copy2 như cũ
+- archive: 1 file zip (không nén) thay cho cả nghìn file nhỏ
+- none: không backup
+"auto": reflink nếu được, không thì hardlink cho file sẽ ghi lại thành inode mới
+và copy cho file sẽ bị sửa tại chỗ.
+
+Trim bằng ffmpeg ghi file mới rồi rename (inode mới) -> bản hardlink không bị đụng.
+Trim native sửa header tại chỗ -> gọi break_hardlink() trước khi ghi.
+"""
+import os
+import shutil
+import logging
+import threading
+import zipfile
+from typing import Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+BACKUP_STRATEGIES = ("none", "hardlink", "reflink", "copy", "archive")
+
+# ioctl FICLONE của Linux (_IOW(0x94, 9, int))
+_FICLONE = 0x40049409
+
+
+def reflink_file(src: str, dst: str):
+    """Clone copy-on-write src -> dst; OSError nếu hệ điều hành / filesystem không hỗ trợ"""
+    if fcntl is None or not hasattr(fcntl, "ioctl"):
+        raise OSError("reflink không hỗ trợ trên hệ điều hành này")
+    try:
+        with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+            fcntl.ioctl(fdst.fileno(), _FICLONE, fsrc.fileno())
+        shutil.copystat(src, dst)
+    except OSError:
+        try:
+            os.remove(dst)
+        except OSError:
+            pass
+        raise
+
+
+def _remove_existing(path: str):
+    # os.link / reflink không ghi đè file đã có (chạy trim lần 2)
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def break_hardlink(path: str) -> bool:
+    """
+    Nếu file có nhiều hơn 1 tên (st_nlink > 1, vd. bản backup hardlink),
+    tách ra inode riêng để sửa tại chỗ không ảnh hưởng bản còn lại.
+    Trả về True nếu đã tách.
+    """
+    try:
+        if os.stat(path).st_nlink <= 1:
+            return False
+    except OSError:
+        return False
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.unlink"
+    try:
+        try:
+            reflink_file(path, tmp_path)
+        except OSError:
+            shutil.copy2(path, tmp_path)
+        os.replace(tmp_path, path)
+        return True
+    except OSError:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+class AudioBackup:
+    """
+    Backup từng file vào backup_dir (an toàn khi gọi từ nhiều thread).
+    strategy: "auto" hoặc 1 giá trị trong BACKUP_STRATEGIES.
+    archive: ghi vào f"{backup_dir}.zip"; gọi close() (hoặc dùng with) khi xong.
+
+    "auto" chọn theo từng file: reflink nếu filesystem hỗ trợ; không thì hardlink
+    cho file sẽ được ghi lại thành inode mới (trim ffmpeg), copy cho file sẽ bị sửa tại chỗ
+    (trim native WAV: hardlink sẽ phải tách bằng 1 lần copy đầy đủ, không tiết kiệm gì).
+    """
+
+    def __init__(self, backup_dir: str, strategy: str = "auto"):
+        if strategy != "auto" and strategy not in BACKUP_STRATEGIES:
+            raise ValueError(f"Backup strategy không hợp lệ: {strategy}")
+        self.backup_dir = os.path.normpath(backup_dir)
+        self.strategy = strategy
+        self.archive_path: Optional[str] = None
+        self._archive: Optional[zipfile.ZipFile] = None
+        self._lock = threading.Lock()
+        # auto: kết quả thử reflink / hardlink (None = chưa thử)
+        self._supported = {"reflink": None, "hardlink": None}
+        self.counts = {}
+
+        if strategy == "archive":
+            self.archive_path = f"{self.backup_dir}.zip"
+            self._archive = zipfile.ZipFile(self.archive_path, "w", zipfile.ZIP_STORED, allowZip64=True)
+        elif strategy != "none":
+            os.makedirs(self.backup_dir, exist_ok=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def location(self) -> Optional[str]:
+        if self.strategy == "none":
+            return None
+        return self.archive_path or self.backup_dir
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts.values())
+
+    def summary(self) -> str:
+        return ", ".join(f"{name} {n}" for name, n in sorted(self.counts.items())) or "0"
+
+    def _backup_with(self, strategy: str, src: str, dst: str):
+        if strategy == "reflink":
+            _remove_existing(dst)
+            reflink_file(src, dst)
+        elif strategy == "hardlink":
+            _remove_existing(dst)
+            os.link(src, dst)
+        elif strategy == "copy":
+            # Bản cũ có thể là hardlink tới chính src (lần chạy trước) -> copy2 sẽ báo SameFileError
+            _remove_existing(dst)
+            shutil.copy2(src, dst)
+        elif strategy == "archive":
+            with self._lock:
+                self._archive.write(src, os.path.basename(src))
+
+    def _try_cheap(self, strategy: str, src: str, dst: str) -> bool:
+        """Thử reflink / hardlink; lần thất bại đầu tiên tắt cách đó cho cả thư mục"""
+        if self._supported[strategy] is False:
+            return False
+        try:
+            self._backup_with(strategy, src, dst)
+        except OSError as e:
+            with self._lock:
+                if self._supported[strategy] is None:
+                    logging.debug(f"Backup {strategy} không dùng được: {e}")
+                self._supported[strategy] = False
+            return False
+        self._supported[strategy] = True
+        return True
+
+    def _backup_auto(self, path: str, dst: str, in_place: bool) -> str:
+        if self._try_cheap("reflink", path, dst):
+            return "reflink"
+        if not in_place and self._try_cheap("hardlink", path, dst):
+            return "hardlink"
+        self._backup_with("copy", path, dst)
+        return "copy"
+
+    def backup(self, path: str, in_place: bool = False):
+        """
+        Backup 1 file (OSError nếu lỗi -> caller không nên trim file đó).
+        in_place: file sẽ bị sửa tại chỗ sau đó (ảnh hưởng lựa chọn của "auto").
+        """
+        if self.strategy == "none":
+            return
+        dst = os.path.join(self.backup_dir, os.path.basename(path))
+        if self.strategy == "auto":
+            used = self._backup_auto(path, dst, in_place)
+        else:
+            self._backup_with(self.strategy, path, dst)
+            used = self.strategy
+        with self._lock:
+            self.counts[used] = self.counts.get(used, 0) + 1
+
+    def close(self):
+        with self._lock:
+            if self._archive is not None:
+                self._archive.close()
+                self._archive = None
@@ -0,0 +1,57 @@
+"""
+Audio Codecs - Tham số encoder ffmpeg theo đuôi file output
+Dùng chung cho mọi bước ghi output cuối (mixer, engine ffmpeg, copy 1 file)
+để output nén chỉ qua đúng 1 lần encode.
+"""
+import os
+from typing import List
+
+# Đuôi file -> tham số encoder ffmpeg
+ENCODERS = {
+    "wav": ['-c:a', 'pcm_s16le'],
+    "mp3": ['-c:a', 'libmp3lame', '-b:a', '192k'],
+    "m4a": ['-c:a', 'aac', '-b:a', '192k', '-movflags', '+faststart'],
+    "aac": ['-c:a', 'aac', '-b:a', '192k'],
+    # libopus chỉ nhận 48/24/16/12/8 kHz -> luôn resample 48 kHz
+    "opus": ['-c:a', 'libopus', '-b:a', '128k', '-ar', '48000'],
+    "ogg": ['-c:a', 'libopus', '-b:a', '128k', '-ar', '48000'],
+}
+
+# Định dạng lạ: giữ hành vi cũ (MP3)
+DEFAULT_ENCODER = ENCODERS["mp3"]
+
+# Chi phí encode tương đối cho mỗi giây output (MP3 = 1.0, WAV không encode)
+ENCODE_WEIGHTS = {
+    "wav": 0.0,
+    "mp3": 1.0,
+    "m4a": 0.8,
+    "aac": 0.8,
+    "opus": 1.3,    # Gồm cả resample 48 kHz
+    "ogg": 1.3,
+}
+
+
+def output_extension(output_path: str) -> str:
+    return os.path.splitext(output_path)[1].lower().lstrip('.')
+
+
+def is_pcm_output(output_path: str) -> bool:
+    """Output WAV PCM: ghi thẳng, không cần encoder"""
+    return output_extension(output_path) == "wav"
+
+
+def encoder_args(output_path: str) -> List[str]:
+    """Tham số codec ffmpeg cho file output"""
+    return list(ENCODERS.get(output_extension(output_path), DEFAULT_ENCODER))
+
+
+def encode_weight(codec: str) -> float:
+    """Hệ số chi phí encode của đuôi file (định dạng lạ encode như MP3)"""
+    return ENCODE_WEIGHTS.get(codec, ENCODE_WEIGHTS["mp3"])
+
+
+def copy_or_encode_args(input_path: str, output_path: str) -> List[str]:
+    """Cùng định dạng thì copy stream (không encode lại), khác thì encode 1 lần"""
+    if output_extension(input_path) == output_extension(output_path):
+        return ['-c', 'copy']
+    return encoder_args(output_path)
@@ -0,0 +1,173 @@
+"""
+Audio Folder Cache - Cache bền vững (file sidecar trong thư mục audio)
+Mỗi entry gắn với (tên file, size, mtime_ns): file bị ghi lại (trim, tạo lại TTS)
+thì entry tự hết hạn; các hàm sửa file tại chỗ gọi invalidate() cho chắc.
+
+- FolderStatCache: lớp cơ sở (load lười, ghi nguyên tử, 1 instance / thư mục)
+- DurationCache: thời lượng + định dạng mẫu của từng file audio
+- SilenceCache: kết quả phân tích khoảng lặng / mức âm lượng (silence_analysis)
+"""
+import os
+import json
+import atexit
+import logging
+import threading
+from typing import Dict, Optional
+
+
+class FolderStatCache:
+    """
+    Cache {tên file: value} lưu trong FILE_NAME ở cùng thư mục.
+    Lớp con đặt FILE_NAME / VERSION; value là dict JSON.
+    """
+    FILE_NAME = ".folder_cache.json"
+    VERSION = 1
+
+    _instances: Dict[tuple, "FolderStatCache"] = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, folder: str):
+        self.folder = os.path.abspath(folder)
+        self.path = os.path.join(self.folder, self.FILE_NAME)
+        self._entries: Optional[Dict[str, dict]] = None
+        self._dirty = False
+        self._lock = threading.RLock()
+
+    @classmethod
+    def for_folder(cls, folder: str) -> "FolderStatCache":
+        """Instance dùng chung cho 1 thư mục (mọi caller thấy cùng dữ liệu)"""
+        key = (cls, os.path.normcase(os.path.abspath(folder)))
+        with cls._instances_lock:
+            cache = cls._instances.get(key)
+            if cache is None:
+                cache = cls._instances[key] = cls(folder)
+            return cache
+
+    @classmethod
+    def for_file(cls, file_path: str) -> "FolderStatCache":
+        return cls.for_folder(os.path.dirname(os.path.abspath(file_path)))
+
+    @classmethod
+    def save_all(cls):
+        """Ghi mọi cache đã đổi (cuối 1 thao tác hàng loạt, và khi thoát chương trình)"""
+        with FolderStatCache._instances_lock:
+            caches = [c for (kind, _), c in FolderStatCache._instances.items() if issubclass(kind, cls)]
+        for cache in caches:
+            cache.save()
+
+    # ------------------------------------------------------------------ IO
+    def _load(self) -> Dict[str, dict]:
+        if self._entries is None:
+            entries = {}
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                if data.get("version") == self.VERSION:
+                    entries = data.get("entries", {})
+            except (OSError, ValueError, AttributeError):
+                pass
+            self._entries = entries
+        return self._entries
+
+    def save(self) -> bool:
+        """
+        Ghi sidecar nếu có thay đổi (ghi file tạm rồi replace).
+        Tra cứu từng file không tự gọi save(): thao tác hàng loạt ghi 1 lần ở cuối.
+        """
+        with self._lock:
+            if not self._dirty or self._entries is None:
+                return True
+            tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            try:
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump({"version": self.VERSION, "entries": self._entries},
+                              f, ensure_ascii=False, separators=(",", ":"))
+                os.replace(tmp_path, self.path)
+                self._dirty = False
+                return True
+            except OSError as e:
+                # Thư mục chỉ đọc: vẫn dùng cache trong RAM
+                logging.debug(f"Không ghi được cache {self.path}: {e}")
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+                return False
+
+    # ------------------------------------------------------------------ API
+    @staticmethod
+    def _stat(file_path: str):
+        try:
+            return os.stat(file_path)
+        except OSError:
+            return None
+
+    def get(self, file_path: str, st=None) -> Optional[dict]:
+        """Value đã lưu nếu file chưa đổi (size + mtime_ns khớp), ngược lại None"""
+        st = st or self._stat(file_path)
+        if st is None:
+            return None
+        with self._lock:
+            entry = self._load().get(os.path.basename(file_path))
+        if entry and entry.get("size") == st.st_size and entry.get("mtime_ns") == st.st_mtime_ns:
+            return entry.get("value")
+        return None
+
+    def put(self, file_path: str, value: dict, st=None):
+        """Lưu value cho trạng thái hiện tại của file (chưa ghi đĩa tới khi save())"""
+        st = st or self._stat(file_path)
+        if st is None:
+            return
+        with self._lock:
+            self._load()[os.path.basename(file_path)] = {
+                "size": st.st_size, "mtime_ns": st.st_mtime_ns, "value": value,
+            }
+            self._dirty = True
+
+    def invalidate(self, file_path: str):
+        with self._lock:
+            if self._load().pop(os.path.basename(file_path), None) is not None:
+                self._dirty = True
+
+    def clear(self):
+        with self._lock:
+            self._entries = {}
+            self._dirty = True
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._load())
+
+
+# Tra cứu lẻ (get_duration_ms...) chỉ đổi cache trong RAM -> ghi nốt khi thoát
+atexit.register(FolderStatCache.save_all)
+
+
+class DurationCache(FolderStatCache):
+    """
+    Thời lượng audio theo file.
+    value: {"duration_ms", "codec", "sample_rate", "channels", "sample_width"}
+    (3 trường cuối chỉ có với WAV PCM đọc được header, còn lại là None)
+    """
+    FILE_NAME = ".audio_durations.json"
+    VERSION = 1
+
+    def get_duration_ms(self, file_path: str) -> Optional[int]:
+        value = self.get(file_path)
+        return value.get("duration_ms") if value else None
+
+
+class SilenceCache(FolderStatCache):
+    """
+    Phân tích khoảng lặng theo file (xem silence_analysis.SilenceInfo).
+    value: {"threshold_db", "duration_ms", "leading_ms", "trailing_ms", "gaps", "peak_db", "rms_db"}
+    Entry phân tích với ngưỡng khác coi như chưa có.
+    """
+    FILE_NAME = ".audio_silence.json"
+    VERSION = 1
+
+    def get_analysis(self, file_path: str, threshold_db: float, st=None) -> Optional[dict]:
+        value = self.get(file_path, st)
+        if value and value.get("threshold_db") == threshold_db:
+            return value
+        return None
@@ -0,0 +1,578 @@
+"""
+Audio Mixer - Ghép audio theo timeline ngay trong process bằng NumPy
+- Mỗi đoạn được đọc PCM int16 rồi cộng vào bộ tích luỹ int32 tại đúng vị trí sample
+- Kẹp (saturate) về int16 đúng 1 lần ở cuối, ghi ra 1 file output duy nhất
+- WAV PCM 16-bit cùng định dạng: đọc thẳng từ file. File khác (MP3, khác sample rate):
+  decode qua ffmpeg ra PCM thô.
+- Output .wav ghi trực tiếp, định dạng nén (MP3, AAC/M4A, Opus) encode đúng 1 lần
+  qua stdin của ffmpeg, không có file trung gian
+- Timeline không có đoạn chồng nhau: nối PCM + khoảng lặng theo thứ tự, O(n), không cần mix
+- Timeline dài (low_memory): mix theo từng cửa sổ cố định, thẳng vào file WAV qua np.memmap
+  (chỉ chạm các trang có đoạn audio) hoặc đẩy tuần tự vào encoder -> RAM gần như không đổi
+Tương đương adelay + amix (normalize=0) của bản ffmpeg.
+"""
+import os
+import shutil
+import logging
+import tempfile
+import subprocess
+from abc import ABC, abstractmethod
+from collections import Counter
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+try:
+    from app.core.wav_io import read_wav_info, write_wav_header, wav_header_bytes, WAV_HEADER_SIZE
+except ImportError:
+    from core.wav_io import read_wav_info, write_wav_header, wav_header_bytes, WAV_HEADER_SIZE
+
+try:
+    from app.core.ffmpeg_runner import StageProgress
+    from app.core.audio_codecs import encoder_args, is_pcm_output
+    from app.core.audio_probe import get_audio_records
+except ImportError:
+    from core.ffmpeg_runner import StageProgress
+    from core.audio_codecs import encoder_args, is_pcm_output
+    from core.audio_probe import get_audio_records
+
+try:
+    from app.core.ffmpeg_helper import FFMPEG_PATH
+except ImportError:
+    try:
+        from core.ffmpeg_helper import FFMPEG_PATH
+    except ImportError:
+        FFMPEG_PATH = 'ffmpeg'
+
+INT16_MIN = -32768
+INT16_MAX = 32767
+
+# Số frame xử lý mỗi lần khi kẹp / ghi output (giới hạn bộ nhớ tạm)
+WRITE_CHUNK_FRAMES = 1 << 20
+
+# Cửa sổ mix khi dùng memmap (~22s ở 48kHz)
+MEMMAP_WINDOW_FRAMES = 1 << 20
+
+# Bộ tích luỹ int32 lớn hơn mức này thì tự chuyển sang memmap
+MEMMAP_THRESHOLD_BYTES = 256 * 1024 * 1024
+
+
+class PcmFormat(NamedTuple):
+    sample_rate: int
+    channels: int
+
+
+# Edge TTS xuất 24kHz mono
+DEFAULT_FORMAT = PcmFormat(24000, 1)
+
+
+def ms_to_frames(ms: int, sample_rate: int) -> int:
+    return int(ms) * sample_rate // 1000
+
+
+# ============================================================================
+# NGUỒN PCM CHO TỪNG ĐOẠN
+# ============================================================================
+
+def _convert_channels(pcm: np.ndarray, channels: int) -> np.ndarray:
+    """Đổi số kênh: mono -> nhân bản, nhiều kênh -> mono lấy trung bình"""
+    src = pcm.shape[1]
+    if src == channels:
+        return pcm
+    if src == 1:
+        return np.repeat(pcm, channels, axis=1)
+    if channels == 1:
+        return pcm.mean(axis=1, dtype=np.int32).astype(np.int16).reshape(-1, 1)
+    return _convert_channels(_convert_channels(pcm, 1), channels)
+
+
+def decode_with_ffmpeg(path: str, fmt: PcmFormat) -> np.ndarray:
+    """Decode file audio bất kỳ ra PCM int16 (frames, channels) đúng định dạng fmt"""
+    cmd = [FFMPEG_PATH, '-v', 'error', '-i', path,
+           '-f', 's16le', '-acodec', 'pcm_s16le',
+           '-ar', str(fmt.sample_rate), '-ac', str(fmt.channels), 'pipe:1']
+    result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
+    return np.frombuffer(result.stdout, dtype='<i2').reshape(-1, fmt.channels)
+
+
+class SegmentSource(ABC):
+    """1 đoạn audio đặt tại start_frame trên timeline, đọc PCM theo vùng"""
+
+    def __init__(self, path: str, start_frame: int, frames: int, channels: int):
+        self.path = path
+        self.start_frame = start_frame
+        self.frames = frames
+        self.channels = channels
+
+    @property
+    def end_frame(self) -> int:
+        return self.start_frame + self.frames
+
+    @abstractmethod
+    def read(self, offset: int = 0, count: Optional[int] = None) -> np.ndarray:
+        """PCM int16 (count, channels) bắt đầu từ frame offset của đoạn"""
+
+
+class WavSegment(SegmentSource):
+    """WAV PCM 16-bit cùng sample rate: đọc thẳng vùng cần từ file (không giữ trong RAM)"""
+
+    def __init__(self, path: str, start_frame: int, info, channels: int):
+        super().__init__(path, start_frame, info.frames, channels)
+        self.info = info
+
+    def read(self, offset: int = 0, count: Optional[int] = None) -> np.ndarray:
+        offset = max(0, min(offset, self.frames))
+        count = self.frames - offset if count is None else max(0, min(count, self.frames - offset))
+        src_channels = self.info.channels
+        with open(self.path, 'rb') as f:
+            f.seek(self.info.data_offset + offset * self.info.block_align)
+            pcm = np.fromfile(f, dtype='<i2', count=count * src_channels)
+        pcm = pcm[:len(pcm) - len(pcm) % src_channels].reshape(-1, src_channels)
+        return _convert_channels(pcm, self.channels)
+
+
+class DecodedSegment(SegmentSource):
+    """Đoạn đã decode sẵn (MP3, WAV khác sample rate...)"""
+
+    def __init__(self, path: str, start_frame: int, pcm: np.ndarray):
+        super().__init__(path, start_frame, len(pcm), pcm.shape[1])
+        self.pcm = pcm
+
+    def read(self, offset: int = 0, count: Optional[int] = None) -> np.ndarray:
+        end = self.frames if count is None else min(self.frames, offset + count)
+        return self.pcm[offset:end]
+
+
+def decode_to_wav(path: str, fmt: PcmFormat, output_wav: str):
+    """Decode file audio bất kỳ ra WAV PCM 16-bit đúng định dạng fmt (trên đĩa)"""
+    cmd = [FFMPEG_PATH, '-y', '-v', 'error', '-i', path, '-acodec', 'pcm_s16le',
+           '-ar', str(fmt.sample_rate), '-ac', str(fmt.channels), output_wav]
+    subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, check=True)
+
+
+def open_segment(path: str, start_ms: int, fmt: PcmFormat, spill_dir: Optional[str] = None) -> SegmentSource:
+    """
+    Tạo SegmentSource: WAV cùng định dạng đọc native, còn lại decode qua ffmpeg.
+    spill_dir: decode ra WAV tạm trong thư mục này thay vì giữ PCM trong RAM.
+    """
+    start_frame = ms_to_frames(start_ms, fmt.sample_rate)
+    info = read_wav_info(path)
+    if info is not None and info.is_pcm16 and info.sample_rate == fmt.sample_rate:
+        return WavSegment(path, start_frame, info, fmt.channels)
+    if spill_dir is None:
+        return DecodedSegment(path, start_frame, decode_with_ffmpeg(path, fmt))
+
+    fd, spill_path = tempfile.mkstemp(suffix=".wav", dir=spill_dir)
+    os.close(fd)
+    decode_to_wav(path, fmt, spill_path)
+    return WavSegment(spill_path, start_frame, read_wav_info(spill_path), fmt.channels)
+
+
+def spill_segment(segment: SegmentSource, spill_dir: str, fmt: PcmFormat) -> SegmentSource:
+    """Ghi PCM của DecodedSegment ra WAV tạm và trả về WavSegment (giải phóng RAM)"""
+    if not isinstance(segment, DecodedSegment):
+        return segment
+    fd, spill_path = tempfile.mkstemp(suffix=".wav", dir=spill_dir)
+    with os.fdopen(fd, 'wb') as f:
+        f.write(wav_header_bytes(fmt.sample_rate, fmt.channels, segment.frames))
+        f.write(np.ascontiguousarray(segment.pcm, dtype='<i2').tobytes())
+    return WavSegment(spill_path, segment.start_frame, read_wav_info(spill_path), fmt.channels)
+
+
+def choose_format(paths: Sequence[str]) -> PcmFormat:
+    """Định dạng output = định dạng WAV PCM 16-bit phổ biến nhất trong các input"""
+    counts = Counter()
+    for path in paths:
+        info = read_wav_info(path)
+        if info is not None and info.is_pcm16:
+            counts[PcmFormat(info.sample_rate, info.channels)] += 1
+    return counts.most_common(1)[0][0] if counts else DEFAULT_FORMAT
+
+
+def open_segments(timeline: Sequence[Tuple[str, int]], fmt: PcmFormat,
+                  stop_event=None, spill_dir: Optional[str] = None) -> Optional[List[SegmentSource]]:
+    """Mở toàn bộ đoạn của timeline [(path, start_ms)], None nếu bị dừng"""
+    segments = []
+    for path, start_ms in timeline:
+        if stop_event and stop_event.is_set():
+            return None
+        segments.append(open_segment(path, start_ms, fmt, spill_dir))
+    return segments
+
+
+# ============================================================================
+# GHI OUTPUT
+# ============================================================================
+
+class PcmWriter:
+    """
+    Ghi PCM int16 ra file output:
+    - .wav: ghi thẳng, cập nhật header khi đóng
+    - định dạng khác: đẩy PCM vào stdin của 1 tiến trình ffmpeg encode
+    """
+
+    def __init__(self, output_path: str, fmt: PcmFormat):
+        self.output_path = output_path
+        self.fmt = fmt
+        self.frames = 0
+        self._file = None
+        self._proc = None
+        if is_pcm_output(output_path):
+            self._file = open(output_path, 'wb')
+            self._file.write(b'\0' * WAV_HEADER_SIZE)
+        else:
+            cmd = [FFMPEG_PATH, '-y', '-v', 'error',
+                   '-f', 's16le', '-ar', str(fmt.sample_rate), '-ac', str(fmt.channels), '-i', 'pipe:0',
+                   *encoder_args(output_path), output_path]
+            self._proc = subprocess.Popen(cmd, stdin=subprocess.PIPE,
+                                          stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+            self._file = self._proc.stdin
+
+    def write(self, pcm: np.ndarray):
+        self._file.write(np.ascontiguousarray(pcm, dtype='<i2').tobytes())
+        self.frames += len(pcm)
+
+    def write_silence(self, frames: int):
+        block = np.zeros((min(frames, WRITE_CHUNK_FRAMES), self.fmt.channels), dtype='<i2')
+        while frames > 0:
+            n = min(frames, len(block))
+            self.write(block[:n])
+            frames -= n
+
+    def close(self):
+        if self._proc is None:
+            write_wav_header(self._file, self.fmt.sample_rate, self.fmt.channels, self.frames)
+            self._file.close()
+            return
+        self._file.close()
+        stderr = self._proc.stderr.read()
+        if self._proc.wait() != 0:
+            raise RuntimeError(f"ffmpeg encode lỗi: {stderr.decode('utf-8', errors='replace').strip()}")
+
+    def abort(self):
+        """Huỷ ghi (bị dừng / lỗi): đóng và xoá output dở dang"""
+        try:
+            if self._proc is not None:
+                self._proc.kill()
+                self._proc.wait()
+            self._file.close()
+        except Exception:
+            pass
+        if os.path.exists(self.output_path):
+            try:
+                os.remove(self.output_path)
+            except OSError:
+                pass
+
+
+def saturate_to_int16(acc: np.ndarray) -> np.ndarray:
+    return np.clip(acc, INT16_MIN, INT16_MAX).astype('<i2')
+
+
+# ============================================================================
+# MIX TRONG RAM
+# ============================================================================
+
+def mix_segments(segments: Sequence[SegmentSource], channels: int, stop_event=None,
+                 on_progress=None) -> Optional[np.ndarray]:
+    """
+    Cộng mọi đoạn vào bộ tích luỹ int32 (total_frames, channels), None nếu bị dừng.
+    on_progress(frame): vị trí đã xử lý trên timeline.
+    """
+    total_frames = max((s.end_frame for s in segments), default=0)
+    acc = np.zeros((total_frames, channels), dtype=np.int32)
+    for seg in sorted(segments, key=lambda s: s.start_frame):
+        if stop_event and stop_event.is_set():
+            return None
+        pcm = seg.read()
+        acc[seg.start_frame:seg.start_frame + len(pcm)] += pcm
+        if on_progress:
+            on_progress(seg.start_frame + len(pcm))
+    return acc
+
+
+# ============================================================================
+# NỐI TUẦN TỰ (KHÔNG CHỒNG NHAU)
+# ============================================================================
+
+def count_overlaps(segments: Sequence[SegmentSource]) -> int:
+    """Số đoạn bắt đầu trước khi đoạn trước đó (theo start) kết thúc"""
+    overlaps = 0
+    last_end = None
+    for seg in sorted(segments, key=lambda s: s.start_frame):
+        if seg.frames == 0:
+            continue
+        if last_end is not None and seg.start_frame < last_end:
+            overlaps += 1
+        last_end = seg.end_frame if last_end is None else max(last_end, seg.end_frame)
+    return overlaps
+
+
+def concat_segments(segments: Sequence[SegmentSource], writer: "PcmWriter", stop_event=None,
+                    on_progress=None) -> bool:
+    """
+    Ghi các đoạn KHÔNG chồng nhau theo thứ tự: khoảng lặng tới start rồi PCM của đoạn.
+    Mỗi lần chỉ giữ PCM của 1 đoạn trong RAM. False nếu bị dừng.
+    """
+    for seg in sorted(segments, key=lambda s: s.start_frame):
+        if stop_event and stop_event.is_set():
+            return False
+        if seg.frames == 0:
+            continue
+        writer.write_silence(seg.start_frame - writer.frames)
+        writer.write(seg.read())
+        if on_progress:
+            on_progress(writer.frames)
+    return True
+
+
+# ============================================================================
+# MIX VÀO FILE QUA MEMMAP (TIMELINE DÀI)
+# ============================================================================
+
+def _create_wav_file(path: str, fmt: PcmFormat, frames: int):
+    """Tạo file WAV đủ kích thước (phần PCM là vùng trống / sparse, toàn số 0)"""
+    with open(path, 'wb') as f:
+        write_wav_header(f, fmt.sample_rate, fmt.channels, frames)
+        f.truncate(WAV_HEADER_SIZE + frames * fmt.channels * 2)
+
+
+def _iter_mix_windows(segments: Sequence[SegmentSource], channels: int, window_frames: int):
+    """
+    Duyệt timeline theo cửa sổ window_frames (theo thứ tự thời gian).
+    Yield (w_start, lo, hi, acc): acc int32 của vùng [lo, hi) có audio trong cửa sổ,
+    acc = None nếu cửa sổ không có đoạn nào.
+    """
+    total_frames = max((s.end_frame for s in segments), default=0)
+    ordered = sorted(segments, key=lambda s: s.start_frame)
+    next_idx = 0
+    active: List[SegmentSource] = []
+
+    for w_start in range(0, total_frames, window_frames):
+        w_end = min(w_start + window_frames, total_frames)
+
+        active = [s for s in active if s.end_frame > w_start]
+        while next_idx < len(ordered) and ordered[next_idx].start_frame < w_end:
+            if ordered[next_idx].end_frame > w_start:
+                active.append(ordered[next_idx])
+            next_idx += 1
+        if not active:
+            yield w_start, w_start, w_end, None
+            continue
+
+        lo = max(w_start, min(s.start_frame for s in active))
+        hi = min(w_end, max(s.end_frame for s in active))
+        acc = np.zeros((hi - lo, channels), dtype=np.int32)
+        for seg in active:
+            a = max(lo, seg.start_frame)
+            b = min(hi, seg.end_frame)
+            if b <= a:
+                continue
+            pcm = seg.read(a - seg.start_frame, b - a)
+            acc[a - lo:a - lo + len(pcm)] += pcm
+        yield w_start, lo, hi, acc
+
+
+def mix_segments_to_wav_memmap(segments: Sequence[SegmentSource], wav_path: str, fmt: PcmFormat,
+                               window_frames: int = MEMMAP_WINDOW_FRAMES, stop_event=None,
+                               on_progress=None) -> bool:
+    """
+    Mix các đoạn thẳng vào file WAV theo từng cửa sổ window_frames.
+    Mỗi cửa sổ chỉ map vùng [đầu đoạn sớm nhất, cuối đoạn muộn nhất] trong cửa sổ,
+    cửa sổ không có đoạn nào thì bỏ qua (file đã là 0). False nếu bị dừng.
+    """
+    total_frames = max((s.end_frame for s in segments), default=0)
+    _create_wav_file(wav_path, fmt, total_frames)
+
+    for w_start, lo, hi, acc in _iter_mix_windows(segments, fmt.channels, window_frames):
+        if stop_event and stop_event.is_set():
+            return False
+        if on_progress:
+            on_progress(w_start)
+        if acc is None:
+            continue
+
+        # Map riêng vùng của cửa sổ rồi unmap ngay -> trang đã ghi không tích tụ trong RSS
+        view = np.memmap(wav_path, dtype='<i2', mode='r+',
+                         offset=WAV_HEADER_SIZE + lo * fmt.channels * 2, shape=(hi - lo, fmt.channels))
+        view[:] = saturate_to_int16(acc)
+        view.flush()
+        del view
+    if on_progress:
+        on_progress(total_frames)
+    return True
+
+
+def mix_segments_streaming(segments: Sequence[SegmentSource], writer: "PcmWriter",
+                           window_frames: int = MEMMAP_WINDOW_FRAMES, stop_event=None,
+                           on_progress=None) -> bool:
+    """
+    Mix theo cửa sổ và ghi tuần tự vào writer (vd. stdin của encoder):
+    không cần WAV trung gian, RAM chỉ bằng 1 cửa sổ. False nếu bị dừng.
+    """
+    for w_start, lo, hi, acc in _iter_mix_windows(segments, writer.fmt.channels, window_frames):
+        if stop_event and stop_event.is_set():
+            return False
+        if on_progress:
+            on_progress(w_start)
+        if acc is None:
+            continue
+        writer.write_silence(lo - writer.frames)
+        writer.write(saturate_to_int16(acc))
+    if on_progress:
+        on_progress(writer.frames)
+    return True
+
+
+def _estimated_accumulator_bytes(segments: Sequence[SegmentSource], channels: int) -> int:
+    total_frames = max((s.end_frame for s in segments), default=0)
+    return total_frames * channels * 4
+
+
+def estimate_timeline_memory(timeline: Sequence[Tuple[str, int]], fmt: PcmFormat) -> Tuple[int, int]:
+    """
+    Ước lượng RAM trước khi mở đoạn nào (cache thời lượng / header WAV / ffprobe, không decode):
+    (byte bộ tích luỹ int32, byte PCM phải decode giữ trong RAM). File không đo được thì bỏ qua.
+    """
+    records = get_audio_records(path for path, _ in timeline)
+    end_ms = 0
+    decoded_ms = 0
+    for path, start_ms in timeline:
+        record = records.get(path)
+        if record is None:
+            continue
+        end_ms = max(end_ms, start_ms + record["duration_ms"])
+        # Chỉ WAV PCM16 cùng sample rate được đọc thẳng từ file (xem open_segment)
+        if record.get("sample_width") != 2 or record.get("sample_rate") != fmt.sample_rate:
+            decoded_ms += record["duration_ms"]
+    acc_bytes = ms_to_frames(end_ms, fmt.sample_rate) * fmt.channels * 4
+    decoded_bytes = ms_to_frames(decoded_ms, fmt.sample_rate) * fmt.channels * 2
+    return acc_bytes, decoded_bytes
+
+
+def _remove_files(paths):
+    for path in paths:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def _mix_low_memory(segments, output_path: str, fmt: PcmFormat, stop_event=None, on_progress=None) -> bool:
+    """
+    Mix theo cửa sổ: output .wav mix thẳng vào file qua memmap,
+    định dạng nén thì đẩy từng cửa sổ vào stdin của encoder (encode đúng 1 lần, không file tạm)
+    """
+    if is_pcm_output(output_path):
+        try:
+            if not mix_segments_to_wav_memmap(segments, output_path, fmt, stop_event=stop_event,
+                                              on_progress=on_progress):
+                _remove_files([output_path])
+                return False
+            return True
+        except Exception:
+            _remove_files([output_path])
+            raise
+
+    writer = PcmWriter(output_path, fmt)
+    try:
+        if not mix_segments_streaming(segments, writer, stop_event=stop_event, on_progress=on_progress):
+            writer.abort()
+            return False
+        writer.close()
+        return True
+    except Exception:
+        writer.abort()
+        raise
+
+
+def mix_timeline_to_file(timeline: Sequence[Tuple[str, int]], output_path: str, stop_event=None,
+                         low_memory: Optional[bool] = None, allow_concat: bool = True,
+                         progress_callback=None) -> bool:
+    """
+    Ghép timeline [(audio_path, start_ms)] ra output_path trong 1 lượt.
+    Không có đoạn chồng nhau thì nối tuần tự (concat), có thì mới mix.
+    allow_concat=False: luôn mix (dùng khi so sánh / benchmark engine).
+    progress_callback(MergeProgress): vị trí đã xử lý trên timeline, tốc độ, ETA.
+    low_memory: True = mix qua memmap theo cửa sổ (đoạn cần decode được ghi ra WAV tạm),
+                False = tích luỹ trong RAM,
+                None = tự chọn trước khi decode, theo thời lượng timeline và tổng PCM phải decode
+                (MEMMAP_THRESHOLD_BYTES).
+    Trả về False nếu bị dừng hoặc lỗi.
+    """
+    if not timeline:
+        return False
+
+    fmt = choose_format([path for path, _ in timeline])
+    writer = None
+    spill_dir = None
+
+    def make_spill_dir():
+        return tempfile.mkdtemp(prefix="mix_", dir=os.path.dirname(os.path.abspath(output_path)))
+
+    try:
+        if low_memory is None:
+            # Quyết định trước khi decode: bộ tích luỹ hoặc PCM decode quá lớn -> memmap + spill
+            acc_bytes, decoded_bytes = estimate_timeline_memory(timeline, fmt)
+            low_memory = max(acc_bytes, decoded_bytes) > MEMMAP_THRESHOLD_BYTES
+        if low_memory:
+            # MP3 / WAV khác định dạng được decode ra WAV tạm thay vì giữ trong RAM
+            spill_dir = make_spill_dir()
+        segments = open_segments(timeline, fmt, stop_event, spill_dir)
+        if segments is None:
+            logging.warning("Merge stopped by user.")
+            return False
+
+        total_frames = max((s.end_frame for s in segments), default=0)
+        total_ms = total_frames * 1000 // fmt.sample_rate
+        report = None
+        if progress_callback is not None:
+            def report(frame, stage=StageProgress(progress_callback, "Mix", total_ms)):
+                stage(frame * 1000 // fmt.sample_rate, force=frame >= total_frames)
+
+        if allow_concat and count_overlaps(segments) == 0:
+            # Fast path: không có đoạn chồng nhau -> nối tuần tự, không cần bộ tích luỹ
+            mode = "concat"
+            writer = PcmWriter(output_path, fmt)
+            if not concat_segments(segments, writer, stop_event, report):
+                logging.warning("Merge stopped by user.")
+                return False
+            writer.close()
+            writer = None
+        else:
+            if not low_memory and _estimated_accumulator_bytes(segments, fmt.channels) > MEMMAP_THRESHOLD_BYTES:
+                # Ước lượng ban đầu thiếu (file không đo được thời lượng): vẫn chuyển sang memmap,
+                # đoạn đã decode được ghi ra đĩa để không giữ trong RAM suốt lúc mix
+                low_memory = True
+                spill_dir = make_spill_dir()
+                segments = [spill_segment(seg, spill_dir, fmt) for seg in segments]
+
+            if low_memory:
+                mode = "memmap"
+                if not _mix_low_memory(segments, output_path, fmt, stop_event, report):
+                    logging.warning("Merge stopped by user.")
+                    return False
+            else:
+                mode = "RAM"
+                acc = mix_segments(segments, fmt.channels, stop_event, report)
+                if acc is None:
+                    logging.warning("Merge stopped by user.")
+                    return False
+
+                writer = PcmWriter(output_path, fmt)
+                for i in range(0, len(acc), WRITE_CHUNK_FRAMES):
+                    writer.write(saturate_to_int16(acc[i:i + WRITE_CHUNK_FRAMES]))
+                writer.close()
+                writer = None
+
+        logging.info(f"Mixed {len(segments)} segments ({total_frames * 1000 // fmt.sample_rate}ms, "
+                     f"{fmt.sample_rate}Hz/{fmt.channels}ch, {mode}) -> {os.path.basename(output_path)}")
+        return True
+    except Exception as e:
+        logging.error(f"Lỗi mix audio: {e}")
+        return False
+    finally:
+        if writer is not None:
+            writer.abort()
+        if spill_dir is not None:
+            shutil.rmtree(spill_dir, ignore_errors=True)
@@ -0,0 +1,200 @@
+"""
+Audio Probe - Lấy thời lượng audio nhanh cho cả thư mục
+- Cache sidecar theo thư mục (DurationCache): file chưa đổi thì không đo lại
+- WAV PCM: đọc header RIFF (không tạo tiến trình)
+- Định dạng khác (MP3...): ffprobe, chạy song song trên thread pool
+- index_audio_dir(): quét thư mục 1 lần (os.scandir) -> {index SRT: đường dẫn file}
+"""
+import os
+import logging
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Optional
+
+try:
+    from app.core.wav_io import read_wav_info
+except ImportError:
+    from core.wav_io import read_wav_info
+
+try:
+    from app.core.audio_folder_cache import DurationCache
+except ImportError:
+    from core.audio_folder_cache import DurationCache
+
+try:
+    from app.core.ffmpeg_helper import FFPROBE_PATH
+except ImportError:
+    try:
+        from core.ffmpeg_helper import FFPROBE_PATH
+    except ImportError:
+        FFPROBE_PATH = 'ffprobe'
+
+AUDIO_EXTENSIONS = ('.mp3', '.wav')
+
+
+def _default_probe_workers() -> int:
+    # ffprobe chủ yếu chờ IO / khởi động tiến trình -> cho nhiều hơn số core một chút
+    return max(2, min(32, (os.cpu_count() or 1) * 2))
+
+
+def _ffprobe_duration(audio_path: str) -> Optional[int]:
+    try:
+        cmd = [
+            FFPROBE_PATH, '-v', 'error',
+            '-show_entries', 'format=duration',
+            '-of', 'default=noprint_wrappers=1:nokey=1',
+            audio_path
+        ]
+        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+        return int(float(result.stdout.strip()) * 1000)
+    except Exception as e:
+        logging.error(f"Không thể lấy thời lượng audio {audio_path}: {e}")
+        return None
+
+
+def ffprobe_duration_ms(audio_path: str) -> int:
+    """Thời lượng (ms) qua ffprobe, 0 nếu lỗi"""
+    return _ffprobe_duration(audio_path) or 0
+
+
+def _codec_of(audio_path: str) -> str:
+    return os.path.splitext(audio_path)[1].lower().lstrip('.')
+
+
+def header_record(audio_path: str) -> Optional[dict]:
+    """Thông tin từ header WAV PCM (không tạo tiến trình), None nếu không đọc được"""
+    if not audio_path.lower().endswith('.wav'):
+        return None
+    info = read_wav_info(audio_path)
+    if info is None:
+        return None
+    return {"duration_ms": info.duration_ms, "codec": "wav", "sample_rate": info.sample_rate,
+            "channels": info.channels, "sample_width": info.sample_width}
+
+
+def header_duration_ms(audio_path: str) -> Optional[int]:
+    """Thời lượng (ms) từ header WAV PCM, None nếu không đọc được header"""
+    record = header_record(audio_path)
+    return record["duration_ms"] if record else None
+
+
+def _probe_record(audio_path: str) -> Optional[dict]:
+    record = header_record(audio_path)
+    if record is None:
+        duration = _ffprobe_duration(audio_path)
+        if duration is None:
+            return None
+        record = {"duration_ms": duration, "codec": _codec_of(audio_path),
+                  "sample_rate": None, "channels": None, "sample_width": None}
+    return record
+
+
+def get_audio_records(paths: Iterable[str], probe_missing: bool = True, use_cache: bool = True,
+                      max_workers: Optional[int] = None, save: bool = True) -> Dict[str, dict]:
+    """
+    Thông tin (thời lượng + định dạng) cho nhiều file, qua cache sidecar từng thư mục.
+    File chưa có trong cache: WAV đọc header ngay, còn lại gọi ffprobe song song
+    (probe_missing=False thì bỏ qua các file cần ffprobe). File lỗi không có trong kết quả.
+    save=False: chỉ cập nhật cache trong RAM (tra cứu lẻ, caller hàng loạt tự save 1 lần).
+    """
+    records = {}
+    pending = []
+    touched = set()
+    for path in dict.fromkeys(paths):
+        cache = DurationCache.for_file(path) if use_cache else None
+        record = cache.get(path) if cache is not None else None
+        if record is None:
+            record = header_record(path)
+            if record is not None and cache is not None:
+                cache.put(path, record)
+                touched.add(cache)
+        if record is not None:
+            records[path] = record
+        elif probe_missing:
+            pending.append(path)
+
+    if pending:
+        workers = min(len(pending), max_workers or _default_probe_workers())
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            probed = list(executor.map(_probe_record, pending))
+        for path, record in zip(pending, probed):
+            if record is None:
+                continue
+            records[path] = record
+            if use_cache:
+                cache = DurationCache.for_file(path)
+                cache.put(path, record)
+                touched.add(cache)
+
+    if save:
+        for cache in touched:
+            cache.save()
+    return records
+
+
+def get_audio_record(audio_path: str, probe_missing: bool = True, use_cache: bool = True) -> Optional[dict]:
+    """1 file: không ghi sidecar (ghi ở cuối thao tác hàng loạt hoặc khi thoát)"""
+    return get_audio_records([audio_path], probe_missing, use_cache, save=False).get(audio_path)
+
+
+def get_duration_ms(audio_path: str, use_cache: bool = True) -> int:
+    """Thời lượng (ms) của 1 file: cache -> header WAV -> ffprobe. 0 nếu lỗi"""
+    record = get_audio_record(audio_path, use_cache=use_cache)
+    return record["duration_ms"] if record else 0
+
+
+def get_durations_ms(paths: Iterable[str], max_workers: Optional[int] = None,
+                     use_cache: bool = True) -> Dict[str, int]:
+    """Thời lượng (ms) cho nhiều file. Trả về {path: ms}, file lỗi = 0"""
+    paths = list(dict.fromkeys(paths))
+    records = get_audio_records(paths, use_cache=use_cache, max_workers=max_workers)
+    return {p: records[p]["duration_ms"] if p in records else 0 for p in paths}
+
+
+def invalidate_duration(audio_path: str):
+    """
+    Gọi sau khi sửa file tại chỗ (trim...) để lần đọc sau đo lại.
+    Chỉ xoá trong RAM: entry cũ trên đĩa đã tự hết hạn theo size/mtime,
+    sidecar được ghi ở cuối thao tác hàng loạt (tránh ghi file mỗi lần trim).
+    """
+    DurationCache.for_file(audio_path).invalidate(audio_path)
+
+
+def refresh_duration_ms(audio_path: str) -> int:
+    """Đo lại thời lượng file vừa được ghi lại và cập nhật cache (trong RAM)"""
+    cache = DurationCache.for_file(audio_path)
+    cache.invalidate(audio_path)
+    return get_duration_ms(audio_path)
+
+
+def _index_from_name(name: str) -> Optional[int]:
+    """
+    Index SRT từ tên file: "{index:03d}_*.mp3/.wav" hoặc "{index}.wav"
+    (cùng quy tắc đặt tên với generate_batch_audio_logic)
+    """
+    lower = name.lower()
+    stem, ext = os.path.splitext(name)
+    if not lower.endswith(AUDIO_EXTENSIONS):
+        return None
+    head, sep, _ = stem.partition('_')
+    if sep and head.isdigit() and f"{int(head):03d}" == head:
+        return int(head)
+    if not sep and ext == '.wav' and stem.isdigit() and str(int(stem)) == stem:
+        return int(stem)
+    return None
+
+
+def index_audio_dir(audio_dir: str) -> Dict[int, str]:
+    """Quét thư mục 1 lần -> {index: đường dẫn}. Trùng index thì lấy tên đứng trước theo thứ tự alphabet"""
+    index = {}
+    try:
+        with os.scandir(audio_dir) as it:
+            names = sorted(e.name for e in it if e.is_file())
+    except OSError:
+        return index
+
+    for name in names:
+        idx = _index_from_name(name)
+        if idx is not None and idx not in index:
+            index[idx] = os.path.join(audio_dir, name)
+    return index
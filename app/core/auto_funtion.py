@@ -40,8 +40,30 @@ if os.name == 'nt':
 # Import hàm export_to_srt từ utils (đã có sẵn logic đọc draft_content.json)
 try:
     from app.core.utils import export_to_srt, milliseconds_to_srt_time
+    from app.core.srt_parser import parse_srt_table, iter_srt_cues
+    from app.core.cue_columns import scale_srt_file
+    from app.core.subtitle_writer import write_srt, write_txt
+    from app.core.audio_probe import invalidate_duration
+    from app.core.wav_trim import trim_leading_silence_wav, leading_silence_filter
+    from app.core.parallel_trim import trim_files_parallel
+    from app.core.silence_analysis import cached_silence, record_silence
 except ImportError:
     from utils import export_to_srt, milliseconds_to_srt_time
+    from srt_parser import parse_srt_table, iter_srt_cues
+    from cue_columns import scale_srt_file
+    from subtitle_writer import write_srt, write_txt
+    from audio_probe import invalidate_duration
+    from wav_trim import trim_leading_silence_wav, leading_silence_filter
+    from parallel_trim import trim_files_parallel
+    from silence_analysis import cached_silence, record_silence
+
+try:
+    from app.core.ffmpeg_helper import FFMPEG_PATH
+except ImportError:
+    try:
+        from ffmpeg_helper import FFMPEG_PATH
+    except ImportError:
+        FFMPEG_PATH = 'ffmpeg'
 
 
 # ========== STEP 1: Extract SRT from Draft Content JSON ==========
@@ -168,24 +190,11 @@ def extract_text_lines_from_srt(srt_path):
     """Trích xuất danh sách dòng text từ file SRT (bỏ timing)"""
     texts = []
     try:
-        with open(srt_path, "r", encoding="utf-8") as f:
-            content = f.read()
-
-        blocks = re.split(r'\n\s*\n', content.strip())
-
-        for block in blocks:
-            lines = block.strip().split("\n")
-            # Tìm dòng có timestamp
-            for idx, line in enumerate(lines):
-                if "-->" in line:
-                    # Text nằm sau dòng timestamp
-                    text_lines = lines[idx+1:]
-                    if text_lines:
-                        # Gộp các dòng text (nếu subtitle có nhiều dòng)
-                        text = " ".join(text_lines).strip()
-                        if text:
-                            texts.append(text)
-                    break
+        # Gộp các dòng text (nếu subtitle có nhiều dòng), bỏ cue rỗng
+        for text in parse_srt_table(srt_path).texts(line_sep=" "):
+            text = text.strip()
+            if text:
+                texts.append(text)
     except Exception as e:
         logging.error(f"Lỗi đọc SRT: {e}")
     
@@ -445,42 +454,17 @@ def convert_txt_to_srt_using_template(txt_path, srt_template_path, output_srt_pa
     """
     logging.info(f"Convert TXT -> SRT: {os.path.basename(txt_path)}")
     try:
-        with open(txt_path, "r", encoding="utf-8") as f:
-            txt_lines = [l.strip() for l in f if l.strip()]
-
-        with open(srt_template_path, "r", encoding="utf-8") as f:
-            srt_content = f.read()
-
-        # Parse SRT blocks
-        pattern = r"(\d+)\s*\n(\d{2}:\d{2}:\d{2},\d{3}\s*-->\s*\d{2}:\d{2}:\d{2},\d{3})\s*\n((?:(?!\n\d+\n\d{2}:\d{2}:\d{2},\d{3}).)*)"
-        blocks = re.findall(pattern, srt_content, re.DOTALL)
-        
-        if not blocks:
-            # Fallback parsing
-            logging.warning("Regex không bắt được cấu trúc chuẩn, thử fallback parsing...")
-            raw_blocks = re.split(r'\n\s*\n', srt_content.strip())
-            parsed_blocks = []
-            for b in raw_blocks:
-                lines = b.strip().split('\n')
-                if len(lines) >= 2:
-                    for idx, line in enumerate(lines):
-                        if "-->" in line:
-                            seq = lines[0] if idx > 0 else str(len(parsed_blocks) + 1)
-                            parsed_blocks.append((seq, line))
-                            break
-            blocks = parsed_blocks
-
-        count = min(len(txt_lines), len(blocks))
-        new_content = ""
-
-        for i in range(count):
-            seq_num = blocks[i][0] if blocks[i][0] else str(i+1)
-            timing = blocks[i][1]
-            text = txt_lines[i]
-            new_content += f"{seq_num}\n{timing}\n{text}\n\n"
-
-        with open(output_srt_path, "w", encoding="utf-8") as f:
-            f.write(new_content)
+        # Parse template theo từng dòng và ghi thẳng ra file output (không gom chuỗi)
+        cues = iter_srt_cues(srt_template_path)
+        try:
+            with open(txt_path, "r", encoding="utf-8") as f:
+                txt_lines = (l.strip() for l in f if l.strip())
+                count = write_srt(output_srt_path, (
+                    (cue.index, cue.start_ms, cue.end_ms, text)
+                    for cue, text in zip(cues, txt_lines)
+                ))
+        finally:
+            cues.close()
 
         logging.info(f"Convert thành công: {count} lines -> {output_srt_path}")
         return True, count
@@ -491,7 +475,8 @@ def convert_txt_to_srt_using_template(txt_path, srt_template_path, output_srt_pa
 
 
 # ========== STEP 4: Generate TTS Audio ==========
-def run_step4_tts(work_dir, voice, rate, volume, speed_factor=1.0, capcut_speed=0, progress_callback=None):
+def run_step4_tts(work_dir, voice, rate, volume, speed_factor=1.0, capcut_speed=0, progress_callback=None,
+                  stop_event=None, trim_workers=None):
     """
     Bước 4: Tạo audio từ SRT đã dịch (Hỗ trợ Edge TTS và CapCut TTS)
     
@@ -503,6 +488,8 @@ def run_step4_tts(work_dir, voice, rate, volume, speed_factor=1.0, capcut_speed=
         speed_factor: Hệ số scale thời gian SRT
         capcut_speed: Tốc độ đọc cho CapCut (int, -10 đến 10, default 0)
         progress_callback: Callback cập nhật UI
+        stop_event: Event để dừng bước trim
+        trim_workers: Số file trim song song (None = số core)
         
     Returns:
         (success: bool, result_message: str)
@@ -555,6 +542,7 @@ def run_step4_tts(work_dir, voice, rate, volume, speed_factor=1.0, capcut_speed=
     capcut_voice_id = get_voice_id_by_name(voice) if voice else None
     
     audio_files = [] # List[(path, start_ms)]
+    pretrimmed = False
     
     if capcut_voice_id:
         # === Xử lý CapCut TTS ===
@@ -616,13 +604,16 @@ def run_step4_tts(work_dir, voice, rate, volume, speed_factor=1.0, capcut_speed=
                 pitch="+0Hz",
                 max_concurrent=5,
                 stop_event=None,
-                progress_callback=None
+                progress_callback=None,
+                trim_leading_silence=True
             )
         
         try:
             loop = asyncio.new_event_loop()
             asyncio.set_event_loop(loop)
             audio_files = loop.run_until_complete(run_tts())
+            # Khoảng lặng đầu đã cắt khi decode MP3 -> WAV
+            pretrimmed = True
             loop.close()
             
             # Retry logic chỉ áp dụng cho Edge TTS vì CapCut logic đơn giản hơn (và có retry nội bộ nếu cần thiết kế thêm)
@@ -643,13 +634,16 @@ def run_step4_tts(work_dir, voice, rate, volume, speed_factor=1.0, capcut_speed=
 
 
     # ===== Bước 4.2: Cắt khoảng lặng đầu file audio =====
-    logging.info(f"[Step 4] Đang cắt khoảng lặng đầu các file audio...")
-    trim_count = 0
-    for audio_path, _ in audio_files:
-        if os.path.exists(audio_path):
-            if trim_silence_from_audio(audio_path):
-                trim_count += 1
-    logging.info(f"[Step 4] Đã trim {trim_count}/{len(audio_files)} file audio")
+    if pretrimmed:
+        logging.info(f"[Step 4] Khoảng lặng đầu đã được cắt khi tạo audio (Edge TTS)")
+    else:
+        logging.info(f"[Step 4] Đang cắt khoảng lặng đầu các file audio...")
+        trim_paths = [audio_path for audio_path, _ in audio_files if os.path.exists(audio_path)]
+        trim_summary = trim_files_parallel(trim_paths, trim_silence_from_audio, max_workers=trim_workers,
+                                           stop_event=stop_event, label="[Step 4] Trim")
+        logging.info(f"[Step 4] Đã trim {trim_summary.success}/{len(audio_files)} file audio")
+        if trim_summary.stopped:
+            return False, "Đã dừng khi đang cắt khoảng lặng"
     
     # ===== Bước 4.3: Scale SRT nếu cần =====
     if speed_factor != 1.0:
@@ -707,34 +701,10 @@ def scale_srt_timing(input_path, output_path, factor):
     """Scale timing của SRT theo hệ số factor (1.2 = chậm lại 20%)"""
     logging.info(f"Scale SRT timing (x{factor}): {os.path.basename(input_path)}")
     
-    def parse_time(time_str):
-        h, m, s, ms = map(int, re.split('[:,]', time_str))
-        return (h*3600 + m*60 + s) * 1000000 + ms * 1000
-
-    def format_time(micros):
-        total_ms = int(micros / 1000)
-        ms = total_ms % 1000
-        s = (total_ms // 1000) % 60
-        m = (total_ms // 60000) % 60
-        h = (total_ms // 3600000)
-        return f"{h:02d}:{m:02d}:{s:02d},{ms:03d}"
-    
     try:
-        with open(input_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-
-        pattern = r'(\d{2}:\d{2}:\d{2},\d{3})\s*-->\s*(\d{2}:\d{2}:\d{2},\d{3})'
-
-        def replace_func(match):
-            start_str, end_str = match.groups()
-            new_start = parse_time(start_str) * factor
-            new_end = parse_time(end_str) * factor
-            return f"{format_time(new_start)} --> {format_time(new_end)}"
-
-        new_content = re.sub(pattern, replace_func, content)
-        
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write(new_content)
+        # Scale trên mảng NumPy, format toàn bộ timestamp một lần;
+        # chỉ thay timestamp, phần còn lại của file giữ nguyên
+        scale_srt_file(input_path, output_path, factor)
 
         logging.info(f"Scale thành công -> {output_path}")
         return True
@@ -763,11 +733,25 @@ def trim_silence_from_audio(input_path, output_path=None):
         temp_path = output_path
     
     try:
+        # WAV ghi đè tại chỗ: cắt native (chỉ sửa header), không gọi ffmpeg
+        if output_path is None:
+            # Kho phân tích báo file bắt đầu bằng tiếng -> không có gì để cắt
+            analysis = cached_silence(input_path)
+            if analysis is not None and analysis.leading_ms == 0:
+                return True
+            trimmed_ms = trim_leading_silence_wav(input_path, leading_ms=analysis.leading_ms if analysis else None)
+            if trimmed_ms is not None:
+                if trimmed_ms:
+                    invalidate_duration(input_path)
+                    if analysis is not None:
+                        record_silence(input_path, analysis.after_leading_cut(trimmed_ms))
+                return True
+
         # FFmpeg filter: cắt khoảng lặng đầu file
-        filter_str = "silenceremove=start_periods=1:start_threshold=-50dB"
+        filter_str = leading_silence_filter()
         
         cmd = [
-            'ffmpeg', '-y',
+            FFMPEG_PATH, '-y',
             '-i', input_path,
             '-af', filter_str
         ]
@@ -786,6 +770,7 @@ def trim_silence_from_audio(input_path, output_path=None):
         if output_path is None:
             os.remove(input_path)
             os.rename(temp_path, input_path)
+            invalidate_duration(input_path)
         
         return True
         
@@ -805,29 +790,11 @@ def extract_text_from_srt(srt_path, output_txt_path):
     logging.info(f"Extract text from SRT: {os.path.basename(srt_path)}")
     
     try:
-        with open(srt_path, "r", encoding="utf-8") as f:
-            content = f.read()
-
-        blocks = re.split(r'\n\s*\n', content.strip())
-        texts = []
-
-        for block in blocks:
-            lines = block.strip().split("\n")
-            # Tìm dòng có timestamp
-            for idx, line in enumerate(lines):
-                if "-->" in line:
-                    # Text nằm sau dòng timestamp
-                    text_lines = lines[idx+1:]
-                    if text_lines:
-                        texts.append(" ".join(text_lines))
-                    break
+        texts = (t for t in parse_srt_table(srt_path).texts(line_sep=" ") if t)
+        count = write_txt(output_txt_path, texts)
 
-        with open(output_txt_path, "w", encoding="utf-8") as f:
-            for t in texts:
-                f.write(t + "\n")
-
-        logging.info(f"Extracted {len(texts)} lines -> {output_txt_path}")
-        return True, len(texts)
+        logging.info(f"Extracted {count} lines -> {output_txt_path}")
+        return True, count
 
     except Exception as e:
         logging.error(f"Lỗi extract_text_from_srt: {e}")
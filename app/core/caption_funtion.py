@@ -10,12 +10,24 @@ Module xử lý chức năng chọn vùng video
 import cv2
 import json
 import os
+import logging
 import numpy as np
 import random
 from PIL import Image, ImageTk
 import tkinter as tk
 from tkinter import filedialog, messagebox
 
+try:
+    from app.core.srt_parser import parse_srt_table
+    from app.core.subtitle_writer import ms_to_ass_time
+    from app.core.subtitle_index import get_subtitle_index, clean_ass_text
+    from app.core.ass_converter import AssStyle, convert_srt_file_to_ass, hex_to_ass_color
+except ImportError:
+    from core.srt_parser import parse_srt_table
+    from core.subtitle_writer import ms_to_ass_time
+    from core.subtitle_index import get_subtitle_index, clean_ass_text
+    from core.ass_converter import AssStyle, convert_srt_file_to_ass, hex_to_ass_color
+
 
 class VideoRegionSelector:
     """Class xử lý việc chọn vùng trên video"""
@@ -837,19 +849,10 @@ class VideoRegionSelector:
     def _parse_ass_sample(self, ass_path):
         """Parse ASS file và lấy text mẫu từ dialogue đầu tiên"""
         try:
-            with open(ass_path, 'r', encoding='utf-8') as f:
-                for line in f:
-                    if line.startswith('Dialogue:'):
-                        # Format: Dialogue: Layer,Start,End,Style,Name,MarginL,MarginR,MarginV,Effect,Text
-                        parts = line.split(',', 9)
-                        if len(parts) >= 10:
-                            text = parts[9].strip()
-                            # Remove ASS tags like {\pos(x,y)}
-                            import re
-                            text = re.sub(r'\{[^}]*\}', '', text)
-                            # Remove \N line breaks
-                            text = text.replace('\\N', ' ')
-                            return text if text else "Sample Caption"
+            # Chỉ đọc tới Dialogue đầu tiên (mmap), không đọc hết file
+            for cue in get_subtitle_index(ass_path).first_cues(1):
+                text = clean_ass_text(cue.text)
+                return text if text else "Sample Caption"
             return "Sample Caption"
         except:
             return "Sample Caption"
@@ -1021,53 +1024,21 @@ def srt_time_to_ass(t):
         return f"{h}:{m}:{s}.{cs}"
     return t
 
-def hex_to_ass_color(hex_color):
-    """Convert HEX color (#RRGGBB) to ASS color (&H00BBGGRR)"""
-    hex_color = hex_color.lstrip('#')
-    if len(hex_color) == 6:
-        r, g, b = hex_color[0:2], hex_color[2:4], hex_color[4:6]
-        # ASS uses BGR format
-        return f"&H00{b.upper()}{g.upper()}{r.upper()}"
-    return "&H00FFFFFF"
-
 def parse_srt(srt_path):
     """Parse SRT file to list of dicts"""
-    with open(srt_path, 'r', encoding='utf-8') as f:
-        content = f.read()
-    
-    # Split by double newline (blank line between subtitles)
-    blocks = content.strip().split('\n\n')
-    # If standard split fails try regex
-    if len(blocks) < 2:
-        import re
-        blocks = re.split(r'\n\s*\n', content.strip())
+    table = parse_srt_table(srt_path)
 
     subtitles = []
-    for block in blocks:
-        lines = block.strip().split('\n')
-        if len(lines) < 3:
+    for i in range(len(table)):
+        text = table.text(i)
+        if not text:
             continue
-        
-        timing_idx = 0
-        if ' --> ' in lines[0]:
-            timing_idx = 0
-        elif len(lines) > 1 and ' --> ' in lines[1]:
-            timing_idx = 1
-        else:
-            continue
-            
-        timing = lines[timing_idx]
-        text = '\n'.join(lines[timing_idx+1:])
-        
-        if ' --> ' in timing:
-            s, e = timing.split(' --> ')
-            subtitles.append({
-                'start': srt_time_to_ass(s.strip()),
-                'end': srt_time_to_ass(e.strip()),
-                'text': text
-            })
+        subtitles.append({
+            'start': ms_to_ass_time(table.starts[i]),
+            'end': ms_to_ass_time(table.ends[i]),
+            'text': text
+        })
     
-    print(f"Parsed {len(subtitles)} subtitles from {srt_path}")  # Debug
     return subtitles
 
 def convert_srt_to_ass(srt_path, ass_path, video_resolution=(1920, 1080), 
@@ -1080,37 +1051,10 @@ def convert_srt_to_ass(srt_path, ass_path, video_resolution=(1920, 1080),
         shadow: Shadow depth (0=no shadow, 2=medium, 3=strong)
         alignment: ASS Alignment (2=Bottom Center, 5=Middle Center, etc.)
     """
-    w, h = video_resolution
-    ass_color = hex_to_ass_color(font_color)
-    # alignment is used from args
-    
-    content = f"""[Script Info]
-Title: Converted by CapCutTool
-ScriptType: v4.00+
-PlayResX: {w}
-PlayResY: {h}
-ScaledBorderAndShadow: no
-
-[V4+ Styles]
-Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, Shadow, Alignment, MarginL, MarginR, MarginV, Encoding
-Style: Default,{font_name},{font_size},{ass_color},&H000000FF,&H00000000,&HFF000000,0,0,0,0,100,100,0,0,1,2,{shadow},{alignment},10,10,{margin_v},1
-
-[Events]
-Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text
-"""
-    
-    subtitles = parse_srt(srt_path)
-    print(f"Converting {len(subtitles)} subtitles to ASS format")  # Debug
-    
-    for sub in subtitles:
-        txt = sub['text'].replace('\n', '\\N')
-        if position:
-            px, py = position
-            txt = f"{{\\pos({px},{py})}}{txt}"
-        content += f"Dialogue: 0,{sub['start']},{sub['end']},Default,,0,0,0,,{txt}\n"
-        
-    with open(ass_path, 'w', encoding='utf-8') as f:
-        f.write(content)
+    style = AssStyle(tuple(video_resolution), font_name, font_size, font_color,
+                     margin_v, shadow, alignment)
+    # Stream cue từ parser thẳng ra file, header lấy từ cache theo style
+    convert_srt_file_to_ass(srt_path, ass_path, style, position=position)
         
     return True
 
@@ -1125,40 +1069,30 @@ def get_sample_caption(file_path):
     ext = os.path.splitext(file_path)[1].lower()
     
     try:
+        # Đọc lazy qua mmap: dừng ngay khi tìm được caption phù hợp
+        index = get_subtitle_index(file_path)
+
         if ext == '.srt':
-            # Use existing parse_srt
-            subs = parse_srt(file_path)
-            if subs:
-                # Return first one, or maybe one in the middle? 
-                # Let's return the first one that is long enough to look good
-                for sub in subs:
-                    t = sub['text'].replace('\n', ' ')
-                    if len(t) > 5: return t
-                return subs[0]['text'].replace('\n', ' ') if subs else "Sample Caption (SRT)"
+            first = None
+            for cue in index.iter_cues():
+                if not cue.text:
+                    continue
+                t = cue.text.replace('\n', ' ')
+                if first is None:
+                    first = t
+                # Return the first one that is long enough to look good
+                if len(t) > 5:
+                    return t
+            return first if first else "Sample Caption (SRT)"
                 
         elif ext == '.ass':
-            with open(file_path, 'r', encoding='utf-8') as f:
-                lines = f.readlines()
-                
-            for line in lines:
-                # Try with and without BOM/whitespace
-                line_stripped = line.strip()
-                if line_stripped.startswith('Dialogue:'):
-                    # Format: Dialogue: Layer,Start,End,Style,Name,MarginL,MarginR,MarginV,Effect,Text
-                    parts = line_stripped.split(',', 9)
-                    if len(parts) >= 10:
-                        text = parts[9].strip()
-                        # Simply remove ASS tags like {\pos(x,y)}
-                        import re
-                        text = re.sub(r'\{[^}]*\}', '', text)
-                        # Replace ASS line breaks
-                        text = text.replace('\\N', ' ').replace('\\n', ' ')
-                        text = text.strip()
-                        if len(text) > 0:
-                            print(f"Found caption: {text[:100]}")  # Debug
-                            return text
+            for cue in index.iter_cues():
+                text = clean_ass_text(cue.text)
+                if len(text) > 0:
+                    logging.debug(f"Found caption: {text[:100]}")
+                    return text
             
-            print(f"No valid Dialogue lines found in {file_path}")  # Debug
+            logging.debug(f"No valid Dialogue lines found in {file_path}")
             return "Sample Caption (ASS)"
             
     except Exception as e:
@@ -1305,29 +1239,12 @@ def render_ass_to_video(ass_path, output_path, width=1920, height=200, duration=
         return (False, None)
 
 def get_ass_duration(ass_path):
-    """Get duration from ASS file by finding the last subtitle end time"""
+    """Get duration from ASS file by finding the latest subtitle end time (max over all Dialogue lines)"""
     try:
-        with open(ass_path, 'r', encoding='utf-8') as f:
-            lines = f.readlines()
-        
-        max_time = 0
-        for line in lines:
-            if line.strip().startswith('Dialogue:'):
-                # Format: Dialogue: Layer,Start,End,Style,...
-                parts = line.strip().split(',', 3)
-                if len(parts) >= 3:
-                    end_time_str = parts[2].strip()  # H:MM:SS.cs format
-                    # Convert to seconds
-                    time_parts = end_time_str.replace('.', ':').split(':')
-                    if len(time_parts) >= 3:
-                        try:
-                            h = int(time_parts[0])
-                            m = int(time_parts[1])
-                            s = int(time_parts[2])
-                            total_seconds = h * 3600 + m * 60 + s
-                            max_time = max(max_time, total_seconds)
-                        except:
-                            pass
+        # End lớn nhất của mọi Dialogue (dòng ASS không nhất thiết theo thứ tự thời gian)
+        # -> vẫn phải quét cả file, nhưng bằng 1 regex trên mmap thay vì tách / strip từng dòng
+        max_end_ms = get_subtitle_index(ass_path).max_end_ms()
+        max_time = max_end_ms // 1000 if max_end_ms else 0
         
         if max_time > 0:
             return max_time + 2  # Add 2 seconds buffer
@@ -1336,5 +1253,3 @@ def get_ass_duration(ass_path):
         print(f"Error parsing ASS duration: {e}")
     
     return None
-
-
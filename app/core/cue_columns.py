@@ -0,0 +1,211 @@
+"""
+Cue Columns - Bảng cue dạng cột NumPy
+- starts / ends / indices: mảng int64
+- texts: list text
+Các phép scale, shift, clamp, lấp khoảng trống thực hiện trên toàn mảng,
+format timestamp SRT cũng làm một lần cho cả mảng.
+scale_srt_file(): chỉ thay các timestamp, giữ nguyên từng byte phần còn lại của file.
+"""
+import re
+from typing import List, Optional
+
+import numpy as np
+
+try:
+    from app.core.srt_parser import CueTable, parse_srt_table
+    from app.core.utils import milliseconds_to_srt_time
+    from app.core.subtitle_writer import write_srt_blocks
+except ImportError:
+    from core.srt_parser import CueTable, parse_srt_table
+    from core.utils import milliseconds_to_srt_time
+    from core.subtitle_writer import write_srt_blocks
+
+
+class CueColumns:
+    """Bảng cue dạng cột, mọi phép biến đổi trả về CueColumns mới"""
+
+    def __init__(self, starts, ends, texts: List[str], indices=None):
+        self.starts = np.asarray(starts, dtype=np.int64)
+        self.ends = np.asarray(ends, dtype=np.int64)
+        self.texts = texts
+        if indices is None:
+            indices = np.arange(1, len(self.starts) + 1, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int64)
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def __repr__(self) -> str:
+        return f"CueColumns({len(self)} cues)"
+
+    @classmethod
+    def from_table(cls, table: CueTable) -> "CueColumns":
+        # np.array trên array('q') copy thẳng qua buffer protocol, không qua list Python
+        return cls(
+            np.array(table.starts, dtype=np.int64),
+            np.array(table.ends, dtype=np.int64),
+            table.texts(),
+            np.array(table.indices, dtype=np.int64),
+        )
+
+    @classmethod
+    def from_srt(cls, srt_path: str) -> "CueColumns":
+        return cls.from_table(parse_srt_table(srt_path))
+
+    def _with_times(self, starts, ends) -> "CueColumns":
+        return CueColumns(starts, ends, self.texts, self.indices)
+
+    @property
+    def durations(self) -> np.ndarray:
+        return self.ends - self.starts
+
+    def scale(self, factor: float) -> "CueColumns":
+        """Nhân toàn bộ timestamp với factor (1.2 = chậm lại 20%)"""
+        # Giữ nguyên cách làm tròn cũ: tính trên micro giây rồi cắt phần lẻ
+        def _scale(ms):
+            return np.trunc(ms * 1000 * factor / 1000).astype(np.int64)
+        return self._with_times(_scale(self.starts), _scale(self.ends))
+
+    def shift(self, offset_ms: int) -> "CueColumns":
+        """Dịch toàn bộ timeline offset_ms (có thể âm)"""
+        return self._with_times(self.starts + offset_ms, self.ends + offset_ms)
+
+    def clamp(self, min_ms: int = 0, max_ms: Optional[int] = None) -> "CueColumns":
+        """Kẹp timestamp trong khoảng [min_ms, max_ms]"""
+        return self._with_times(
+            np.clip(self.starts, min_ms, max_ms),
+            np.clip(self.ends, min_ms, max_ms),
+        )
+
+    def fill_gaps(self, max_gap_ms: Optional[int] = None) -> "CueColumns":
+        """
+        Kéo dài end của mỗi cue tới start của cue kế tiếp
+        nếu khoảng trống > 0 và <= max_gap_ms (None = lấp mọi khoảng trống)
+        """
+        ends = self.ends.copy()
+        if len(ends) > 1:
+            next_starts = self.starts[1:]
+            gaps = next_starts - ends[:-1]
+            mask = gaps > 0
+            if max_gap_ms is not None:
+                mask &= gaps <= max_gap_ms
+            ends[:-1] = np.where(mask, next_starts, ends[:-1])
+        return self._with_times(self.starts.copy(), ends)
+
+    def timing_lines(self) -> List[str]:
+        """Các dòng 'HH:MM:SS,mmm --> HH:MM:SS,mmm' cho toàn bộ cue"""
+        return format_srt_timing_lines(self.starts, self.ends)
+
+    def write_srt(self, output_path: str) -> int:
+        """Ghi ra file SRT, trả về số cue đã ghi"""
+        return write_srt_blocks(output_path, zip(self.indices.tolist(), self.timing_lines(), self.texts))
+
+
+# ============================================================================
+# FORMAT TIMESTAMP VECTOR HOÁ
+# ============================================================================
+
+_TS_WIDTH = 12                 # "HH:MM:SS,mmm"
+_ARROW = np.frombuffer(b" --> ", dtype=np.uint8)
+
+
+def _timestamp_matrix(ms) -> Optional[np.ndarray]:
+    """
+    Dựng ma trận byte (n, 12) chứa 'HH:MM:SS,mmm' cho từng phần tử.
+    Trả về None nếu có giờ >= 100 (không vừa 2 chữ số).
+    """
+    ms = np.maximum(np.asarray(ms, dtype=np.int64), 0)
+    hours = ms // 3600000
+    if hours.size and hours.max() > 99:
+        return None
+
+    minutes = (ms // 60000) % 60
+    seconds = (ms // 1000) % 60
+    millis = ms % 1000
+
+    out = np.empty((len(ms), _TS_WIDTH), dtype=np.uint8)
+    out[:, 0] = hours // 10
+    out[:, 1] = hours % 10
+    out[:, 3] = minutes // 10
+    out[:, 4] = minutes % 10
+    out[:, 6] = seconds // 10
+    out[:, 7] = seconds % 10
+    out[:, 9] = millis // 100
+    out[:, 10] = (millis // 10) % 10
+    out[:, 11] = millis % 10
+    out += ord('0')
+    out[:, 2] = ord(':')
+    out[:, 5] = ord(':')
+    out[:, 8] = ord(',')
+    return out
+
+
+def _rows_to_str(matrix: np.ndarray) -> List[str]:
+    width = matrix.shape[1]
+    return np.ascontiguousarray(matrix).view(f"S{width}").ravel().astype(f"U{width}").tolist()
+
+
+def format_srt_timestamps(ms) -> List[str]:
+    """Format cả mảng milliseconds thành timestamp SRT"""
+    matrix = _timestamp_matrix(ms)
+    if matrix is None:
+        return [milliseconds_to_srt_time(int(v)) for v in np.asarray(ms)]
+    return _rows_to_str(matrix)
+
+
+def format_srt_timing_lines(starts, ends) -> List[str]:
+    """Format cả mảng (start, end) thành các dòng timing SRT"""
+    start_matrix = _timestamp_matrix(starts)
+    end_matrix = _timestamp_matrix(ends)
+    if start_matrix is None or end_matrix is None:
+        return [f"{a} --> {b}" for a, b in zip(format_srt_timestamps(starts), format_srt_timestamps(ends))]
+
+    arrow = np.broadcast_to(_ARROW, (len(start_matrix), len(_ARROW)))
+    return _rows_to_str(np.hstack([start_matrix, arrow, end_matrix]))
+
+
+# ============================================================================
+# SCALE GIỮ NGUYÊN NỘI DUNG FILE
+# ============================================================================
+
+# Giống pattern re.sub cũ: chỉ khớp timestamp 'HH:MM:SS,mmm'
+_TIMING_PAIR_RE = re.compile(r'(\d{2}:\d{2}:\d{2},\d{3})\s*-->\s*(\d{2}:\d{2}:\d{2},\d{3})')
+
+
+def parse_srt_timestamps(stamps: List[str]) -> np.ndarray:
+    """Parse cả list 'HH:MM:SS,mmm' (đúng 12 ký tự ASCII) -> mảng milliseconds"""
+    if not stamps:
+        return np.zeros(0, dtype=np.int64)
+    digits = np.frombuffer("".join(stamps).encode("ascii"), dtype=np.uint8)
+    digits = digits.reshape(-1, _TS_WIDTH).astype(np.int64) - ord('0')
+
+    def _num(cols):
+        value = np.zeros(len(digits), dtype=np.int64)
+        for col in cols:
+            value = value * 10 + digits[:, col]
+        return value
+
+    return ((_num((0, 1)) * 60 + _num((3, 4))) * 60 + _num((6, 7))) * 1000 + _num((9, 10, 11))
+
+
+def scale_srt_content(content: str, factor: float) -> str:
+    """
+    Scale mọi cặp timestamp trong nội dung SRT, phần còn lại (số thứ tự, text, dòng trống,
+    khoảng trắng, cue lỗi) giữ nguyên từng ký tự như re.sub cũ.
+    """
+    # re.split với 2 group: [text, start, end, text, start, end, ..., text]
+    parts = _TIMING_PAIR_RE.split(content)
+    if len(parts) == 1:
+        return content
+    columns = CueColumns(parse_srt_timestamps(parts[1::3]), parse_srt_timestamps(parts[2::3]), [])
+    parts[1::3] = columns.scale(factor).timing_lines()
+    parts[2::3] = [""] * len(parts[2::3])
+    return "".join(parts)
+
+
+def scale_srt_file(input_path: str, output_path: str, factor: float):
+    """Scale timestamp file SRT, giữ nguyên phần còn lại của file"""
+    with open(input_path, "r", encoding="utf-8") as f:
+        content = f.read()
+    with open(output_path, "w", encoding="utf-8") as f:
+        f.write(scale_srt_content(content, factor))
@@ -0,0 +1,134 @@
+"""
+Cue Sidecar - Lưu CueTable đã parse ra file nhị phân cạnh file SRT (vd: video.srt.cues)
+Lần mở sau chỉ cần đọc file 1 lần và chép thẳng từng cột vào array('q')
+(memoryview, không tạo bytes trung gian) thay vì parse lại text.
+
+Định dạng (little-endian, mọi mảng căn 8 byte):
+    header  : magic 'CUES', version (u32), count (u64),
+              source mtime_ns (i64), source size (i64), text blob bytes (u64)
+    indices : i64[count]
+    starts  : i64[count]
+    ends    : i64[count]
+    offsets : i64[count + 1]   (offset theo ký tự trong text blob)
+    text    : UTF-8
+Sidecar chỉ được dùng khi mtime_ns và size của file SRT còn khớp.
+"""
+import os
+import sys
+import struct
+import tempfile
+import logging
+from array import array
+from typing import Optional
+
+try:
+    from app.core.srt_parser import CueTable, parse_srt_table
+except ImportError:
+    from core.srt_parser import CueTable, parse_srt_table
+
+SIDECAR_SUFFIX = ".cues"
+SIDECAR_MAGIC = b"CUES"
+SIDECAR_VERSION = 1
+
+_HEADER = struct.Struct("<4sIQqqQ")
+
+
+def sidecar_path(srt_path: str) -> str:
+    return srt_path + SIDECAR_SUFFIX
+
+
+def _array_from_buffer(buf: memoryview) -> array:
+    arr = array('q')
+    arr.frombytes(buf)
+    if sys.byteorder != 'little':
+        arr.byteswap()
+    return arr
+
+
+def _array_bytes(arr: array) -> bytes:
+    if sys.byteorder != 'little':
+        arr = array('q', arr)
+        arr.byteswap()
+    return arr.tobytes()
+
+
+def read_sidecar(srt_path: str) -> Optional[CueTable]:
+    """Đọc sidecar nếu còn khớp với file SRT, ngược lại trả về None"""
+    path = sidecar_path(srt_path)
+    try:
+        st = os.stat(srt_path)
+        with open(path, 'rb') as f:
+            data = f.read()
+        if len(data) < _HEADER.size:
+            return None
+        magic, version, count, mtime_ns, size, text_bytes = _HEADER.unpack_from(data, 0)
+        if (magic != SIDECAR_MAGIC or version != SIDECAR_VERSION
+                or mtime_ns != st.st_mtime_ns or size != st.st_size):
+            return None
+
+        expected = _HEADER.size + 8 * (4 * count + 1) + text_bytes
+        if len(data) != expected:
+            return None
+
+        view = memoryview(data)
+        pos = _HEADER.size
+        columns = []
+        for length in (count, count, count, count + 1):
+            end = pos + 8 * length
+            columns.append(_array_from_buffer(view[pos:end]))
+            pos = end
+        text_blob = str(view[pos:pos + text_bytes], 'utf-8')
+    except (OSError, ValueError, struct.error) as e:  # UnicodeDecodeError là ValueError
+        logging.debug(f"Không đọc được sidecar {path}: {e}")
+        return None
+
+    indices, starts, ends, offsets = columns
+    return CueTable(indices, starts, ends, offsets, text_blob, source_path=srt_path)
+
+
+def write_sidecar(srt_path: str, table: CueTable) -> bool:
+    """
+    Ghi sidecar cho file SRT: ghi ra file tạm tên riêng (mkstemp, cùng thư mục) rồi os.replace
+    -> nhiều process / thread ghi cùng sidecar không ghi đè file tạm của nhau.
+    """
+    path = sidecar_path(srt_path)
+    tmp_path = None
+    try:
+        st = os.stat(srt_path)
+        text = table.text_blob.encode('utf-8')
+        header = _HEADER.pack(SIDECAR_MAGIC, SIDECAR_VERSION, len(table),
+                              st.st_mtime_ns, st.st_size, len(text))
+        fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(path) + ".",
+                                        suffix=".tmp", dir=os.path.dirname(path) or ".")
+        with os.fdopen(fd, 'wb') as f:
+            f.write(header)
+            for arr in (table.indices, table.starts, table.ends, table.text_offsets):
+                f.write(_array_bytes(arr))
+            f.write(text)
+        os.replace(tmp_path, path)
+        return True
+    except OSError as e:
+        # Thư mục chỉ đọc, ổ đầy... -> bỏ qua, lần sau parse lại
+        logging.debug(f"Không ghi được sidecar {path}: {e}")
+        if tmp_path is not None:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+        return False
+
+
+def load_cue_table(srt_path: str, use_sidecar: bool = True) -> CueTable:
+    """
+    Lấy CueTable của file SRT: đọc sidecar nếu còn hợp lệ,
+    ngược lại parse file text và ghi sidecar cho lần sau.
+    """
+    if use_sidecar:
+        table = read_sidecar(srt_path)
+        if table is not None:
+            return table
+
+    table = parse_srt_table(srt_path)
+    if use_sidecar:
+        write_sidecar(srt_path, table)
+    return table
@@ -0,0 +1,125 @@
+"""
+Cue Stretch - Tăng tốc cục bộ từng cue bị tràn (thay cho giãn cả timeline)
+- local_tempos(): hệ số atempo cho từng cue dài hơn khung SRT (có giới hạn / cue)
+- stretch_cues(): chạy ffmpeg atempo song song, mỗi cue 1 file WAV tạm
+- layout_timeline(): giữ start gốc, chỉ đẩy cue sau khi cue trước chưa nói xong
+"""
+import os
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+try:
+    from app.core.ffmpeg_runner import run_ffmpeg
+except ImportError:
+    from core.ffmpeg_runner import run_ffmpeg
+
+try:
+    from app.core.ffmpeg_helper import FFMPEG_PATH
+except ImportError:
+    try:
+        from core.ffmpeg_helper import FFMPEG_PATH
+    except ImportError:
+        FFMPEG_PATH = 'ffmpeg'
+
+# Tăng tốc tối đa cho 1 cue (1.5 = nói nhanh hơn 50%)
+DEFAULT_MAX_TEMPO = 1.5
+
+# Tràn dưới mức này (ms) thì không stretch, chỉ đẩy cue sau nếu cần
+MIN_STRETCH_OVERFLOW_MS = 40
+
+# Giới hạn 1 filter atempo của các bản ffmpeg cũ
+_ATEMPO_MAX = 2.0
+
+
+class StretchJob(NamedTuple):
+    index: int
+    input_path: str
+    output_path: str
+    tempo: float
+
+
+def atempo_filter(tempo: float) -> str:
+    """Chuỗi filter atempo (nối nhiều filter khi tempo > 2.0)"""
+    parts = []
+    while tempo > _ATEMPO_MAX:
+        parts.append(f"atempo={_ATEMPO_MAX}")
+        tempo /= _ATEMPO_MAX
+    parts.append(f"atempo={tempo:.6f}")
+    return ",".join(parts)
+
+
+def local_tempos(segments: Sequence, max_tempo: float = DEFAULT_MAX_TEMPO,
+                 min_overflow_ms: int = MIN_STRETCH_OVERFLOW_MS,
+                 trailing_ms: Optional[Dict[int, int]] = None) -> Dict[int, float]:
+    """
+    {vị trí segment: tempo} cho các cue tràn khung SRT.
+    segments: AudioSegment (srt_duration_ms, actual_duration_ms)
+    trailing_ms: {vị trí: khoảng lặng cuối} đã phân tích -> chỉ tính phần có tiếng
+    (cue chỉ tràn vì đuôi im lặng thì không stretch)
+    """
+    trailing_ms = trailing_ms or {}
+    tempos = {}
+    for pos, seg in enumerate(segments):
+        spoken_ms = seg.actual_duration_ms - trailing_ms.get(pos, 0)
+        if seg.srt_duration_ms <= 0 or spoken_ms - seg.srt_duration_ms < min_overflow_ms:
+            continue
+        tempos[pos] = min(spoken_ms / seg.srt_duration_ms, max_tempo)
+    return tempos
+
+
+def stretch_file(job: StretchJob, stop_event=None) -> bool:
+    """Stretch 1 file bằng ffmpeg atempo -> WAV PCM (False nếu lỗi / bị dừng)"""
+    cmd = [
+        FFMPEG_PATH, '-y', '-v', 'error',
+        '-i', job.input_path,
+        '-af', atempo_filter(job.tempo),
+        '-c:a', 'pcm_s16le',
+        job.output_path,
+    ]
+    try:
+        if not run_ffmpeg(cmd, stop_event=stop_event):
+            return False
+        return os.path.exists(job.output_path) and os.path.getsize(job.output_path) > 0
+    except Exception as e:
+        logging.error(f"Lỗi stretch {os.path.basename(job.input_path)} (x{job.tempo:.2f}): {e}")
+        return False
+
+
+def stretch_cues(jobs: List[StretchJob], stop_event=None,
+                 max_workers: Optional[int] = None) -> Dict[int, str]:
+    """
+    Chạy các job song song (mỗi job là 1 tiến trình ffmpeg riêng -> tận dụng đủ core).
+    Trả về {index: đường dẫn file đã stretch} cho các job thành công.
+    """
+    workers = max_workers or max(1, min(os.cpu_count() or 1, 8))
+    done = {}
+
+    def run(job):
+        if stop_event and stop_event.is_set():
+            return False
+        return stretch_file(job, stop_event)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for job, ok in zip(jobs, executor.map(run, jobs)):
+            if ok:
+                done[job.index] = job.output_path
+    return done
+
+
+def layout_timeline(starts_ms: Sequence[int], durations_ms: Sequence[int],
+                    min_gap_ms: int = 0) -> Tuple[List[int], int]:
+    """
+    Start mới cho từng cue: giữ start gốc, chỉ lùi lại khi cue trước (đã stretch)
+    chưa kết thúc. Trả về (starts, số cue bị đẩy).
+    """
+    starts = []
+    shifted = 0
+    prev_end = None
+    for start, duration in zip(starts_ms, durations_ms):
+        if prev_end is not None and start < prev_end + min_gap_ms:
+            start = prev_end + min_gap_ms
+            shifted += 1
+        starts.append(start)
+        prev_end = start + duration
+    return starts, shifted
@@ -0,0 +1,228 @@
+"""
+FFmpeg Runner - Chạy ffmpeg có báo tiến độ và dừng được giữa chừng
+- Đọc `-progress pipe:1` (out_time_us, speed, progress=end) -> MergeProgress
+- stop_event được kiểm tra mỗi poll_interval; tiến trình bị terminate,
+  quá stop_timeout thì kill -> luôn thoát trong thời gian giới hạn
+"""
+import time
+import logging
+import threading
+import subprocess
+from typing import Callable, List, NamedTuple, Optional
+
+# Chu kỳ kiểm tra stop_event (giây); ffmpeg tự ghi progress mỗi ~0.5s
+POLL_INTERVAL = 0.1
+
+# Thời gian chờ ffmpeg tự thoát sau terminate() trước khi kill()
+STOP_TIMEOUT = 2.0
+
+
+class MergeProgress(NamedTuple):
+    stage: str                 # Mô tả bước hiện tại ("Merge level 1/2", "Encode"...)
+    processed_ms: int          # Thời lượng audio output đã xử lý
+    total_ms: int              # Tổng thời lượng dự kiến (0 = không biết)
+    speed: float               # Tốc độ so với thời gian thực (ffmpeg "speed=")
+    eta_s: Optional[float]     # Thời gian còn lại ước tính (giây), None nếu chưa tính được
+
+    @property
+    def percent(self) -> Optional[float]:
+        if not self.total_ms:
+            return None
+        return min(100.0, self.processed_ms * 100.0 / self.total_ms)
+
+    def __str__(self) -> str:
+        text = f"{self.stage}: {self.processed_ms / 1000:.0f}s"
+        if self.total_ms:
+            text += f"/{self.total_ms / 1000:.0f}s ({self.percent:.0f}%)"
+        if self.speed:
+            text += f" x{self.speed:.1f}"
+        if self.eta_s is not None:
+            text += f" ETA {self.eta_s:.0f}s"
+        return text
+
+
+ProgressCallback = Callable[[MergeProgress], None]
+
+
+def parse_progress_line(line: str, state: dict) -> bool:
+    """Cập nhật state từ 1 dòng key=value của -progress. True khi hết 1 block (progress=...)"""
+    key, sep, value = line.strip().partition('=')
+    if not sep:
+        return False
+    if key in ('out_time_us', 'out_time_ms'):
+        # out_time_ms của ffmpeg thực chất cũng là micro giây
+        try:
+            state['processed_ms'] = max(0, int(value) // 1000)
+        except ValueError:
+            pass
+    elif key == 'speed':
+        try:
+            state['speed'] = float(value.rstrip('x'))
+        except ValueError:
+            pass
+    elif key == 'progress':
+        state['end'] = value == 'end'
+        return True
+    return False
+
+
+def estimate_eta(processed_ms: int, total_ms: int, elapsed_s: float) -> Optional[float]:
+    if not total_ms or processed_ms <= 0 or elapsed_s <= 0:
+        return None
+    rate = processed_ms / elapsed_s
+    return max(0.0, (total_ms - processed_ms) / rate)
+
+
+def with_progress_args(cmd: List[str]) -> List[str]:
+    """Chèn -progress pipe:1 -nostats ngay sau đường dẫn ffmpeg"""
+    return [cmd[0], '-progress', 'pipe:1', '-nostats', *cmd[1:]]
+
+
+def run_ffmpeg(cmd: List[str], stop_event=None, on_progress: Optional[Callable[[int, float], None]] = None,
+               stop_timeout: float = STOP_TIMEOUT) -> bool:
+    """
+    Chạy lệnh ffmpeg (cmd[0] là đường dẫn ffmpeg, output không ghi ra stdout).
+    on_progress(processed_ms, speed) được gọi mỗi block progress.
+    Trả về True nếu xong, False nếu bị dừng; ffmpeg lỗi -> CalledProcessError (như check=True).
+    """
+    if stop_event is None and on_progress is None:
+        subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        return True
+
+    full_cmd = with_progress_args(cmd) if on_progress else cmd
+    proc = subprocess.Popen(full_cmd, stdin=subprocess.DEVNULL,
+                            stdout=subprocess.PIPE if on_progress else subprocess.DEVNULL,
+                            stderr=subprocess.DEVNULL, text=True, errors='replace')
+
+    reader = None
+    if on_progress:
+        def read_progress():
+            state = {'processed_ms': 0, 'speed': 0.0}
+            for line in proc.stdout:
+                if parse_progress_line(line, state):
+                    try:
+                        on_progress(state['processed_ms'], state['speed'])
+                    except Exception as e:
+                        logging.debug(f"Progress callback lỗi: {e}")
+        reader = threading.Thread(target=read_progress, daemon=True)
+        reader.start()
+
+    try:
+        while True:
+            try:
+                proc.wait(timeout=POLL_INTERVAL)
+                break
+            except subprocess.TimeoutExpired:
+                if stop_event is not None and stop_event.is_set():
+                    terminate_process(proc, stop_timeout)
+                    return False
+    finally:
+        if proc.poll() is None:
+            terminate_process(proc, stop_timeout)
+        if reader is not None:
+            reader.join(timeout=stop_timeout)
+
+    if proc.returncode != 0:
+        raise subprocess.CalledProcessError(proc.returncode, cmd)
+    return True
+
+
+def terminate_process(proc: subprocess.Popen, timeout: float = STOP_TIMEOUT):
+    """terminate, hết timeout thì kill (không bao giờ chờ vô hạn)"""
+    try:
+        proc.terminate()
+        proc.wait(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
+    except OSError:
+        pass
+
+
+class ProgressTracker:
+    """
+    Gộp tiến độ của nhiều job ffmpeg chạy song song trong 1 stage thành 1 MergeProgress.
+    Mỗi job có key + thời lượng dự kiến; tốc độ = tổng speed các job đang chạy.
+    """
+
+    def __init__(self, callback: Optional[ProgressCallback], stage: str = "Merge"):
+        self.callback = callback
+        self.stage = stage
+        self._totals = {}
+        self._done = {}
+        self._speed = {}
+        self._lock = threading.Lock()
+        self._started = time.monotonic()
+
+    def start_stage(self, stage: str):
+        with self._lock:
+            self.stage = stage
+            self._totals.clear()
+            self._done.clear()
+            self._speed.clear()
+            self._started = time.monotonic()
+
+    def add_job(self, key, total_ms: int):
+        with self._lock:
+            self._totals[key] = max(0, total_ms)
+            self._done[key] = 0
+
+    def job_callback(self, key) -> Optional[Callable[[int, float], None]]:
+        if self.callback is None:
+            return None
+        return lambda processed_ms, speed: self.update(key, processed_ms, speed)
+
+    def finish_job(self, key):
+        with self._lock:
+            self._done[key] = self._totals.get(key, self._done.get(key, 0))
+            self._speed.pop(key, None)
+        self._emit()
+
+    def update(self, key, processed_ms: int, speed: float):
+        with self._lock:
+            total = self._totals.get(key, 0)
+            self._done[key] = min(processed_ms, total) if total else processed_ms
+            self._speed[key] = speed
+        self._emit()
+
+    def _emit(self):
+        if self.callback is None:
+            return
+        with self._lock:
+            processed = sum(self._done.values())
+            total = sum(self._totals.values())
+            speed = sum(self._speed.values())
+            eta = estimate_eta(processed, total, time.monotonic() - self._started)
+            progress = MergeProgress(self.stage, processed, total, speed, eta)
+        try:
+            self.callback(progress)
+        except Exception as e:
+            logging.debug(f"Progress callback lỗi: {e}")
+
+
+class StageProgress:
+    """Tiến độ 1 bước chạy trong process (mix, nối PCM...) -> MergeProgress, giới hạn tần suất gọi"""
+    MIN_INTERVAL = 0.25
+
+    def __init__(self, callback: Optional[ProgressCallback], stage: str, total_ms: int):
+        self.callback = callback
+        self.stage = stage
+        self.total_ms = total_ms
+        self._started = time.monotonic()
+        self._last = 0.0
+
+    def __call__(self, processed_ms: int, force: bool = False):
+        if self.callback is None:
+            return
+        now = time.monotonic()
+        if not force and now - self._last < self.MIN_INTERVAL:
+            return
+        self._last = now
+        elapsed = now - self._started
+        speed = processed_ms / 1000.0 / elapsed if elapsed > 0 else 0.0
+        progress = MergeProgress(self.stage, processed_ms, self.total_ms, speed,
+                                 estimate_eta(processed_ms, self.total_ms, elapsed))
+        try:
+            self.callback(progress)
+        except Exception as e:
+            logging.debug(f"Progress callback lỗi: {e}")
@@ -0,0 +1,71 @@
+"""
+Interval Index - Truy vấn theo thời gian trên danh sách cue bằng bisect
+- overlapping(a, b): các cue giao với [a, b)
+- at(t): các cue đang hiển thị tại t
+- points_inside(points, a, b): các điểm nằm trong (a, b) của 1 mảng điểm đã sort
+Cue được sort theo start; kèm mảng max(end) cộng dồn để bỏ qua phần đầu danh sách
+chắc chắn kết thúc trước khoảng cần hỏi -> O(log n + m), m là số cue từ cue đầu tiên
+có max(end) cộng dồn > a tới cue cuối cùng có start < b (m >= k, k là số kết quả).
+Cue ngắn, ít chồng nhau (phụ đề thông thường) thì m ≈ k; nhưng 1 cue rất dài ở đầu
+giữ max(end) cao nên m có thể tới gần n (không phải interval tree).
+"""
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Iterable, List, Optional, Sequence
+
+
+def points_inside(sorted_points: Sequence[int], start: int, end: int) -> Sequence[int]:
+    """Các điểm p trong mảng đã sort thoả start < p < end"""
+    lo = bisect_right(sorted_points, start)
+    hi = bisect_left(sorted_points, end, lo)
+    return sorted_points[lo:hi]
+
+
+class IntervalIndex:
+    """Index các khoảng [start, end) đã sort theo start"""
+
+    __slots__ = ("starts", "ends", "order", "_max_ends")
+
+    def __init__(self, starts: Iterable[int], ends: Iterable[int]):
+        pairs = sorted(zip(starts, ends, range(1 << 62)))
+        self.starts = array('q', (p[0] for p in pairs))
+        self.ends = array('q', (p[1] for p in pairs))
+        # Vị trí gốc của từng khoảng (trước khi sort)
+        self.order = array('q', (p[2] for p in pairs))
+
+        # _max_ends[i] = max(ends[0..i]) -> không giảm, bisect được
+        max_ends = array('q')
+        running = None
+        for e in self.ends:
+            running = e if running is None or e > running else running
+            max_ends.append(running)
+        self._max_ends = max_ends
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def max_end(self) -> Optional[int]:
+        """End lớn nhất trong mọi khoảng (None nếu rỗng)"""
+        return self._max_ends[-1] if len(self._max_ends) else None
+
+    def overlapping(self, a: int, b: int) -> List[int]:
+        """
+        Vị trí gốc của các khoảng giao với [a, b) (start < b và end > a), theo thứ tự start.
+        Duyệt tuyến tính đoạn [lo, hi) sau 2 lần bisect (xem độ phức tạp ở đầu module).
+        """
+        if b <= a:
+            return []
+        hi = bisect_left(self.starts, b)
+        lo = bisect_right(self._max_ends, a, 0, hi)
+        ends = self.ends
+        order = self.order
+        return [order[i] for i in range(lo, hi) if ends[i] > a]
+
+    def at(self, t: int) -> List[int]:
+        """Vị trí gốc của các khoảng chứa t (start <= t < end)"""
+        return self.overlapping(t, t + 1)
+
+    def last_at(self, t: int) -> int:
+        """Khoảng bắt đầu muộn nhất chứa t (-1 nếu không có)"""
+        hits = self.at(t)
+        return hits[-1] if hits else -1
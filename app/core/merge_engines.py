@@ -0,0 +1,685 @@
+"""
+Merge Engines - Các engine ghép audio theo timeline + bộ chọn engine theo chi phí
+- ffmpeg : adelay + amix theo batch, gộp dần theo cây (không cần numpy)
+- mix    : mixer NumPy trong process (RAM hoặc memmap)
+- concat : nối PCM + khoảng lặng (chỉ khi không có đoạn chồng nhau)
+
+Planner ước lượng chi phí mỗi engine bằng mô hình tuyến tính theo
+(số đoạn, tổng thời lượng, số đoạn cần decode, số đoạn chồng nhau) rồi chọn engine rẻ nhất.
+Hệ số lấy từ benchmark đo thật (lưu trong AppData), chưa đo thì dùng giá trị mặc định:
+    python -m app.core.merge_engines --bench --save
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import argparse
+import tempfile
+import subprocess
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+try:
+    from app.core.wav_io import read_wav_info
+    from app.core.audio_probe import get_audio_records
+except ImportError:
+    from core.wav_io import read_wav_info
+    from core.audio_probe import get_audio_records
+
+try:
+    from app.core.ffmpeg_runner import ProgressCallback, ProgressTracker, run_ffmpeg
+    from app.core.audio_codecs import encoder_args, encode_weight
+except ImportError:
+    from core.ffmpeg_runner import ProgressCallback, ProgressTracker, run_ffmpeg
+    from core.audio_codecs import encoder_args, encode_weight
+
+try:
+    from app.core.ffmpeg_helper import FFMPEG_PATH
+except ImportError:
+    try:
+        from core.ffmpeg_helper import FFMPEG_PATH
+    except ImportError:
+        FFMPEG_PATH = 'ffmpeg'
+
+# Mixer NumPy là tuỳ chọn: không có numpy thì chỉ còn engine ffmpeg
+try:
+    from app.core import audio_mixer
+except ImportError:
+    try:
+        from core import audio_mixer
+    except ImportError:
+        audio_mixer = None
+
+COSTS_FILE_NAME = "merge_engine_costs.json"
+
+# Đặc trưng của mô hình chi phí (đơn vị hệ số: ms)
+# encode_seconds = số giây output x hệ số encode của codec (WAV = 0, xem audio_codecs.ENCODE_WEIGHTS)
+COST_FEATURES = ("startup", "segments", "audio_seconds", "decode_segments", "overlap_segments",
+                 "encode_seconds")
+
+# Đặc trưng chỉ có ở output nén: fit riêng trên phần dư của mẫu không phải WAV
+CODEC_FEATURES = ("encode_seconds",)
+
+# Hệ số mặc định (ước lượng trên máy 4 core) - benchmark --save sẽ ghi đè
+# overlap_segments: mix phải cộng + kẹp biên vùng chồng; amix của ffmpeg tốn thêm ít hơn;
+# concat không nhận timeline có chồng lấn nên hệ số không dùng tới
+DEFAULT_COSTS = {
+    "ffmpeg": {"startup": 150.0, "segments": 15.0, "audio_seconds": 0.5, "decode_segments": 0.0,
+               "overlap_segments": 1.0, "encode_seconds": 2.0},
+    "mix": {"startup": 5.0, "segments": 0.5, "audio_seconds": 0.3, "decode_segments": 40.0,
+            "overlap_segments": 2.0, "encode_seconds": 2.5},
+    "concat": {"startup": 5.0, "segments": 0.3, "audio_seconds": 0.15, "decode_segments": 40.0,
+               "overlap_segments": 0.0, "encode_seconds": 2.5},
+}
+
+
+# ============================================================================
+# THỐNG KÊ TIMELINE
+# ============================================================================
+
+class TimelineStats(NamedTuple):
+    segments: int
+    known_durations: int      # số đoạn đọc được thời lượng từ header WAV
+    decode_segments: int      # số đoạn phải decode qua ffmpeg (MP3, WAV không phải PCM16...)
+    overlap_segments: int     # số đoạn chồng lên đoạn trước (trong các đoạn biết thời lượng)
+    duration_ms: int
+    output_codec: str         # đuôi file output: wav, mp3, ...
+
+    @property
+    def overlap_ratio(self) -> float:
+        return self.overlap_segments / self.segments if self.segments else 0.0
+
+    @property
+    def durations_complete(self) -> bool:
+        return self.known_durations == self.segments
+
+    def features(self) -> Dict[str, float]:
+        return {
+            "startup": 1.0,
+            "segments": float(self.segments),
+            "audio_seconds": self.duration_ms / 1000.0,
+            "decode_segments": float(self.decode_segments),
+            "overlap_segments": float(self.overlap_segments),
+            "encode_seconds": self.duration_ms / 1000.0 * encode_weight(self.output_codec),
+        }
+
+
+def timeline_stats(timeline: List[Tuple[str, int]], output_path: str) -> TimelineStats:
+    """
+    Thống kê timeline từ cache thời lượng thư mục audio + header WAV
+    (không decode, không gọi ffprobe: file chưa có trong cache thì coi như chưa biết thời lượng)
+    """
+    records = get_audio_records((path for path, _ in timeline), probe_missing=False)
+    spans = []
+    decode = 0
+    formats = set()
+    for path, start_ms in timeline:
+        record = records.get(path)
+        if record is None or record.get("sample_width") != 2:
+            decode += 1
+        else:
+            formats.add(record["sample_rate"])
+        if record is not None:
+            spans.append((start_ms, start_ms + record["duration_ms"]))
+
+    # WAV khác sample rate cũng phải resample qua ffmpeg
+    if len(formats) > 1:
+        decode = len(timeline)
+
+    overlaps = 0
+    last_end = None
+    for start, end in sorted(spans):
+        if last_end is not None and start < last_end:
+            overlaps += 1
+        last_end = end if last_end is None else max(last_end, end)
+
+    ext = os.path.splitext(output_path)[1].lower().lstrip('.') or "wav"
+    return TimelineStats(len(timeline), len(spans), decode, overlaps, last_end or 0, ext)
+
+
+# ============================================================================
+# ENGINE FFMPEG (BATCH + CÂY)
+# ============================================================================
+
+# Số input tối đa cho 1 lệnh ffmpeg amix
+MERGE_BATCH_SIZE = 32
+
+
+def _default_merge_workers() -> int:
+    # Mỗi job là 1 tiến trình ffmpeg -> giới hạn theo số core
+    return max(1, min(os.cpu_count() or 1, 8))
+
+
+def _remove_temp_files(paths):
+    for tf in paths:
+        try:
+            if os.path.exists(tf):
+                os.remove(tf)
+        except OSError:
+            pass
+
+
+def _timeline_end_ms(batch: List[Tuple[str, int]], durations: Dict[str, int]) -> int:
+    """Thời điểm kết thúc của batch trên timeline (0 nếu không biết thời lượng đoạn nào)"""
+    return max((start + durations[path] for path, start in batch if path in durations), default=0)
+
+
+def merge_batches_tree(file_list: List[Tuple[str, int]], output_path: str, stop_event=None,
+                       batch_size: int = MERGE_BATCH_SIZE, max_workers: Optional[int] = None,
+                       progress_callback: Optional[ProgressCallback] = None) -> bool:
+    """
+    Ghép bằng ffmpeg theo cây: mỗi tầng gom batch_size input -> 1 file (adelay + amix),
+    các batch trong cùng tầng chạy song song trên pool có giới hạn, lặp tới khi còn 1 file.
+    File trung gian là WAV PCM (không encode lại nhiều lần), chỉ tầng cuối ghi ra output_path.
+    stop_event được kiểm tra liên tục: tiến trình ffmpeg đang chạy bị dừng trong thời gian giới hạn.
+    progress_callback(MergeProgress): tiến độ từng tầng (thời lượng đã xử lý, tốc độ, ETA).
+    """
+    batch_size = max(2, batch_size)
+    workers = max_workers or _default_merge_workers()
+    root, _ = os.path.splitext(output_path)
+    created = []           # Mọi file tạm đã tạo (để dọn)
+    inputs = list(file_list)
+    level = 0
+    tracker = ProgressTracker(progress_callback)
+    durations = {}
+    if progress_callback is not None:
+        records = get_audio_records((path for path, _ in inputs), probe_missing=False)
+        durations = {path: r["duration_ms"] for path, r in records.items()}
+    # Số tầng dự kiến (chỉ để hiển thị)
+    levels, n = 1, len(inputs)
+    while n > batch_size:
+        n = -(-n // batch_size)
+        levels += 1
+
+    def stopped():
+        if stop_event and stop_event.is_set():
+            logging.warning("Merge stopped by user.")
+            return True
+        return False
+
+    def run_batch(key, batch, out):
+        if stop_event and stop_event.is_set():
+            return False
+        ok = _merge_small_batch(batch, out, stop_event, tracker.job_callback(key))
+        tracker.finish_job(key)
+        return ok
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            while True:
+                batches = [inputs[i:i + batch_size] for i in range(0, len(inputs), batch_size)]
+                is_last = len(batches) == 1
+                logging.info(f"Merge level {level + 1}: {len(inputs)} inputs -> {len(batches)} file(s)")
+                tracker.start_stage(f"Merge level {level + 1}/{max(levels, level + 1)}")
+
+                futures = []
+                outputs = []
+                for n, batch in enumerate(batches):
+                    if stopped():
+                        for f in futures:
+                            f.cancel()
+                        return False
+                    out = output_path if is_last else f"{root}_temp_L{level}_{n}.wav"
+                    if not is_last:
+                        created.append(out)
+                    outputs.append(out)
+                    tracker.add_job(n, _timeline_end_ms(batch, durations))
+                    futures.append(executor.submit(run_batch, n, batch, out))
+
+                # Raise nếu ffmpeg lỗi, False nếu bị dừng giữa chừng
+                results = [f.result() for f in futures]
+                if not all(results) or stopped():
+                    return False
+
+                if is_last:
+                    return True
+
+                # Tầng kế tiếp: các file vừa tạo đều bắt đầu từ 0
+                previous = [path for path, _ in inputs] if level > 0 else []
+                _remove_temp_files(previous)
+                inputs = [(out, 0) for out in outputs]
+                if progress_callback is not None:
+                    durations = {}
+                    for out in outputs:
+                        info = read_wav_info(out)
+                        if info is not None:
+                            durations[out] = info.duration_ms
+                level += 1
+    finally:
+        _remove_temp_files(created)
+
+
+def _merge_small_batch(batch_list, output_file, stop_event=None, on_progress=None) -> bool:
+    """
+    Hàm helper để merge 1 nhóm nhỏ audio file dùng adelay + amix
+    Trả về False nếu bị dừng (ffmpeg lỗi -> CalledProcessError)
+    """
+    cmd = [FFMPEG_PATH, '-y']
+    filter_parts = []
+
+    # Input files
+    for idx, (path, start_ms) in enumerate(batch_list):
+        cmd.extend(['-i', path])
+        # Delay: adelay=1000|1000 (cho cả channel trái phải nếu stereo, hoặc just 1000 if mono logic handles it automatically usually but explicit pipes safer)
+        # Lưu ý: adelay nhận duration in milliseconds
+        filter_parts.append(f"[{idx}:a]adelay={start_ms}|{start_ms}[a{idx}]")
+
+    # Amix
+    mix_inputs = "".join([f"[a{i}]" for i in range(len(batch_list))])
+    # normalize=0 để tránh volume bị giảm khi mix nhiều file
+    filter_complex = ";".join(filter_parts) + \
+                     f";{mix_inputs}amix=inputs={len(batch_list)}:duration=longest:dropout_transition=0:normalize=0[out]"
+
+    cmd.extend([
+        '-filter_complex', filter_complex,
+        '-map', '[out]'
+    ])
+
+    # Tầng trung gian luôn là WAV PCM, chỉ output cuối mới qua encoder (đúng 1 lần)
+    cmd.extend(encoder_args(output_file))
+
+    cmd.append(output_file)
+
+    return run_ffmpeg(cmd, stop_event=stop_event, on_progress=on_progress)
+
+
+# ============================================================================
+# CÁC ENGINE
+# ============================================================================
+
+def ffmpeg_available() -> bool:
+    try:
+        result = subprocess.run([FFMPEG_PATH, '-version'], capture_output=True, timeout=5)
+        return result.returncode == 0
+    except Exception:
+        return False
+
+
+class MergeEngine(ABC):
+    """Interface 1 engine ghép audio"""
+    name = ""
+
+    def available(self) -> bool:
+        return True
+
+    def supports(self, stats: TimelineStats) -> bool:
+        return True
+
+    @abstractmethod
+    def merge(self, timeline: List[Tuple[str, int]], output_path: str, stop_event=None,
+              low_memory: Optional[bool] = None, progress_callback: Optional[ProgressCallback] = None) -> bool:
+        """Ghép timeline ra output_path, trả về True nếu thành công"""
+
+
+class FfmpegFilterEngine(MergeEngine):
+    name = "ffmpeg"
+
+    def __init__(self, batch_size: int = MERGE_BATCH_SIZE, max_workers: Optional[int] = None):
+        self.batch_size = batch_size
+        self.max_workers = max_workers
+        self._available = None
+
+    def available(self) -> bool:
+        if self._available is None:
+            self._available = ffmpeg_available()
+        return self._available
+
+    def merge(self, timeline, output_path, stop_event=None, low_memory=None, progress_callback=None) -> bool:
+        return merge_batches_tree(timeline, output_path, stop_event=stop_event,
+                                  batch_size=self.batch_size, max_workers=self.max_workers,
+                                  progress_callback=progress_callback)
+
+
+class NativeMixEngine(MergeEngine):
+    name = "mix"
+
+    def available(self) -> bool:
+        return audio_mixer is not None
+
+    def merge(self, timeline, output_path, stop_event=None, low_memory=None, progress_callback=None) -> bool:
+        return audio_mixer.mix_timeline_to_file(timeline, output_path, stop_event, low_memory=low_memory,
+                                                allow_concat=False, progress_callback=progress_callback)
+
+
+class ConcatEngine(MergeEngine):
+    name = "concat"
+
+    def available(self) -> bool:
+        return audio_mixer is not None
+
+    def supports(self, stats: TimelineStats) -> bool:
+        # Chỉ chọn khi chắc chắn không chồng nhau (biết đủ thời lượng)
+        return stats.durations_complete and stats.overlap_segments == 0
+
+    def merge(self, timeline, output_path, stop_event=None, low_memory=None, progress_callback=None) -> bool:
+        # Mixer tự kiểm tra lại overlap sau khi decode, có overlap thì mix
+        return audio_mixer.mix_timeline_to_file(timeline, output_path, stop_event, low_memory=low_memory,
+                                                allow_concat=True, progress_callback=progress_callback)
+
+
+def default_engines() -> List[MergeEngine]:
+    return [ConcatEngine(), NativeMixEngine(), FfmpegFilterEngine()]
+
+
+# ============================================================================
+# PLANNER
+# ============================================================================
+
+def costs_file_path() -> str:
+    # Import muộn: package gemini kéo theo cấu hình API, không cần cho việc ghép audio
+    try:
+        from app.gemini.api_config import get_appdata_dir
+    except ImportError:
+        from gemini.api_config import get_appdata_dir
+    return os.path.join(get_appdata_dir(), COSTS_FILE_NAME)
+
+
+def load_costs() -> Dict[str, Dict[str, float]]:
+    """Hệ số chi phí: mặc định, ghi đè bằng kết quả benchmark đã lưu (nếu có)"""
+    costs = {name: dict(coef) for name, coef in DEFAULT_COSTS.items()}
+    try:
+        with open(costs_file_path(), "r", encoding="utf-8") as f:
+            saved = json.load(f).get("costs", {})
+        for name, coef in saved.items():
+            costs.setdefault(name, {}).update({k: float(v) for k, v in coef.items() if k in COST_FEATURES})
+    except (ImportError, OSError, ValueError, AttributeError):
+        pass
+    return costs
+
+
+def save_costs(costs: Dict[str, Dict[str, float]], extra: Optional[Dict] = None) -> str:
+    path = costs_file_path()
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"costs": costs, **(extra or {})}, f, ensure_ascii=False, indent=2)
+    return path
+
+
+def estimate_cost_ms(engine_name: str, stats: TimelineStats, costs: Dict[str, Dict[str, float]]) -> float:
+    coef = costs.get(engine_name, {})
+    features = stats.features()
+    return sum(coef.get(k, 0.0) * v for k, v in features.items())
+
+
+def rank_engines(stats: TimelineStats, engines: Optional[List[MergeEngine]] = None,
+                 costs: Optional[Dict[str, Dict[str, float]]] = None) -> List[Tuple[float, MergeEngine]]:
+    """Các engine dùng được cho timeline, sắp theo chi phí ước lượng tăng dần"""
+    engines = engines if engines is not None else default_engines()
+    costs = costs if costs is not None else load_costs()
+    ranked = [
+        (estimate_cost_ms(e.name, stats, costs), e)
+        for e in engines if e.supports(stats) and e.available()
+    ]
+    ranked.sort(key=lambda x: x[0])
+    return ranked
+
+
+def merge_timeline(timeline: List[Tuple[str, int]], output_path: str, stop_event=None,
+                   low_memory: Optional[bool] = None, engine: Optional[str] = None,
+                   engines: Optional[List[MergeEngine]] = None,
+                   progress_callback: Optional[ProgressCallback] = None) -> bool:
+    """
+    Ghép timeline bằng engine rẻ nhất theo planner (hoặc engine chỉ định bằng tên).
+    Engine lỗi (không phải do dừng) thì thử engine kế tiếp.
+    progress_callback(MergeProgress): tiến độ (thời lượng đã xử lý, tốc độ, ETA).
+    """
+    if not timeline:
+        return False
+
+    stats = timeline_stats(timeline, output_path)
+    ranked = rank_engines(stats, engines)
+    if engine:
+        ranked = [r for r in ranked if r[1].name == engine] or ranked
+    if not ranked:
+        logging.error("Không có engine ghép audio nào dùng được (thiếu ffmpeg và numpy?)")
+        return False
+
+    plan = ", ".join(f"{e.name}~{cost:.0f}ms" for cost, e in ranked)
+    logging.info(f"Merge plan ({stats.segments} đoạn, overlap {stats.overlap_ratio:.0%}, "
+                 f"{stats.duration_ms / 1000:.1f}s, {stats.output_codec}): {plan}")
+
+    for _, eng in ranked:
+        try:
+            if eng.merge(timeline, output_path, stop_event, low_memory=low_memory,
+                         progress_callback=progress_callback):
+                return True
+        except Exception as e:
+            logging.error(f"Engine {eng.name} lỗi: {e}")
+        if stop_event and stop_event.is_set():
+            return False
+        logging.warning(f"Engine {eng.name} thất bại, thử engine tiếp theo...")
+    return False
+
+
+# ============================================================================
+# BENCHMARK
+# ============================================================================
+
+def _write_tone_wav(path: str, frames: int, freq: float, sample_rate: int, amplitude: int = 3000):
+    import numpy as np
+    try:
+        from app.core.wav_io import wav_header_bytes
+    except ImportError:
+        from core.wav_io import wav_header_bytes
+    t = np.arange(frames) / sample_rate
+    pcm = (amplitude * np.sin(2 * np.pi * freq * t)).astype('<i2')
+    with open(path, "wb") as f:
+        f.write(wav_header_bytes(sample_rate, 1, frames))
+        f.write(pcm.tobytes())
+
+
+def make_synthetic_timeline(work_dir: str, segments: int, overlap: float, seed: int = 7,
+                            sample_rate: int = 24000, mp3: bool = False) -> List[Tuple[str, int]]:
+    """Timeline giả lập: đoạn 0.5-3s, tỉ lệ `overlap` đoạn bắt đầu trước khi đoạn trước kết thúc"""
+    import random
+    rng = random.Random(seed)
+    os.makedirs(work_dir, exist_ok=True)
+    timeline = []
+    t = 0
+    for i in range(segments):
+        dur_ms = rng.randint(500, 3000)
+        path = os.path.join(work_dir, f"{i:04d}.wav")
+        _write_tone_wav(path, dur_ms * sample_rate // 1000, rng.uniform(200, 2000), sample_rate)
+        if mp3:
+            mp3_path = path[:-4] + ".mp3"
+            subprocess.run([FFMPEG_PATH, '-y', '-v', 'error', '-i', path, mp3_path], check=True)
+            os.remove(path)
+            path = mp3_path
+        if timeline and rng.random() < overlap:
+            start = max(0, t - rng.randint(100, min(400, dur_ms)))
+        else:
+            start = t + rng.randint(0, 800)
+        timeline.append((path, start))
+        t = max(t, start + dur_ms)
+    return timeline
+
+
+def _read_output_pcm(path: str, sample_rate: int):
+    import numpy as np
+    info = read_wav_info(path)
+    if info is not None and info.is_pcm16 and info.sample_rate == sample_rate and info.channels == 1:
+        with open(path, "rb") as f:
+            f.seek(info.data_offset)
+            return np.fromfile(f, dtype='<i2', count=info.frames).astype(np.int32)
+    return audio_mixer.decode_with_ffmpeg(path, audio_mixer.PcmFormat(sample_rate, 1)).ravel().astype(np.int32)
+
+
+def compare_outputs(reference: str, candidate: str, sample_rate: int, lossy: bool) -> Dict:
+    """So 2 output: chênh lệch độ dài, sai số lớn nhất / RMS tương đối"""
+    import numpy as np
+    ref = _read_output_pcm(reference, sample_rate)
+    got = _read_output_pcm(candidate, sample_rate)
+    n = min(len(ref), len(got))
+    diff = np.abs(ref[:n] - got[:n])
+    ref_rms = float(np.sqrt(np.mean(ref[:n].astype(np.float64) ** 2))) if n else 0.0
+    err_rms = float(np.sqrt(np.mean(diff.astype(np.float64) ** 2))) if n else 0.0
+    length_diff_ms = abs(len(ref) - len(got)) * 1000 / sample_rate
+    rel_rms = err_rms / ref_rms if ref_rms else 0.0
+    # PCM: lệch tối đa 2 LSB (làm tròn float của amix); lossy: RMS lệch < 10%
+    ok = length_diff_ms <= 50 and (rel_rms <= 0.1 if lossy else int(diff.max(initial=0)) <= 2)
+    return {"equivalent": ok, "length_diff_ms": round(length_diff_ms, 1),
+            "max_abs_diff": int(diff.max(initial=0)), "relative_rms_error": round(rel_rms, 5)}
+
+
+def _nonneg_lstsq(X, y) -> List[float]:
+    """
+    Bình phương tối thiểu với hệ số >= 0: cột có hệ số âm nhất bị loại (hệ số 0)
+    rồi fit lại các cột còn lại, lặp tới khi không còn hệ số âm.
+    Các hệ số còn lại luôn là nghiệm đúng của mô hình đã bỏ cột (không kẹp sau khi fit).
+    """
+    import numpy as np
+    coef = np.zeros(X.shape[1])
+    active = list(range(X.shape[1]))
+    while active:
+        sub, *_ = np.linalg.lstsq(X[:, active], y, rcond=None)
+        worst = int(np.argmin(sub))
+        if sub[worst] >= 0:
+            coef[active] = sub
+            break
+        del active[worst]
+    return coef.tolist()
+
+
+def _lstsq_costs(rows: List[Dict], features: Tuple[str, ...], y, priors: Dict[str, float]) -> Dict[str, float]:
+    """Fit các cột có biến thiên (hệ số >= 0); cột không đổi (trừ startup) giữ hệ số prior và được trừ khỏi y"""
+    import numpy as np
+    X = np.array([[r["features"][k] for k in features] for r in rows])
+    active = [i for i, k in enumerate(features) if k == "startup" or np.ptp(X[:, i]) > 0]
+    fixed = [i for i in range(len(features)) if i not in active]
+    fitted = {features[i]: priors.get(features[i], 0.0) for i in fixed}
+    y = y - X[:, fixed] @ np.array([fitted[features[i]] for i in fixed]) if fixed else y
+    for i, c in zip(active, _nonneg_lstsq(X[:, active], y)):
+        fitted[features[i]] = round(float(c), 4)
+    return fitted
+
+
+def fit_costs(samples: List[Dict]) -> Dict[str, Dict[str, float]]:
+    """
+    Hồi quy tuyến tính (bình phương tối thiểu, hệ số >= 0) thời gian đo theo đặc trưng timeline.
+    2 bước cho mỗi engine: hệ số chung fit trên mẫu output WAV, rồi hệ số encode
+    fit trên phần dư của mẫu output nén (MP3...). Đặc trưng không đổi trong các mẫu
+    (vd. overlap khi chỉ benchmark overlap 0) hoặc thiếu mẫu nén thì giữ hệ số mặc định.
+    """
+    import numpy as np
+    base_features = tuple(k for k in COST_FEATURES if k not in CODEC_FEATURES)
+    costs = {}
+    for name in sorted({s["engine"] for s in samples}):
+        rows = [s for s in samples if s["engine"] == name and s.get("seconds") is not None]
+        pcm_rows = [r for r in rows if r["features"].get("encode_seconds", 0.0) == 0.0]
+        coded_rows = [r for r in rows if r["features"].get("encode_seconds", 0.0) > 0.0]
+        if len(pcm_rows) < 2:
+            continue
+        fitted = dict(DEFAULT_COSTS.get(name, {}))
+        fitted.update(_lstsq_costs(pcm_rows, base_features,
+                                   np.array([r["seconds"] * 1000.0 for r in pcm_rows]), fitted))
+
+        if coded_rows:
+            residual = np.array([
+                r["seconds"] * 1000.0 - sum(fitted[k] * r["features"][k] for k in base_features)
+                for r in coded_rows
+            ])
+            encode = np.array([r["features"]["encode_seconds"] for r in coded_rows])
+            # 1 hệ số, không hằng số: phần dư ~ encode_seconds x hệ số
+            # (1 biến thì kẹp về 0 chính là nghiệm bình phương tối thiểu có ràng buộc >= 0)
+            fitted["encode_seconds"] = round(max(0.0, float(encode @ residual / (encode @ encode))), 4)
+        costs[name] = fitted
+    return costs
+
+
+def run_benchmark(sizes=(40, 160, 640), overlaps=(0.0, 0.3), codecs=("wav", "mp3"),
+                  work_dir: Optional[str] = None, sample_rate: int = 24000) -> Dict:
+    """Chạy mọi engine trên timeline giả lập, kiểm tra output tương đương, đo thời gian"""
+    if audio_mixer is None:
+        raise RuntimeError("Benchmark cần numpy (engine mix làm chuẩn so sánh)")
+
+    own_dir = work_dir is None
+    work_dir = work_dir or tempfile.mkdtemp(prefix="merge_bench_")
+    has_ffmpeg = ffmpeg_available()
+    engines = [e for e in default_engines() if e.available()]
+    samples = []
+    try:
+        for n in sizes:
+            for overlap in overlaps:
+                for input_mp3 in ((False, True) if has_ffmpeg else (False,)):
+                    name = f"n{n}_ov{int(overlap * 100)}_{'mp3' if input_mp3 else 'wav'}"
+                    seg_dir = os.path.join(work_dir, name)
+                    timeline = make_synthetic_timeline(seg_dir, n, overlap, sample_rate=sample_rate, mp3=input_mp3)
+                    for codec in codecs:
+                        if codec != "wav" and not has_ffmpeg:
+                            continue
+                        stats = timeline_stats(timeline, f"out.{codec}")
+                        # Chuẩn so sánh: mix NumPy ra WAV
+                        reference = os.path.join(work_dir, f"{name}_ref.wav")
+                        audio_mixer.mix_timeline_to_file(timeline, reference, allow_concat=False, low_memory=False)
+
+                        for engine in engines:
+                            if not engine.supports(stats):
+                                continue
+                            output = os.path.join(work_dir, f"{name}_{engine.name}.{codec}")
+                            start = time.perf_counter()
+                            ok = engine.merge(timeline, output)
+                            seconds = time.perf_counter() - start
+                            sample = {"timeline": name, "engine": engine.name, "codec": codec,
+                                      "features": stats.features(), "overlap_ratio": round(stats.overlap_ratio, 3),
+                                      "seconds": round(seconds, 4) if ok else None, "success": ok}
+                            if ok:
+                                sample.update(compare_outputs(reference, output, sample_rate, lossy=codec != "wav"))
+                            samples.append(sample)
+                            logging.info(f"{name} [{codec}] {engine.name}: "
+                                         f"{seconds:.3f}s {'OK' if sample.get('equivalent') else 'KHÁC'}")
+                            _remove_temp_files([output])
+                        _remove_temp_files([reference])
+                    shutil.rmtree(seg_dir, ignore_errors=True)
+    finally:
+        if own_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    # Chỉ dùng mẫu có output tương đương để fit
+    valid = [s for s in samples if s.get("equivalent")]
+    return {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "cpu_count": os.cpu_count(),
+        "ffmpeg": has_ffmpeg,
+        "engines": [e.name for e in engines],
+        "samples": samples,
+        "costs": fit_costs(valid),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark / chọn engine ghép audio")
+    parser.add_argument("--bench", action="store_true", help="Chạy benchmark các engine")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[40, 160, 640])
+    parser.add_argument("--overlaps", type=float, nargs="+", default=[0.0, 0.3])
+    parser.add_argument("--codecs", nargs="+", default=["wav", "mp3"])
+    parser.add_argument("--out", help="Ghi report JSON")
+    parser.add_argument("--save", action="store_true", help="Lưu hệ số đo được cho planner (AppData)")
+    parser.add_argument("--show", action="store_true", help="In hệ số planner đang dùng")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s: %(message)s')
+
+    if args.show or not args.bench:
+        print(json.dumps(load_costs(), indent=2))
+        if not args.bench:
+            return 0
+
+    report = run_benchmark(args.sizes, args.overlaps, args.codecs)
+    mismatches = [s for s in report["samples"] if s.get("success") and not s.get("equivalent")]
+    for s in mismatches:
+        print(f"Output khác chuẩn: {s['timeline']} [{s['codec']}] {s['engine']} "
+              f"(max diff {s['max_abs_diff']}, rms {s['relative_rms_error']})")
+    print(json.dumps(report["costs"], indent=2))
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    if args.save and report["costs"]:
+        path = save_costs(report["costs"], {"created": report["created"], "cpu_count": report["cpu_count"]})
+        print(f"Đã lưu hệ số planner: {path}")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
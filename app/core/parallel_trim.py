@@ -0,0 +1,90 @@
+"""
+Parallel Trim - Chạy hàm trim cho nhiều file song song (pool có giới hạn)
+- Mỗi job là 1 tiến trình ffmpeg riêng (hoặc trim native ngay trong process, chủ yếu IO)
+  -> thread pool là đủ để dùng hết core, không cần process pool
+- Log tiến độ theo đúng thứ tự file, đếm thành công / thất bại
+- stop_event: không nhận job mới, các job đang chạy được chạy xong
+"""
+import os
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, NamedTuple, Optional
+
+
+class TrimSummary(NamedTuple):
+    total: int
+    success: int
+    failed: int
+    skipped: int       # Không chạy do bị dừng
+    stopped: bool
+
+
+def default_trim_workers() -> int:
+    return max(1, os.cpu_count() or 1)
+
+
+def trim_files_parallel(paths: List[str], trim_fn: Callable[[str], bool],
+                        max_workers: Optional[int] = None, stop_event=None,
+                        log_every: int = 5, label: str = "Trim") -> TrimSummary:
+    """
+    Gọi trim_fn(path) -> bool cho từng file trên pool max_workers (mặc định = số core).
+    Kết quả được log theo thứ tự danh sách (không theo thứ tự hoàn thành).
+    """
+    total = len(paths)
+    if not total:
+        return TrimSummary(0, 0, 0, 0, False)
+
+    workers = max(1, min(max_workers or default_trim_workers(), total))
+    # Giới hạn số job đã nộp để stop_event có hiệu lực ngay (không xếp hàng cả nghìn job)
+    slots = threading.BoundedSemaphore(workers * 2)
+
+    def run(path):
+        try:
+            if stop_event and stop_event.is_set():
+                return None
+            return bool(trim_fn(path))
+        except Exception as e:
+            logging.error(f"Error trimming {os.path.basename(path)}: {e}")
+            return False
+        finally:
+            slots.release()
+
+    success = failed = skipped = 0
+    futures = []
+    logging.info(f"{label}: {total} files, {workers} workers")
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        next_log = 0
+
+        def drain(block: bool):
+            # Log các job đã xong theo đúng thứ tự nộp
+            nonlocal next_log, success, failed, skipped
+            while next_log < len(futures) and (block or futures[next_log].done()):
+                idx = next_log + 1
+                result = futures[next_log].result()
+                filename = os.path.basename(paths[next_log])
+                next_log += 1
+                if result is None:
+                    skipped += 1
+                    continue
+                if result:
+                    success += 1
+                else:
+                    failed += 1
+                    logging.warning(f"❌ Failed to trim: {filename}")
+                if idx % log_every == 0 or idx == total:
+                    logging.info(f"⏳ Progress: {idx}/{total} ({success} success)")
+
+        for path in paths:
+            if stop_event and stop_event.is_set():
+                break
+            slots.acquire()
+            futures.append(executor.submit(run, path))
+            drain(block=False)
+        drain(block=True)
+
+    skipped += total - len(futures)
+    stopped = bool(stop_event and stop_event.is_set() and skipped)
+    if stopped:
+        logging.warning(f"{label} stopped: {success} success, {failed} failed, {skipped} skipped")
+    return TrimSummary(total, success, failed, skipped, stopped)
@@ -0,0 +1,352 @@
+"""
+Silence Analysis - Phân tích khoảng lặng / mức âm lượng, lưu bền vững theo thư mục
+- Mỗi file: khoảng lặng đầu, cuối, các khoảng lặng giữa, peak và RMS (dBFS)
+- WAV PCM 16-bit: đọc PCM bằng NumPy (cửa sổ RMS giống wav_trim), không tạo tiến trình
+- Định dạng khác: 1 lần decode ffmpeg (silencedetect + volumedetect)
+- Kết quả lưu trong SilenceCache (sidecar .audio_silence.json, theo size + mtime):
+  chạy lại trên thư mục không đổi thì không decode gì
+
+Dùng như công cụ QA:
+    python -m app.core.silence_analysis <thư mục audio> [--json report.json]
+"""
+import os
+import re
+import math
+import json
+import logging
+import argparse
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+try:
+    from app.core.wav_io import read_wav_info
+    from app.core.wav_trim import DEFAULT_THRESHOLD_DB, RMS_WINDOW_MS
+    from app.core.audio_folder_cache import SilenceCache
+    from app.core.audio_probe import AUDIO_EXTENSIONS, get_duration_ms
+except ImportError:
+    from core.wav_io import read_wav_info
+    from core.wav_trim import DEFAULT_THRESHOLD_DB, RMS_WINDOW_MS
+    from core.audio_folder_cache import SilenceCache
+    from core.audio_probe import AUDIO_EXTENSIONS, get_duration_ms
+
+try:
+    from app.core.ffmpeg_helper import FFMPEG_PATH
+except ImportError:
+    try:
+        from core.ffmpeg_helper import FFMPEG_PATH
+    except ImportError:
+        FFMPEG_PATH = 'ffmpeg'
+
+# Khoảng lặng giữa ngắn hơn mức này không được lưu (truy vấn min_silence_ms nhỏ hơn sẽ thiếu)
+MIN_GAP_MS = 50
+
+# ffmpeg: khoảng lặng bắt đầu trong khoảng này tính là khoảng lặng đầu (như trim_silence_advanced)
+LEADING_TOLERANCE_MS = 200
+
+# Mức dB cho file im lặng tuyệt đối (tránh -inf trong JSON)
+SILENT_DB = -120.0
+
+# Số cửa sổ RMS đọc mỗi lần khi quét cả file
+ANALYZE_BLOCK_WINDOWS = 2000
+
+
+class SilenceInfo(NamedTuple):
+    threshold_db: float
+    duration_ms: int
+    leading_ms: int                       # Khoảng lặng đầu (0 nếu file bắt đầu bằng tiếng)
+    trailing_ms: int                      # Khoảng lặng cuối
+    gaps: Tuple[Tuple[int, int], ...]     # Khoảng lặng giữa (start_ms, end_ms), >= MIN_GAP_MS
+    peak_db: float
+    rms_db: float
+
+    @property
+    def is_silent(self) -> bool:
+        return self.leading_ms >= self.duration_ms
+
+    @property
+    def speech_end_ms(self) -> int:
+        """Thời điểm hết tiếng (bỏ khoảng lặng cuối)"""
+        return max(0, self.duration_ms - self.trailing_ms)
+
+    def intervals(self, min_silence_ms: int = 100) -> List[Tuple[float, float, float]]:
+        """Danh sách (start, end, duration) theo giây, cùng dạng với ffmpeg silencedetect"""
+        spans = []
+        if self.is_silent:
+            spans.append((0, self.duration_ms))
+        else:
+            if self.leading_ms:
+                spans.append((0, self.leading_ms))
+            spans.extend(self.gaps)
+            if self.trailing_ms:
+                spans.append((self.duration_ms - self.trailing_ms, self.duration_ms))
+        return [(s / 1000, e / 1000, (e - s) / 1000) for s, e in spans if e - s >= min_silence_ms]
+
+    def after_leading_cut(self, cut_ms: int) -> "SilenceInfo":
+        """Kết quả tương ứng sau khi cắt cut_ms đầu file (không phải phân tích lại)"""
+        duration = max(0, self.duration_ms - cut_ms)
+        gaps = tuple((s - cut_ms, e - cut_ms) for s, e in self.gaps if s >= cut_ms)
+        # Phần bị cắt là khoảng lặng -> năng lượng coi như 0, RMS tăng theo tỉ lệ độ dài
+        rms_db = self.rms_db
+        if duration and self.rms_db > SILENT_DB:
+            rms_db = round(self.rms_db + 10 * math.log10(self.duration_ms / duration), 2)
+        return self._replace(duration_ms=duration, leading_ms=max(0, self.leading_ms - cut_ms),
+                             trailing_ms=min(self.trailing_ms, duration), gaps=gaps, rms_db=rms_db)
+
+    def to_value(self) -> dict:
+        value = self._asdict()
+        value["gaps"] = [list(g) for g in self.gaps]
+        return value
+
+    @classmethod
+    def from_value(cls, value: dict) -> "SilenceInfo":
+        return cls(value["threshold_db"], value["duration_ms"], value["leading_ms"], value["trailing_ms"],
+                   tuple(tuple(g) for g in value["gaps"]), value["peak_db"], value["rms_db"])
+
+
+def _to_db(ratio: float) -> float:
+    if ratio <= 0:
+        return SILENT_DB
+    return round(max(SILENT_DB, 20 * math.log10(ratio)), 2)
+
+
+def _analyze_wav(path: str, info, threshold_db: float, window_ms: int = RMS_WINDOW_MS) -> SilenceInfo:
+    """Quét cả file PCM 16-bit theo khối: cờ im lặng cho từng cửa sổ + peak + tổng bình phương"""
+    ch = info.channels
+    window = max(1, info.sample_rate * window_ms // 1000)
+    # Ngưỡng theo trung bình bình phương (cùng ngưỡng với find_leading_silence_frames)
+    limit = (32768.0 * 10 ** (threshold_db / 20.0)) ** 2
+    block_frames = window * ANALYZE_BLOCK_WINDOWS
+
+    flags = []
+    peak = 0
+    sum_sq = 0.0
+    with open(path, 'rb') as f:
+        f.seek(info.data_offset)
+        pos = 0
+        while pos < info.frames:
+            count = min(block_frames, info.frames - pos)
+            pcm = np.fromfile(f, dtype='<i2', count=count * ch)
+            frames = len(pcm) // ch
+            if frames == 0:
+                break
+            sq = np.square(pcm[:frames * ch].astype(np.float64))
+            sum_sq += float(sq.sum())
+            peak = max(peak, int(np.abs(pcm[:frames * ch].astype(np.int32)).max()))
+            n = frames // window
+            if n:
+                flags.append(sq[:n * window * ch].reshape(n, -1).mean(axis=1) <= limit)
+            if frames > n * window:
+                # Cửa sổ lẻ cuối file
+                flags.append(np.array([sq[n * window * ch:].mean() <= limit]))
+            pos += frames
+
+    total_frames = pos
+    rate = info.sample_rate
+
+    def ms(frame):
+        return min(frame, total_frames) * 1000 // rate
+
+    duration = ms(total_frames)
+    silent = np.concatenate(flags) if flags else np.zeros(0, dtype=bool)
+    n_windows = len(silent)
+    edges = np.diff(np.concatenate(([0], silent.astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+
+    leading = trailing = 0
+    gaps = []
+    for s, e in zip(starts.tolist(), ends.tolist()):
+        start_ms, end_ms = ms(s * window), ms(e * window)
+        if s == 0:
+            leading = end_ms
+        if e == n_windows:
+            trailing = duration - start_ms
+        if s != 0 and e != n_windows and end_ms - start_ms >= MIN_GAP_MS:
+            gaps.append((start_ms, end_ms))
+
+    samples = total_frames * ch
+    rms = math.sqrt(sum_sq / samples) / 32768.0 if samples else 0.0
+    return SilenceInfo(threshold_db, duration, leading, trailing, tuple(gaps),
+                       _to_db(peak / 32768.0), _to_db(rms))
+
+
+_SILENCE_START_RE = re.compile(r'silence_start: (-?\d+(?:\.\d+)?)')
+_SILENCE_END_RE = re.compile(r'silence_end: (-?\d+(?:\.\d+)?)')
+_VOLUME_RE = re.compile(r'(mean|max)_volume: (-?\d+(?:\.\d+)?|-inf) dB')
+
+
+def parse_silencedetect(output: str) -> Tuple[List[Tuple[float, float]], Optional[float]]:
+    """
+    Đọc stderr của silencedetect -> ([(start, end)] giây, start của khoảng lặng chưa kết thúc ở cuối file)
+    """
+    spans = []
+    current_start = None
+    for line in output.split('\n'):
+        match = _SILENCE_START_RE.search(line)
+        if match:
+            current_start = max(0.0, float(match.group(1)))
+            continue
+        match = _SILENCE_END_RE.search(line)
+        if match and current_start is not None:
+            spans.append((current_start, float(match.group(1))))
+            current_start = None
+    return spans, current_start
+
+
+def _analyze_ffmpeg(path: str, threshold_db: float) -> Optional[SilenceInfo]:
+    cmd = [
+        FFMPEG_PATH, '-hide_banner', '-nostats',
+        '-i', path,
+        '-af', f'silencedetect=noise={threshold_db:g}dB:d={MIN_GAP_MS / 1000:g},volumedetect',
+        '-f', 'null', '-'
+    ]
+    result = subprocess.run(cmd, capture_output=True, text=True, encoding='utf-8', errors='replace')
+    if result.returncode != 0:
+        logging.error(f"Error silencedetect {path}: ffmpeg exit {result.returncode}")
+        return None
+
+    duration = get_duration_ms(path)
+    spans, open_start = parse_silencedetect(result.stderr)
+    if open_start is not None:
+        spans.append((open_start, duration / 1000))
+
+    leading = trailing = 0
+    gaps = []
+    for i, (start_s, end_s) in enumerate(spans):
+        start_ms, end_ms = int(start_s * 1000), min(duration, int(end_s * 1000))
+        if i == 0 and start_ms <= LEADING_TOLERANCE_MS:
+            leading = end_ms
+        elif i == len(spans) - 1 and end_ms >= duration - RMS_WINDOW_MS:
+            trailing = duration - start_ms
+        else:
+            gaps.append((start_ms, end_ms))
+
+    volumes = {}
+    for kind, value in _VOLUME_RE.findall(result.stderr):
+        volumes[kind] = SILENT_DB if value == '-inf' else max(SILENT_DB, float(value))
+    return SilenceInfo(threshold_db, duration, leading, trailing, tuple(gaps),
+                       volumes.get("max", SILENT_DB), volumes.get("mean", SILENT_DB))
+
+
+def _analyze(path: str, threshold_db: float) -> Optional[SilenceInfo]:
+    try:
+        info = read_wav_info(path) if path.lower().endswith('.wav') else None
+        if info is not None and info.is_pcm16:
+            return _analyze_wav(path, info, threshold_db)
+        return _analyze_ffmpeg(path, threshold_db)
+    except Exception as e:
+        logging.error(f"Lỗi phân tích khoảng lặng {os.path.basename(path)}: {e}")
+        return None
+
+
+def cached_silence(path: str, threshold_db: float = DEFAULT_THRESHOLD_DB) -> Optional[SilenceInfo]:
+    """Kết quả đã lưu nếu file chưa đổi (không bao giờ decode)"""
+    value = SilenceCache.for_file(path).get_analysis(path, threshold_db)
+    return SilenceInfo.from_value(value) if value else None
+
+
+def record_silence(path: str, info: SilenceInfo):
+    """Lưu kết quả cho trạng thái hiện tại của file (vd. sau khi cắt tại chỗ)"""
+    SilenceCache.for_file(path).put(path, info.to_value())
+
+
+def analyze_silence(path: str, threshold_db: float = DEFAULT_THRESHOLD_DB,
+                    use_cache: bool = True, save: bool = False) -> Optional[SilenceInfo]:
+    """
+    Phân tích 1 file (cache -> NumPy cho WAV PCM16 -> ffmpeg).
+    Mặc định chỉ cập nhật cache trong RAM (caller hàng loạt save 1 lần, còn lại ghi khi thoát);
+    save=True: ghi sidecar ngay.
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    cache = SilenceCache.for_file(path) if use_cache else None
+    if cache is not None:
+        value = cache.get_analysis(path, threshold_db, st)
+        if value:
+            return SilenceInfo.from_value(value)
+
+    info = _analyze(path, threshold_db)
+    if info is not None and cache is not None:
+        # stat trước khi phân tích: file bị ghi trong lúc đó thì entry tự hết hạn
+        cache.put(path, info.to_value(), st)
+        if save:
+            cache.save()
+    return info
+
+
+def analyze_files(paths: Iterable[str], threshold_db: float = DEFAULT_THRESHOLD_DB,
+                  max_workers: Optional[int] = None, use_cache: bool = True) -> Dict[str, SilenceInfo]:
+    """Phân tích nhiều file song song; file đã có trong cache không đọc lại. File lỗi không có trong kết quả"""
+    paths = list(dict.fromkeys(paths))
+    if not paths:
+        return {}
+    workers = max(1, min(len(paths), max_workers or os.cpu_count() or 1))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        infos = list(executor.map(lambda p: analyze_silence(p, threshold_db, use_cache, save=False), paths))
+    if use_cache:
+        for folder in {os.path.dirname(os.path.abspath(p)) for p in paths}:
+            SilenceCache.for_folder(folder).save()
+    return {p: info for p, info in zip(paths, infos) if info is not None}
+
+
+def list_audio_files(audio_dir: str) -> List[str]:
+    with os.scandir(audio_dir) as it:
+        return sorted(e.path for e in it if e.is_file() and e.name.lower().endswith(AUDIO_EXTENSIONS))
+
+
+def silence_report(infos: Dict[str, SilenceInfo], leading_limit_ms: int = 200, trailing_limit_ms: int = 500,
+                   gap_limit_ms: int = 1000, clip_db: float = -0.1, quiet_db: float = -35.0) -> dict:
+    """Báo cáo QA: các file im lặng, lặng đầu/cuối dài, có khoảng ngắt dài, bị clip hoặc quá nhỏ"""
+    report = {"files": len(infos), "silent": [], "long_leading": [], "long_trailing": [],
+              "long_gaps": [], "clipped": [], "quiet": []}
+    for path, info in sorted(infos.items()):
+        name = os.path.basename(path)
+        if info.is_silent:
+            report["silent"].append(name)
+            continue
+        if info.leading_ms > leading_limit_ms:
+            report["long_leading"].append({"file": name, "ms": info.leading_ms})
+        if info.trailing_ms > trailing_limit_ms:
+            report["long_trailing"].append({"file": name, "ms": info.trailing_ms})
+        longest = max((e - s for s, e in info.gaps), default=0)
+        if longest > gap_limit_ms:
+            report["long_gaps"].append({"file": name, "ms": longest})
+        if info.peak_db >= clip_db:
+            report["clipped"].append({"file": name, "peak_db": info.peak_db})
+        if info.rms_db < quiet_db:
+            report["quiet"].append({"file": name, "rms_db": info.rms_db})
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Phân tích khoảng lặng / âm lượng thư mục audio (QA)")
+    parser.add_argument("audio_dir")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD_DB, help="Ngưỡng im lặng (dBFS)")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--no-cache", action="store_true", help="Phân tích lại toàn bộ")
+    parser.add_argument("--json", help="Ghi report JSON")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    infos = analyze_files(list_audio_files(args.audio_dir), args.threshold, args.workers,
+                          use_cache=not args.no_cache)
+    report = silence_report(infos)
+    print(f"{report['files']} files | silent {len(report['silent'])} | "
+          f"leading > 200ms {len(report['long_leading'])} | trailing > 500ms {len(report['long_trailing'])} | "
+          f"gaps > 1s {len(report['long_gaps'])} | clipped {len(report['clipped'])} | quiet {len(report['quiet'])}")
+    for key in ("silent", "long_leading", "long_trailing", "long_gaps", "clipped", "quiet"):
+        for item in report[key]:
+            print(f"  [{key}] {item}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,354 @@
+"""
+SRT Batch - Chạy các công cụ SRT (srt_funtion) hàng loạt không cần GUI
+
+Ví dụ:
+    python -m app.core.srt_batch scale "season1/*.srt" --factor 1.2 -o out/
+    python -m app.core.srt_batch extract --manifest files.txt
+    python -m app.core.srt_batch convert "txt/*.txt" --template-dir srt/
+    python -m app.core.srt_batch split "*.txt" --lines 100 --report report.json
+
+Manifest: mỗi dòng 1 đường dẫn (dòng trống / bắt đầu bằng '#' bị bỏ qua).
+Với convert có thể ghi "txt_path<TAB>template_path" trên cùng 1 dòng.
+Tên file output giống tab SRT: <stem>.txt, <stem>_converted.srt,
+<stem>_formatted.txt, <stem>_x<factor>.srt, thư mục <stem>_parts.
+Với -o, cây thư mục của input (tính từ thư mục chung của mọi input) được giữ nguyên
+trong thư mục output -> a/ep.srt và b/ep.srt không ghi đè nhau.
+"""
+import os
+import sys
+import glob
+import json
+import time
+import logging
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional
+
+try:
+    from app.core import srt_funtion
+except ImportError:
+    from core import srt_funtion
+
+OPERATIONS = ("extract", "convert", "format", "split", "scale")
+
+
+class BatchJob(NamedTuple):
+    op: str
+    input_path: str
+    output_path: str
+    options: Dict
+
+
+class BatchResult(NamedTuple):
+    input_path: str
+    output_path: str
+    success: bool
+    count: int
+    seconds: float
+    error: str
+
+
+class _ErrorCapture(logging.Handler):
+    """Giữ lại các log ERROR trong lúc chạy 1 job để đưa vào báo cáo"""
+    def __init__(self):
+        super().__init__(logging.ERROR)
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+def _call_operation(job: BatchJob):
+    opts = job.options
+    if job.op == "extract":
+        return srt_funtion.extract_srt_captions(job.input_path, job.output_path)
+    if job.op == "convert":
+        return srt_funtion.convert_txt_to_srt_using_template(job.input_path, opts["template"], job.output_path)
+    if job.op == "format":
+        return srt_funtion.format_txt_file(job.input_path, job.output_path,
+                                           delimiter=opts["delimiter"],
+                                           remove_extra_spaces=opts["remove_extra_spaces"])
+    if job.op == "split":
+        return srt_funtion.split_text_file(job.input_path, job.output_path,
+                                           split_by_lines=opts["split_by_lines"], value=opts["value"])
+    if job.op == "scale":
+        return srt_funtion.scale_srt_speed(job.input_path, job.output_path, opts["factor"])
+    raise ValueError(f"Operation không hỗ trợ: {job.op}")
+
+
+def run_job(job: BatchJob) -> BatchResult:
+    """Chạy 1 job (gọi được trong process con)"""
+    capture = _ErrorCapture()
+    logger = logging.getLogger()
+    logger.addHandler(capture)
+    start = time.perf_counter()
+    try:
+        result = _call_operation(job)
+        # Các hàm trả về bool hoặc (bool, count)
+        if isinstance(result, tuple):
+            success, count = bool(result[0]), int(result[1])
+        else:
+            success, count = bool(result), 0
+        error = "" if success else ("; ".join(capture.messages) or "Thất bại (không rõ lỗi)")
+    except Exception as e:
+        success, count, error = False, 0, str(e)
+    finally:
+        logger.removeHandler(capture)
+    return BatchResult(job.input_path, job.output_path, success, count,
+                       time.perf_counter() - start, error)
+
+
+# ============================================================================
+# DỰNG DANH SÁCH JOB
+# ============================================================================
+
+def expand_inputs(patterns: List[str], manifest: Optional[str] = None) -> List[List[str]]:
+    """Mở rộng glob + đọc manifest -> danh sách [path] hoặc [path, template] (giữ thứ tự, bỏ trùng)"""
+    entries = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern, recursive=True))
+        if not matches and os.path.isfile(pattern):
+            matches = [pattern]
+        if not matches:
+            logging.warning(f"Không có file nào khớp: {pattern}")
+        entries.extend([m] for m in matches)
+
+    if manifest:
+        with open(manifest, "r", encoding="utf-8-sig") as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                entries.append([p.strip() for p in line.split("\t") if p.strip()])
+
+    seen = set()
+    unique = []
+    for entry in entries:
+        key = tuple(os.path.abspath(p) for p in entry)
+        if key not in seen:
+            seen.add(key)
+            unique.append(entry)
+    return unique
+
+
+def _common_input_dir(input_paths: List[str]) -> Optional[str]:
+    """Thư mục chung của mọi input (None nếu khác ổ đĩa trên Windows)"""
+    dirs = [os.path.dirname(os.path.abspath(p)) for p in input_paths]
+    if not dirs:
+        return None
+    try:
+        return os.path.commonpath(dirs)
+    except ValueError:
+        return None
+
+
+def _output_path(op: str, input_path: str, output_dir: Optional[str], options: Dict,
+                 input_root: Optional[str] = None) -> str:
+    input_dir = os.path.dirname(os.path.abspath(input_path))
+    if output_dir is None:
+        out_dir = input_dir
+    elif input_root is None:
+        out_dir = output_dir
+    else:
+        # Giữ thư mục con tương đối so với thư mục chung của các input
+        out_dir = os.path.normpath(os.path.join(output_dir, os.path.relpath(input_dir, input_root)))
+    stem = Path(input_path).stem
+    if op == "extract":
+        name = f"{stem}.txt"
+    elif op == "convert":
+        name = f"{stem}_converted.srt"
+    elif op == "format":
+        name = f"{stem}_formatted.txt"
+    elif op == "scale":
+        name = f"{stem}_x{options['factor']}.srt"
+    else:
+        name = f"{stem}_parts"
+    return os.path.join(out_dir, name)
+
+
+def _find_template(txt_path: str, template: Optional[str], template_dir: Optional[str]) -> Optional[str]:
+    if template:
+        return template
+    if template_dir:
+        candidate = os.path.join(template_dir, Path(txt_path).stem + ".srt")
+        if os.path.exists(candidate):
+            return candidate
+    return None
+
+
+def build_jobs(op: str, entries: List[List[str]], output_dir: Optional[str] = None,
+               options: Optional[Dict] = None, template: Optional[str] = None,
+               template_dir: Optional[str] = None) -> List[BatchJob]:
+    """
+    Tạo danh sách BatchJob. File convert không tìm được template sẽ bị bỏ qua (log warning).
+    ValueError nếu 2 input cho ra cùng 1 output (vd. ep.srt và ep.SRT cùng thư mục).
+    """
+    options = dict(options or {})
+    input_root = _common_input_dir([entry[0] for entry in entries]) if output_dir else None
+    jobs = []
+    for entry in entries:
+        input_path = entry[0]
+        job_options = options
+        if op == "convert":
+            tpl = entry[1] if len(entry) > 1 else _find_template(input_path, template, template_dir)
+            if not tpl:
+                logging.warning(f"Không tìm thấy template cho: {input_path}")
+                continue
+            job_options = dict(options, template=tpl)
+        output_path = _output_path(op, input_path, output_dir, options, input_root)
+        jobs.append(BatchJob(op, input_path, output_path, job_options))
+    _check_duplicate_outputs(jobs)
+    return jobs
+
+
+def _check_duplicate_outputs(jobs: List[BatchJob]):
+    """Không cho 2 job ghi cùng 1 output (job sau sẽ ghi đè âm thầm kết quả job trước)"""
+    owners = {}
+    duplicates = []
+    for job in jobs:
+        key = os.path.normcase(os.path.abspath(job.output_path))
+        if key in owners:
+            duplicates.append(f"{owners[key]} & {job.input_path} -> {job.output_path}")
+        else:
+            owners[key] = job.input_path
+    if duplicates:
+        raise ValueError("Nhiều input ghi trùng output:\n  " + "\n  ".join(duplicates))
+
+
+# ============================================================================
+# CHẠY SONG SONG
+# ============================================================================
+
+def run_batch(jobs: List[BatchJob], workers: Optional[int] = None, progress_callback=None) -> Dict:
+    """
+    Chạy các job trên process pool (mặc định = số core).
+    progress_callback(done, total, result) được gọi sau mỗi file.
+    Trả về báo cáo: tổng số, thành công, thất bại, thời gian, throughput, chi tiết từng file.
+    """
+    workers = max(1, workers or os.cpu_count() or 1)
+    workers = min(workers, max(1, len(jobs)))
+    total_bytes = sum(os.path.getsize(j.input_path) for j in jobs if os.path.exists(j.input_path))
+
+    for job in jobs:
+        if job.output_path and job.op != "split":
+            os.makedirs(os.path.dirname(os.path.abspath(job.output_path)), exist_ok=True)
+
+    results: List[Optional[BatchResult]] = [None] * len(jobs)
+    done = 0
+    start = time.perf_counter()
+
+    def on_done(i, result):
+        nonlocal done
+        results[i] = result
+        done += 1
+        if progress_callback:
+            progress_callback(done, len(jobs), result)
+
+    if workers == 1:
+        for i, job in enumerate(jobs):
+            on_done(i, run_job(job))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(run_job, job): i for i, job in enumerate(jobs)}
+            for future in as_completed(futures):
+                i = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    job = jobs[i]
+                    result = BatchResult(job.input_path, job.output_path, False, 0, 0.0, str(e))
+                on_done(i, result)
+
+    elapsed = time.perf_counter() - start
+    succeeded = [r for r in results if r.success]
+    failed = [r for r in results if not r.success]
+    return {
+        "operation": jobs[0].op if jobs else None,
+        "workers": workers,
+        "total": len(jobs),
+        "succeeded": len(succeeded),
+        "failed": len(failed),
+        "elapsed_seconds": round(elapsed, 3),
+        "files_per_second": round(len(jobs) / elapsed, 2) if elapsed > 0 else 0.0,
+        "mb_per_second": round(total_bytes / (1024 * 1024) / elapsed, 2) if elapsed > 0 else 0.0,
+        "failures": [{"input": r.input_path, "error": r.error} for r in failed],
+        "results": [r._asdict() for r in results],
+    }
+
+
+def print_report(report: Dict):
+    print(f"\n=== {report['operation']}: {report['succeeded']}/{report['total']} thành công "
+          f"({report['workers']} workers) ===")
+    print(f"Thời gian: {report['elapsed_seconds']}s | "
+          f"{report['files_per_second']} file/s | {report['mb_per_second']} MB/s")
+    if report["failures"]:
+        print(f"Lỗi ({report['failed']}):")
+        for failure in report["failures"]:
+            print(f"  - {failure['input']}: {failure['error']}")
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Chạy công cụ SRT hàng loạt (song song)")
+    parser.add_argument("operation", choices=OPERATIONS)
+    parser.add_argument("inputs", nargs="*", help="File hoặc glob (vd: 'subs/**/*.srt')")
+    parser.add_argument("--manifest", help="File danh sách đường dẫn (mỗi dòng 1 file)")
+    parser.add_argument("-o", "--output-dir", help="Thư mục output (mặc định: cạnh file input)")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="Số process (mặc định: số core)")
+    parser.add_argument("--report", help="Ghi báo cáo JSON ra file")
+    # Tuỳ chọn theo operation
+    parser.add_argument("--factor", type=float, default=1.2, help="scale: hệ số (1.2 = chậm 20%%)")
+    parser.add_argument("--template", help="convert: 1 file SRT template dùng cho mọi TXT")
+    parser.add_argument("--template-dir", help="convert: thư mục chứa template <stem>.srt")
+    parser.add_argument("--delimiter", default="|", help="format: ký tự tách dòng")
+    parser.add_argument("--keep-spaces", action="store_true", help="format: giữ khoảng trắng thừa")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--lines", type=int, help="split: số dòng mỗi file (mặc định 100)")
+    group.add_argument("--parts", type=int, help="split: số phần")
+    return parser
+
+
+def main(argv=None) -> int:
+    args = _build_parser().parse_args(argv)
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s: %(message)s')
+
+    entries = expand_inputs(args.inputs, args.manifest)
+    if not entries:
+        print("Không có file input nào.")
+        return 2
+
+    options = {}
+    if args.operation == "scale":
+        options["factor"] = args.factor
+    elif args.operation == "format":
+        options.update(delimiter=args.delimiter, remove_extra_spaces=not args.keep_spaces)
+    elif args.operation == "split":
+        options.update(split_by_lines=args.parts is None,
+                       value=args.parts if args.parts is not None else (args.lines or 100))
+
+    try:
+        jobs = build_jobs(args.operation, entries, args.output_dir, options,
+                          template=args.template, template_dir=args.template_dir)
+    except ValueError as e:
+        print(e)
+        return 2
+    if not jobs:
+        print("Không có job nào để chạy.")
+        return 2
+
+    def progress(done, total, result):
+        status = "OK " if result.success else "ERR"
+        print(f"[{done}/{total}] {status} {result.input_path} ({result.seconds:.2f}s)")
+
+    report = run_batch(jobs, args.workers, progress_callback=progress)
+    print_report(report)
+
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    return 0 if report["failed"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,6 +3,15 @@ import re
 import math
 import logging
 
+try:
+    from app.core.srt_parser import parse_srt_table, iter_srt_cues
+    from app.core.cue_columns import scale_srt_file
+    from app.core.subtitle_writer import write_srt, write_txt
+except ImportError:
+    from core.srt_parser import parse_srt_table, iter_srt_cues
+    from core.cue_columns import scale_srt_file
+    from core.subtitle_writer import write_srt, write_txt
+
 # 1. Extract Captions (SRT to TXT)
 def extract_srt_captions(input_srt_path, output_txt_path):
     logging.info(f"Bắt đầu Extract Caption: {os.path.basename(input_srt_path)}")
@@ -10,33 +19,11 @@ def extract_srt_captions(input_srt_path, output_txt_path):
         raise FileNotFoundError(f"File không tồn tại: {input_srt_path}")
 
     try:
-        with open(input_srt_path, "r", encoding="utf-8") as f:
-            content = f.read()
-
-        blocks = re.split(r'\n\s*\n', content.strip())
-        captions = []
-
-        for block in blocks:
-            lines = block.strip().split("\n")
-            timestamp_idx = -1
-            for idx, line in enumerate(lines):
-                if "-->" in line:
-                    timestamp_idx = idx
-                    break
-            
-            if timestamp_idx != -1 and len(lines) > timestamp_idx + 1:
-                text_content = " ".join(lines[timestamp_idx+1:])
-                captions.append(text_content)
-            elif len(lines) >= 3:
-                 text_content = " ".join(lines[2:])
-                 captions.append(text_content)
-
-        with open(output_txt_path, "w", encoding="utf-8") as f:
-            for c in captions:
-                f.write(c + "\n")
+        captions = (t for t in parse_srt_table(input_srt_path).texts(line_sep=" ") if t)
+        count = write_txt(output_txt_path, captions)
 
-        logging.info(f"Extract thành công: {len(captions)} lines -> {output_txt_path}")
-        return True, len(captions)
+        logging.info(f"Extract thành công: {count} lines -> {output_txt_path}")
+        return True, count
 
     except Exception as e:
         logging.error(f"Lỗi extract_srt_captions: {e}")
@@ -46,40 +33,17 @@ def extract_srt_captions(input_srt_path, output_txt_path):
 def convert_txt_to_srt_using_template(txt_path, srt_template_path, output_srt_path):
     logging.info(f"Bắt đầu Convert SRT: {os.path.basename(txt_path)}")
     try:
-        with open(txt_path, "r", encoding="utf-8") as f:
-            txt_lines = [l.strip() for l in f if l.strip()]
-
-        with open(srt_template_path, "r", encoding="utf-8") as f:
-            srt_content = f.read()
-
-        pattern = r"(\d+)\s*\n(\d{2}:\d{2}:\d{2},\d{3}\s*-->\s*\d{2}:\d{2}:\d{2},\d{3})\s*\n((?:(?!\n\d+\n\d{2}:\d{2}:\d{2},\d{3}).)*)"
-        blocks = re.findall(pattern, srt_content, re.DOTALL)
-        
-        if not blocks:
-             logging.warning("Regex không bắt được cấu trúc chuẩn, thử fallback parsing...")
-             raw_blocks = re.split(r'\n\s*\n', srt_content.strip())
-             parsed_blocks = []
-             for b in raw_blocks:
-                 lines = b.strip().split('\n')
-                 if len(lines) >= 2:
-                     if "-->" in lines[1]:
-                         parsed_blocks.append((lines[0], lines[1]))
-                     elif "-->" in lines[0]: 
-                         parsed_blocks.append(("", lines[0]))
-             blocks = parsed_blocks
-
-        count = min(len(txt_lines), len(blocks))
-        new_content = ""
-
-        for i in range(count):
-            seq_num = blocks[i][0]
-            if not seq_num: seq_num = str(i+1)
-            timing = blocks[i][1]
-            text = txt_lines[i]
-            new_content += f"{seq_num}\n{timing}\n{text}\n\n"
-
-        with open(output_srt_path, "w", encoding="utf-8") as f:
-            f.write(new_content)
+        # Stream song song: dòng TXT thứ i thay text của cue thứ i trong template
+        cues = iter_srt_cues(srt_template_path)
+        try:
+            with open(txt_path, "r", encoding="utf-8") as f:
+                txt_lines = (l.strip() for l in f if l.strip())
+                count = write_srt(output_srt_path, (
+                    (cue.index, cue.start_ms, cue.end_ms, text)
+                    for cue, text in zip(cues, txt_lines)
+                ))
+        finally:
+            cues.close()
 
         logging.info(f"Convert thành công: {count} lines -> {output_srt_path}")
         return True, count
@@ -120,35 +84,12 @@ def format_txt_file(file_path, output_path=None, delimiter="|", remove_extra_spa
         return False
 
 # 4. Scale Speed (Chỉnh tốc độ SRT)
-def parse_time(time_str):
-    h, m, s, ms = map(int, re.split('[:,]', time_str))
-    return (h*3600 + m*60 + s) * 1000000 + ms * 1000
-
-def format_time(micros):
-    total_ms = int(micros / 1000)
-    ms = total_ms % 1000
-    s = (total_ms // 1000) % 60
-    m = (total_ms // 60000) % 60
-    h = (total_ms // 3600000)
-    return f"{h:02d}:{m:02d}:{s:02d},{ms:03d}"
-
 def scale_srt_speed(input_path, output_path, factor):
     logging.info(f"Scale Speed (x{factor}): {os.path.basename(input_path)}")
     try:
-        with open(input_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-
-        pattern = r'(\d{2}:\d{2}:\d{2},\d{3})\s*-->\s*(\d{2}:\d{2}:\d{2},\d{3})'
-
-        def replace_func(match):
-            start_str, end_str = match.groups()
-            new_start = parse_time(start_str) * factor
-            new_end = parse_time(end_str) * factor
-            return f"{format_time(new_start)} --> {format_time(new_end)}"
-
-        new_content = re.sub(pattern, replace_func, content)
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write(new_content)
+        # Scale trên mảng NumPy thay vì re.sub callback cho từng timestamp,
+        # chỉ thay timestamp -> text / số thứ tự / dòng trống giữ nguyên như cũ
+        scale_srt_file(input_path, output_path, factor)
 
         logging.info(f"Scale thành công -> {output_path}")
         return True
@@ -0,0 +1,210 @@
+"""
+SRT Parser - Bộ parse SRT dùng chung cho toàn bộ app
+Đọc file theo từng dòng (streaming) và trả về một bảng cue gọn (CueTable)
+gồm index, start_ms, end_ms và offset text trong một chuỗi text chung.
+"""
+import re
+import logging
+from array import array
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+
+class Cue(NamedTuple):
+    """Một dòng phụ đề (text nhiều dòng được nối bằng '\\n')"""
+    index: int
+    start_ms: int
+    end_ms: int
+    text: str
+
+    @property
+    def duration_ms(self) -> int:
+        return self.end_ms - self.start_ms
+
+
+class CueTable:
+    """
+    Bảng cue dạng cột:
+    - indices / starts / ends: array('q')
+    - text_offsets: array('q') dài n+1, text của cue i = text_blob[off[i]:off[i+1]]
+    """
+    __slots__ = ("indices", "starts", "ends", "text_offsets", "text_blob", "source_path")
+
+    def __init__(self, indices=None, starts=None, ends=None, text_offsets=None,
+                 text_blob: str = "", source_path: Optional[str] = None):
+        self.indices = indices if indices is not None else array('q')
+        self.starts = starts if starts is not None else array('q')
+        self.ends = ends if ends is not None else array('q')
+        self.text_offsets = text_offsets if text_offsets is not None else array('q', [0])
+        self.text_blob = text_blob
+        self.source_path = source_path
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def __iter__(self) -> Iterator[Cue]:
+        for i in range(len(self.starts)):
+            yield self.cue(i)
+
+    def __repr__(self) -> str:
+        return f"CueTable({len(self)} cues, source={self.source_path!r})"
+
+    def text(self, i: int) -> str:
+        """Text của cue thứ i (0-based)"""
+        return self.text_blob[self.text_offsets[i]:self.text_offsets[i + 1]]
+
+    def texts(self, line_sep: str = "\n") -> List[str]:
+        """Danh sách text của mọi cue, các dòng trong 1 cue nối bằng line_sep"""
+        off = self.text_offsets
+        blob = self.text_blob
+        result = [blob[off[i]:off[i + 1]] for i in range(len(self.starts))]
+        if line_sep != "\n":
+            result = [t.replace("\n", line_sep) for t in result]
+        return result
+
+    def cue(self, i: int) -> Cue:
+        return Cue(self.indices[i], self.starts[i], self.ends[i], self.text(i))
+
+    @property
+    def last_end_ms(self) -> int:
+        return self.ends[-1] if len(self.ends) else 0
+
+    @property
+    def nbytes(self) -> int:
+        """Ước lượng bộ nhớ đang dùng (bytes)"""
+        arrays = (self.indices, self.starts, self.ends, self.text_offsets)
+        return sum(a.itemsize * len(a) for a in arrays) + len(self.text_blob) * 2
+
+
+def srt_time_to_ms(time_str: str) -> int:
+    """Chuyển 00:00:01,500 (hoặc 00:00:01.500) thành milliseconds"""
+    value = time_str.strip()
+    hms, sep, frac = value.replace('.', ',').partition(',')
+    parts = hms.split(':')
+    if len(parts) == 3:
+        hours, minutes, seconds = parts
+    elif len(parts) == 2:
+        hours, (minutes, seconds) = 0, parts
+    else:
+        raise ValueError(f"Timestamp SRT không hợp lệ: {time_str!r}")
+
+    millis = int(frac[:3].ljust(3, '0')) if sep and frac else 0
+    return (int(hours) * 3600000 +
+            int(minutes) * 60000 +
+            int(seconds) * 1000 +
+            millis)
+
+
+# Fast path cho dòng timing chuẩn (đa số trường hợp)
+_TIMING_RE = re.compile(
+    r'\s*(\d+):(\d{2}):(\d{2})[,.](\d{3})\s*-->\s*(\d+):(\d{2}):(\d{2})[,.](\d{3})'
+)
+
+
+def parse_timing_line(line: str) -> Tuple[int, int]:
+    """Parse dòng '00:00:01,500 --> 00:00:03,000' -> (start_ms, end_ms)"""
+    m = _TIMING_RE.match(line)
+    if m:
+        h1, m1, s1, ms1, h2, m2, s2, ms2 = map(int, m.groups())
+        return ((h1 * 3600 + m1 * 60 + s1) * 1000 + ms1,
+                (h2 * 3600 + m2 * 60 + s2) * 1000 + ms2)
+
+    left, _, right = line.partition('-->')
+    # Bỏ phần toạ độ phía sau (vd: "00:00:03,000 X1:100 X2:200")
+    right_parts = right.split()
+    if not right_parts:
+        raise ValueError(f"Thiếu thời gian kết thúc: {line!r}")
+    return srt_time_to_ms(left), srt_time_to_ms(right_parts[0])
+
+
+def iter_srt_lines(lines: Iterable[str]) -> Iterator[Cue]:
+    """
+    Máy trạng thái đọc SRT theo từng dòng, yield từng Cue.
+    - Block ngăn cách bởi dòng trống
+    - Index lấy từ dòng ngay trước dòng timing (nếu không phải số thì đánh số tự động)
+    - Block có timing lỗi sẽ bị bỏ qua (log warning)
+    - Thiếu dòng trống giữa 2 block: dòng text cuối chỉ gồm chữ số được coi là index
+      của block mới khi nó đúng bằng index hiện tại + 1; ngược lại giữ làm text
+      (vd. cue có text "100"). Còn 1 trường hợp mơ hồ: text đúng bằng index kế tiếp
+      và block sau thiếu cả dòng index -> dòng đó bị hiểu là index.
+    - BOM đầu dòng (file ghép, đọc bằng utf-8 thay vì utf-8-sig) được bỏ qua
+    """
+    count = 0
+    prev_line = None      # Dòng cuối cùng trước dòng timing trong block hiện tại
+    timing = None         # (start_ms, end_ms) của block hiện tại
+    index = 0
+    text_lines = []
+    skip_block = False
+
+    def make_index(candidate):
+        if candidate is not None and candidate.isdigit():
+            return int(candidate)
+        return count + 1
+
+    for raw in lines:
+        line = raw.strip().lstrip('\ufeff')
+
+        if not line:
+            if timing is not None:
+                count += 1
+                yield Cue(index, timing[0], timing[1], "\n".join(text_lines))
+            prev_line, timing, text_lines, skip_block = None, None, [], False
+            continue
+
+        if skip_block:
+            continue
+
+        if '-->' in line:
+            if timing is not None:
+                # Thiếu dòng trống giữa 2 block: dòng số cuối cùng là index của block mới
+                # (chỉ khi đúng là index kế tiếp, không thì là text chỉ gồm chữ số)
+                next_index_line = None
+                if text_lines and text_lines[-1].isdigit() and int(text_lines[-1]) == index + 1:
+                    next_index_line = text_lines.pop()
+                count += 1
+                yield Cue(index, timing[0], timing[1], "\n".join(text_lines))
+                prev_line, timing, text_lines = next_index_line, None, []
+
+            try:
+                timing = parse_timing_line(line)
+            except ValueError as e:
+                logging.warning(f"Lỗi parse block SRT: {prev_line} - {e}")
+                timing, skip_block = None, True
+                continue
+            index = make_index(prev_line)
+        elif timing is None:
+            prev_line = line
+        else:
+            text_lines.append(line)
+
+    if timing is not None:
+        yield Cue(index, timing[0], timing[1], "\n".join(text_lines))
+
+
+def iter_srt_cues(srt_path: str) -> Iterator[Cue]:
+    """Đọc file SRT theo từng dòng và yield từng Cue (không giữ toàn bộ file trong RAM)"""
+    # utf-8-sig: tự bỏ BOM nếu file được lưu từ Notepad
+    with open(srt_path, 'r', encoding='utf-8-sig') as f:
+        yield from iter_srt_lines(f)
+
+
+def build_cue_table(cues: Iterable[Cue], source_path: Optional[str] = None) -> CueTable:
+    """Gom các Cue thành CueTable dạng cột"""
+    indices, starts, ends = array('q'), array('q'), array('q')
+    text_offsets = array('q', [0])
+    text_parts = []
+    offset = 0
+
+    for cue in cues:
+        indices.append(cue.index)
+        starts.append(cue.start_ms)
+        ends.append(cue.end_ms)
+        text_parts.append(cue.text)
+        offset += len(cue.text)
+        text_offsets.append(offset)
+
+    return CueTable(indices, starts, ends, text_offsets, "".join(text_parts), source_path)
+
+
+def parse_srt_table(srt_path: str) -> CueTable:
+    """Parse file SRT thành CueTable (1 lần đọc file duy nhất)"""
+    return build_cue_table(iter_srt_cues(srt_path), source_path=srt_path)
@@ -0,0 +1,373 @@
+"""
+Subtitle Benchmark - Đo tốc độ các hàm parse / convert / scale phụ đề
+
+Sinh corpus SRT/ASS giả lập (cố định seed -> chạy lại ra cùng dữ liệu):
+    - 1k / 10k / 100k cue, text nhiều dòng, xuống dòng CRLF, block lỗi
+Đo các hàm trong srt_funtion, tts_funtion, auto_funtion, caption_funtion,
+v7_funtion (module nào không import được thì ghi vào "skipped").
+
+Ví dụ:
+    python -m app.core.subtitle_benchmark --sizes 1000 10000 --repeat 3 --out bench.json
+    python -m app.core.subtitle_benchmark --out new.json --compare old.json
+"""
+import io
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import logging
+import platform
+import argparse
+import tempfile
+import statistics
+import contextlib
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+try:
+    from app.core.utils import milliseconds_to_srt_time
+    from app.core.subtitle_writer import ms_to_ass_time
+    from app.core.ass_converter import render_ass_header, AssStyle
+    from app.core.subtitle_cache import get_subtitle_cache
+except ImportError:
+    from core.utils import milliseconds_to_srt_time
+    from core.subtitle_writer import ms_to_ass_time
+    from core.ass_converter import render_ass_header, AssStyle
+    from core.subtitle_cache import get_subtitle_cache
+
+DEFAULT_SIZES = (1000, 10000, 100000)
+REPORT_VERSION = 1
+
+_WORDS = ("xin", "chào", "các", "bạn", "hôm", "nay", "chúng", "ta", "sẽ", "đi",
+          "the", "quick", "brown", "fox", "jumps", "over", "lazy", "dog", "一", "二")
+
+
+# ============================================================================
+# SINH CORPUS
+# ============================================================================
+
+class CorpusSpec(NamedTuple):
+    name: str
+    cues: int
+    multiline: float = 0.0      # tỉ lệ cue có 2-3 dòng text
+    crlf: bool = False
+    malformed: float = 0.0      # tỉ lệ block có timing lỗi
+
+
+def _random_text(rng: random.Random, lines: int) -> List[str]:
+    return [" ".join(rng.choice(_WORDS) for _ in range(rng.randint(3, 12))) for _ in range(lines)]
+
+
+def _iter_timings(rng: random.Random, count: int):
+    t = 0
+    for _ in range(count):
+        t += rng.randint(0, 800)
+        duration = rng.randint(600, 6000)
+        yield t, t + duration
+        t += duration
+
+
+def generate_srt(path: str, spec: CorpusSpec, seed: int = 1234) -> int:
+    """Ghi file SRT giả lập theo spec, trả về số byte"""
+    rng = random.Random(seed)
+    newline = "\r\n" if spec.crlf else "\n"
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        for i, (start, end) in enumerate(_iter_timings(rng, spec.cues), 1):
+            if spec.malformed and rng.random() < spec.malformed:
+                timing = f"{milliseconds_to_srt_time(start)} --> ??:??"
+            else:
+                timing = f"{milliseconds_to_srt_time(start)} --> {milliseconds_to_srt_time(end)}"
+            lines = rng.randint(2, 3) if rng.random() < spec.multiline else 1
+            f.write(newline.join([str(i), timing, *_random_text(rng, lines)]) + newline * 2)
+    return os.path.getsize(path)
+
+
+def generate_ass(path: str, spec: CorpusSpec, seed: int = 1234) -> int:
+    """Ghi file ASS giả lập theo spec, trả về số byte"""
+    rng = random.Random(seed)
+    newline = "\r\n" if spec.crlf else "\n"
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.write(render_ass_header(AssStyle()).replace("\n", newline))
+        for start, end in _iter_timings(rng, spec.cues):
+            lines = rng.randint(2, 3) if rng.random() < spec.multiline else 1
+            text = "\\N".join(_random_text(rng, lines))
+            f.write(f"Dialogue: 0,{ms_to_ass_time(start)},{ms_to_ass_time(end)},"
+                    f"Default,,0,0,0,,{{\\pos(960,1000)}}{text}{newline}")
+    return os.path.getsize(path)
+
+
+def default_specs(sizes=DEFAULT_SIZES) -> List[CorpusSpec]:
+    specs = []
+    for n in sizes:
+        specs.append(CorpusSpec(f"plain_{n}", n))
+        specs.append(CorpusSpec(f"mixed_{n}", n, multiline=0.3, crlf=True, malformed=0.01))
+    return specs
+
+
+def build_corpus(corpus_dir: str, specs: List[CorpusSpec], seed: int = 1234) -> Dict[str, Dict]:
+    """Sinh SRT + ASS + TXT (cho convert template) cho từng spec"""
+    os.makedirs(corpus_dir, exist_ok=True)
+    corpus = {}
+    for spec in specs:
+        srt_path = os.path.join(corpus_dir, f"{spec.name}.srt")
+        ass_path = os.path.join(corpus_dir, f"{spec.name}.ass")
+        txt_path = os.path.join(corpus_dir, f"{spec.name}.txt")
+        srt_bytes = generate_srt(srt_path, spec, seed)
+        generate_ass(ass_path, spec, seed)
+        rng = random.Random(seed + 1)
+        with open(txt_path, "w", encoding="utf-8") as f:
+            f.writelines(" ".join(_random_text(rng, 1)) + "\n" for _ in range(spec.cues))
+        corpus[spec.name] = {
+            "spec": spec._asdict(), "srt": srt_path, "ass": ass_path, "txt": txt_path,
+            "srt_bytes": srt_bytes,
+        }
+    return corpus
+
+
+# ============================================================================
+# DANH SÁCH HÀM CẦN ĐO
+# ============================================================================
+
+class BenchCase(NamedTuple):
+    module: str
+    function: str
+    run: Callable[[Dict, str], object]   # run(corpus_entry, out_dir)
+
+
+def _out(out_dir: str, name: str) -> str:
+    return os.path.join(out_dir, name)
+
+
+def _import_module(name: str):
+    """Import app.core.<name> (hoặc core.<name>)"""
+    import importlib
+    try:
+        return importlib.import_module(f"app.core.{name}")
+    except ImportError as first_error:
+        try:
+            return importlib.import_module(f"core.{name}")
+        except ImportError:
+            raise first_error
+
+
+def collect_cases(skipped: List[Dict]) -> List[BenchCase]:
+    """Dựng danh sách case; module thiếu dependency được ghi vào skipped"""
+    cases = []
+
+    def load(name):
+        try:
+            return _import_module(name)
+        except Exception as e:
+            skipped.append({"module": name, "reason": f"{type(e).__name__}: {e}"})
+            return None
+
+    parser = load("srt_parser")
+    if parser:
+        cases.append(BenchCase("srt_parser", "parse_srt_table", lambda c, o: parser.parse_srt_table(c["srt"])))
+
+    columns = load("cue_columns")
+    if columns:
+        cases.append(BenchCase("cue_columns", "CueColumns.scale+write_srt",
+                               lambda c, o: columns.CueColumns.from_srt(c["srt"]).scale(1.2)
+                               .write_srt(_out(o, "columns_scaled.srt"))))
+
+    index = load("subtitle_index")
+    if index:
+        cases.append(BenchCase("subtitle_index", "last_end_ms(ass)",
+                               lambda c, o: index.SubtitleIndex(c["ass"]).last_end_ms()))
+        cases.append(BenchCase("subtitle_index", "cue_at(srt, cold)",
+                               lambda c, o: index.SubtitleIndex(c["srt"]).cue_at(60000)))
+
+    srt = load("srt_funtion")
+    if srt:
+        cases += [
+            BenchCase("srt_funtion", "extract_srt_captions",
+                      lambda c, o: srt.extract_srt_captions(c["srt"], _out(o, "srt_extract.txt"))),
+            BenchCase("srt_funtion", "convert_txt_to_srt_using_template",
+                      lambda c, o: srt.convert_txt_to_srt_using_template(c["txt"], c["srt"], _out(o, "srt_convert.srt"))),
+            BenchCase("srt_funtion", "scale_srt_speed",
+                      lambda c, o: srt.scale_srt_speed(c["srt"], _out(o, "srt_scale.srt"), 1.2)),
+        ]
+
+    tts = load("tts_funtion")
+    if tts:
+        cases += [
+            BenchCase("tts_funtion", "parse_srt_file", lambda c, o: tts.parse_srt_file(c["srt"])),
+            BenchCase("tts_funtion", "sort_srt_captions_by_duration",
+                      lambda c, o: tts.sort_srt_captions_by_duration(c["srt"], _out(o, "tts_sort.txt"))),
+        ]
+
+    auto = load("auto_funtion")
+    if auto:
+        cases += [
+            BenchCase("auto_funtion", "extract_text_lines_from_srt",
+                      lambda c, o: auto.extract_text_lines_from_srt(c["srt"])),
+            BenchCase("auto_funtion", "extract_text_from_srt",
+                      lambda c, o: auto.extract_text_from_srt(c["srt"], _out(o, "auto_extract.txt"))),
+            BenchCase("auto_funtion", "convert_txt_to_srt_using_template",
+                      lambda c, o: auto.convert_txt_to_srt_using_template(c["txt"], c["srt"], _out(o, "auto_convert.srt"))),
+            BenchCase("auto_funtion", "scale_srt_timing",
+                      lambda c, o: auto.scale_srt_timing(c["srt"], _out(o, "auto_scale.srt"), 1.2)),
+        ]
+
+    caption = load("caption_funtion")
+    if caption:
+        cases += [
+            BenchCase("caption_funtion", "parse_srt", lambda c, o: caption.parse_srt(c["srt"])),
+            BenchCase("caption_funtion", "convert_srt_to_ass",
+                      lambda c, o: caption.convert_srt_to_ass(c["srt"], _out(o, "caption.ass"))),
+            BenchCase("caption_funtion", "get_sample_caption", lambda c, o: caption.get_sample_caption(c["ass"])),
+            BenchCase("caption_funtion", "get_ass_duration", lambda c, o: caption.get_ass_duration(c["ass"])),
+        ]
+
+    v7 = load("v7_funtion")
+    if v7:
+        cases.append(BenchCase("v7_funtion", "get_srt_timing_points",
+                               lambda c, o: v7.get_srt_timing_points(c["srt"])))
+    return cases
+
+
+# ============================================================================
+# CHẠY ĐO
+# ============================================================================
+
+@contextlib.contextmanager
+def _quiet():
+    """Tắt log warning (block lỗi cố ý) và print debug trong lúc đo"""
+    logger = logging.getLogger()
+    old_level = logger.level
+    logger.setLevel(logging.ERROR)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            yield
+    finally:
+        logger.setLevel(old_level)
+
+
+def _time_case(case: BenchCase, entry: Dict, out_dir: str, repeat: int) -> Dict:
+    cache = get_subtitle_cache()
+    runs = []
+    error = ""
+    for _ in range(repeat):
+        # Đo cold: không dùng cache / sidecar giữa các lần chạy
+        cache.invalidate()
+        start = time.perf_counter()
+        try:
+            with _quiet():
+                case.run(entry, out_dir)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            break
+        runs.append(time.perf_counter() - start)
+
+    cues = entry["spec"]["cues"]
+    result = {"module": case.module, "function": case.function, "corpus": entry["spec"]["name"],
+              "cues": cues, "runs_s": [round(r, 6) for r in runs]}
+    if runs:
+        best = min(runs)
+        result.update(min_s=round(best, 6), median_s=round(statistics.median(runs), 6),
+                      cues_per_s=round(cues / best, 1) if best > 0 else None)
+    if error:
+        result["error"] = error
+    return result
+
+
+def run_benchmark(sizes=DEFAULT_SIZES, repeat: int = 3, corpus_dir: Optional[str] = None,
+                  seed: int = 1234, only: Optional[List[str]] = None) -> Dict:
+    """Sinh corpus, đo mọi case, trả về report dạng dict (JSON được)"""
+    own_dir = corpus_dir is None
+    corpus_dir = corpus_dir or tempfile.mkdtemp(prefix="subtitle_bench_")
+    skipped: List[Dict] = []
+    cache = get_subtitle_cache()
+    old_sidecar = cache.use_sidecar
+    cache.use_sidecar = False
+    try:
+        corpus = build_corpus(corpus_dir, default_specs(sizes), seed)
+        cases = collect_cases(skipped)
+        if only:
+            cases = [c for c in cases if c.module in only or f"{c.module}.{c.function}" in only]
+
+        out_dir = os.path.join(corpus_dir, "out")
+        os.makedirs(out_dir, exist_ok=True)
+        results = []
+        for entry in corpus.values():
+            for case in cases:
+                result = _time_case(case, entry, out_dir, repeat)
+                results.append(result)
+                logging.info(f"{case.module}.{case.function} [{entry['spec']['name']}]: "
+                             f"{result.get('min_s', result.get('error'))}")
+    finally:
+        cache.use_sidecar = old_sidecar
+        if own_dir:
+            shutil.rmtree(corpus_dir, ignore_errors=True)
+
+    return {
+        "report_version": REPORT_VERSION,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "seed": seed,
+        "repeat": repeat,
+        "corpus": {name: {"cues": e["spec"]["cues"], "srt_bytes": e["srt_bytes"], **e["spec"]}
+                   for name, e in corpus.items()},
+        "skipped": skipped,
+        "results": results,
+    }
+
+
+def compare_reports(old: Dict, new: Dict) -> List[Dict]:
+    """So min_s giữa 2 report (ratio > 1 = chậm hơn bản cũ)"""
+    def key(r):
+        return r["module"], r["function"], r["corpus"]
+    old_map = {key(r): r for r in old.get("results", []) if "min_s" in r}
+    rows = []
+    for r in new.get("results", []):
+        prev = old_map.get(key(r))
+        if prev and "min_s" in r and prev["min_s"] > 0:
+            rows.append({"module": r["module"], "function": r["function"], "corpus": r["corpus"],
+                         "old_s": prev["min_s"], "new_s": r["min_s"],
+                         "ratio": round(r["min_s"] / prev["min_s"], 3)})
+    return rows
+
+
+def print_results(report: Dict, comparison: Optional[List[Dict]] = None):
+    for r in report["results"]:
+        value = f"{r['min_s']:.4f}s ({r['cues_per_s']} cue/s)" if "min_s" in r else f"LỖI: {r.get('error')}"
+        print(f"{r['corpus']:>14}  {r['module']}.{r['function']:<40} {value}")
+    for s in report["skipped"]:
+        print(f"Bỏ qua {s['module']}: {s['reason']}")
+    if comparison:
+        print("\nSo với report cũ (ratio > 1 = chậm hơn):")
+        for row in sorted(comparison, key=lambda x: -x["ratio"]):
+            print(f"{row['ratio']:>7}x  {row['corpus']:>14}  {row['module']}.{row['function']}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark hệ thống phụ đề")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--corpus-dir", help="Giữ corpus ở thư mục này (mặc định: thư mục tạm, xoá sau khi chạy)")
+    parser.add_argument("--only", nargs="+", help="Chỉ chạy module hoặc module.function")
+    parser.add_argument("--out", help="Ghi report JSON")
+    parser.add_argument("--compare", help="Report JSON cũ để so sánh")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s: %(message)s')
+
+    report = run_benchmark(args.sizes, args.repeat, args.corpus_dir, args.seed, args.only)
+    comparison = None
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            comparison = compare_reports(json.load(f), report)
+        report["comparison"] = comparison
+
+    print_results(report, comparison)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
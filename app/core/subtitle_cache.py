@@ -0,0 +1,126 @@
+"""
+Subtitle Cache - Cache LRU dùng chung cho các CueTable đã parse
+- Key: (đường dẫn tuyệt đối, mtime_ns, size) -> file đổi là tự parse lại
+- Giới hạn theo bộ nhớ (CueTable.nbytes), bỏ bảng dùng lâu nhất khi vượt
+- Đếm hit / miss để theo dõi hiệu quả
+- Khi miss: đọc sidecar nhị phân (.srt.cues) nếu còn khớp, không thì parse
+CueTable trả về được dùng chung giữa các lần gọi, caller KHÔNG được sửa trực tiếp.
+"""
+import os
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+try:
+    from app.core.srt_parser import CueTable
+    from app.core.cue_sidecar import load_cue_table
+except ImportError:
+    from core.srt_parser import CueTable
+    from core.cue_sidecar import load_cue_table
+
+# Mặc định 64MB (~ vài trăm nghìn cue)
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+CacheKey = Tuple[str, int, int]
+
+
+def file_cache_key(path: str) -> CacheKey:
+    """Key nhận dạng 1 phiên bản của file: (abspath, mtime_ns, size)"""
+    st = os.stat(path)
+    return os.path.abspath(path), st.st_mtime_ns, st.st_size
+
+
+class SubtitleCache:
+    """Cache LRU các CueTable, an toàn khi gọi từ nhiều thread"""
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES, use_sidecar: bool = True):
+        self.max_bytes = max_bytes
+        self.use_sidecar = use_sidecar
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._tables: "OrderedDict[CacheKey, CueTable]" = OrderedDict()
+        self._current_bytes = 0
+        self._lock = threading.Lock()
+
+    def get_table(self, srt_path: str) -> CueTable:
+        """Lấy CueTable của file, chỉ parse khi file chưa có trong cache hoặc đã thay đổi"""
+        key = file_cache_key(srt_path)
+        with self._lock:
+            table = self._tables.get(key)
+            if table is not None:
+                self._tables.move_to_end(key)
+                self.hits += 1
+                return table
+            self.misses += 1
+
+        # Parse ngoài lock để không chặn các thread đọc file khác
+        table = load_cue_table(srt_path, use_sidecar=self.use_sidecar)
+        with self._lock:
+            self._store(key, table)
+        return table
+
+    def _store(self, key: CacheKey, table: CueTable):
+        # Bỏ các phiên bản cũ của cùng file
+        for old_key in [k for k in self._tables if k[0] == key[0] and k != key]:
+            self._current_bytes -= self._tables.pop(old_key).nbytes
+
+        size = table.nbytes
+        if size > self.max_bytes:
+            # Bảng lớn hơn cả ngân sách: trả về nhưng không giữ lại
+            return
+        if key in self._tables:
+            self._current_bytes -= self._tables.pop(key).nbytes
+        self._tables[key] = table
+        self._current_bytes += size
+        self._evict()
+
+    def _evict(self):
+        while self._current_bytes > self.max_bytes and self._tables:
+            key, table = self._tables.popitem(last=False)
+            self._current_bytes -= table.nbytes
+            self.evictions += 1
+            logging.debug(f"Subtitle cache evict: {os.path.basename(key[0])}")
+
+    def set_max_bytes(self, max_bytes: int):
+        """Đổi ngân sách bộ nhớ (evict ngay nếu đang vượt)"""
+        with self._lock:
+            self.max_bytes = max_bytes
+            self._evict()
+
+    def invalidate(self, srt_path: Optional[str] = None):
+        """Xoá cache của 1 file (hoặc toàn bộ nếu không truyền path)"""
+        with self._lock:
+            if srt_path is None:
+                self._tables.clear()
+                self._current_bytes = 0
+                return
+            path = os.path.abspath(srt_path)
+            for key in [k for k in self._tables if k[0] == path]:
+                self._current_bytes -= self._tables.pop(key).nbytes
+
+    def stats(self) -> Dict[str, int]:
+        """Thống kê: hits, misses, evictions, entries, bytes, max_bytes"""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._tables),
+                "bytes": self._current_bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+
+# Cache dùng chung cho toàn bộ process
+_subtitle_cache = SubtitleCache()
+
+
+def get_subtitle_cache() -> SubtitleCache:
+    return _subtitle_cache
+
+
+def get_cue_table(srt_path: str) -> CueTable:
+    """Parse SRT qua cache dùng chung (không đọc lại file chưa thay đổi)"""
+    return _subtitle_cache.get_table(srt_path)
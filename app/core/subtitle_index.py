@@ -0,0 +1,240 @@
+"""
+Subtitle Index - Đọc ngẫu nhiên file SRT/ASS qua mmap
+- first_cues(n): chỉ đọc phần đầu file
+- last_end_ms(): quét ngược từ cuối file
+- max_end_ms(): end lớn nhất (file không theo thứ tự thời gian) - phải quét cả file
+- cue_at(t) / cues_overlapping(a, b): index byte offset dựng lazy 1 lần, sau đó bisect (IntervalIndex, xem độ phức tạp ở interval_index)
+Không giữ mmap mở giữa các lần gọi (tránh khoá file trên Windows).
+"""
+import os
+import re
+import mmap
+import logging
+from array import array
+from contextlib import contextmanager
+from typing import Iterator, List, Optional, Tuple
+
+try:
+    from app.core.srt_parser import Cue, iter_srt_lines
+    from app.core.interval_index import IntervalIndex
+except ImportError:
+    from core.srt_parser import Cue, iter_srt_lines
+    from core.interval_index import IntervalIndex
+
+_SRT_TIMING_RE = re.compile(
+    rb'(\d+):(\d{2}):(\d{2})[,.](\d{1,3})[ \t]*-->[ \t]*(\d+):(\d{2}):(\d{2})[,.](\d{1,3})'
+)
+# Cho phép thụt đầu dòng / BOM trước "Dialogue:" (chỉ space/tab: không nuốt dòng trống phía trước)
+_ASS_DIALOGUE_RE = re.compile(
+    rb'^[ \t]*(?:\xef\xbb\xbf)?[ \t]*Dialogue:[^,\r\n]*,[ \t]*(\d+):(\d{2}):(\d{2})\.(\d{1,3})[ \t]*,[ \t]*(\d+):(\d{2}):(\d{2})\.(\d{1,3})',
+    re.MULTILINE
+)
+_ASS_TAG_RE = re.compile(r'\{[^}]*\}')
+
+# Số file giữ index trong bộ nhớ
+_MAX_CACHED_INDEXES = 32
+_index_cache = {}
+
+
+def _frac_to_ms(frac: bytes) -> int:
+    # "5" -> 500ms, "50" (ASS centiseconds) -> 500ms, "500" -> 500ms
+    return int(frac.ljust(3, b'0')[:3])
+
+
+def _groups_to_ms(groups) -> Tuple[int, int]:
+    h1, m1, s1, f1, h2, m2, s2, f2 = groups
+    start = (int(h1) * 3600 + int(m1) * 60 + int(s1)) * 1000 + _frac_to_ms(f1)
+    end = (int(h2) * 3600 + int(m2) * 60 + int(s2)) * 1000 + _frac_to_ms(f2)
+    return start, end
+
+
+def clean_ass_text(text: str) -> str:
+    """Bỏ tag ASS ({\\pos(x,y)}...) và đổi \\N thành khoảng trắng"""
+    text = _ASS_TAG_RE.sub('', text)
+    return text.replace('\\N', ' ').replace('\\n', ' ').strip()
+
+
+class SubtitleIndex:
+    """Index byte offset cho 1 file SRT hoặc ASS"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.is_ass = os.path.splitext(path)[1].lower() == '.ass'
+        # Dựng lazy ở lần gọi cue_at() đầu tiên
+        self._offsets = None   # array('q'): byte offset dòng timing / Dialogue (thứ tự trong file)
+        self._intervals = None # IntervalIndex trên (start_ms, end_ms)
+
+    @contextmanager
+    def _mapped(self):
+        """Mở file bằng mmap read-only (None nếu file rỗng)"""
+        with open(self.path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                yield None
+                return
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                yield mm
+            finally:
+                mm.close()
+
+    # ------------------------------------------------------------------
+    # Đọc tuần tự từ đầu file
+    # ------------------------------------------------------------------
+    def iter_cues(self) -> Iterator[Cue]:
+        """Yield cue từ đầu file, chỉ đọc tới đâu dùng tới đó"""
+        with self._mapped() as mm:
+            if mm is None:
+                return
+            lines = iter(mm.readline, b'')
+            decoded = (line.decode('utf-8', errors='replace').lstrip('\ufeff') for line in lines)
+            if self.is_ass:
+                yield from self._iter_ass_lines(decoded)
+            else:
+                yield from iter_srt_lines(decoded)
+
+    @staticmethod
+    def _iter_ass_lines(lines) -> Iterator[Cue]:
+        count = 0
+        for line in lines:
+            line = line.strip().lstrip('\ufeff').lstrip()
+            if not line.startswith('Dialogue:'):
+                continue
+            m = _ASS_DIALOGUE_RE.match(line.encode('utf-8'))
+            # Format: Dialogue: Layer,Start,End,Style,Name,MarginL,MarginR,MarginV,Effect,Text
+            parts = line.split(',', 9)
+            if not m or len(parts) < 10:
+                continue
+            start, end = _groups_to_ms(m.groups())
+            count += 1
+            yield Cue(count, start, end, parts[9].strip())
+
+    def first_cues(self, n: int) -> List[Cue]:
+        """N cue đầu tiên của file"""
+        result = []
+        if n <= 0:
+            return result
+        for cue in self.iter_cues():
+            result.append(cue)
+            if len(result) >= n:
+                break
+        return result
+
+    # ------------------------------------------------------------------
+    # Quét ngược từ cuối file
+    # ------------------------------------------------------------------
+    def last_end_ms(self) -> Optional[int]:
+        """
+        Thời điểm kết thúc của cue cuối cùng trong file (None nếu không có).
+        Index đã dựng thì trả về end lớn nhất (O(1), bằng end cue cuối khi file theo thứ tự thời gian).
+        """
+        if self._intervals is not None and len(self._intervals):
+            return self._intervals.max_end()
+
+        marker = b'Dialogue:' if self.is_ass else b'-->'
+        pattern = _ASS_DIALOGUE_RE if self.is_ass else _SRT_TIMING_RE
+        with self._mapped() as mm:
+            if mm is None:
+                return None
+            pos = len(mm)
+            while True:
+                pos = mm.rfind(marker, 0, pos)
+                if pos < 0:
+                    return None
+                line_start = mm.rfind(b'\n', 0, pos) + 1
+                line_end = mm.find(b'\n', pos)
+                if line_end < 0:
+                    line_end = len(mm)
+                m = pattern.search(mm[line_start:line_end])
+                if m:
+                    return _groups_to_ms(m.groups())[1]
+                pos = line_start
+
+    def max_end_ms(self) -> Optional[int]:
+        """
+        End lớn nhất trong mọi cue (None nếu không có). Khác last_end_ms(): đúng cả khi
+        cue không theo thứ tự thời gian (ASS sau khi sửa style / layer).
+        Không biết trước thứ tự nên luôn phải quét cả file: dùng index nếu đã dựng,
+        không thì chỉ chạy regex trên mmap giữ max (không dựng / sort index).
+        """
+        if self._intervals is not None:
+            return self._intervals.max_end()
+        pattern = _ASS_DIALOGUE_RE if self.is_ass else _SRT_TIMING_RE
+        max_end = None
+        with self._mapped() as mm:
+            if mm is not None:
+                for m in pattern.finditer(mm):
+                    end = _groups_to_ms(m.groups())[1]
+                    if max_end is None or end > max_end:
+                        max_end = end
+        return max_end
+
+    # ------------------------------------------------------------------
+    # Truy vấn theo thời gian
+    # ------------------------------------------------------------------
+    def _ensure_index(self):
+        if self._offsets is not None:
+            return
+        starts, ends, offsets = array('q'), array('q'), array('q')
+        pattern = _ASS_DIALOGUE_RE if self.is_ass else _SRT_TIMING_RE
+        with self._mapped() as mm:
+            if mm is not None:
+                for m in pattern.finditer(mm):
+                    start, end = _groups_to_ms(m.groups())
+                    starts.append(start)
+                    ends.append(end)
+                    offsets.append(m.start())
+        self._intervals = IntervalIndex(starts, ends)
+        self._offsets = offsets
+        logging.debug(f"Built subtitle index: {len(offsets)} cues ({os.path.basename(self.path)})")
+
+    def __len__(self) -> int:
+        self._ensure_index()
+        return len(self._offsets)
+
+    def cue_at(self, t_ms: int) -> Optional[Cue]:
+        """Cue đang hiển thị tại thời điểm t_ms (cue bắt đầu muộn nhất nếu chồng nhau)"""
+        self._ensure_index()
+        i = self._intervals.last_at(t_ms)
+        return self._read_cue_at_offset(i) if i >= 0 else None
+
+    def cues_overlapping(self, start_ms: int, end_ms: int) -> List[Cue]:
+        """Các cue giao với khoảng [start_ms, end_ms)"""
+        self._ensure_index()
+        cues = (self._read_cue_at_offset(i) for i in self._intervals.overlapping(start_ms, end_ms))
+        return [cue for cue in cues if cue is not None]
+
+    def _read_cue_at_offset(self, i: int) -> Optional[Cue]:
+        offset = self._offsets[i]
+        with self._mapped() as mm:
+            if mm is None:
+                return None
+            if self.is_ass:
+                line_end = mm.find(b'\n', offset)
+                line = mm[offset:line_end if line_end >= 0 else len(mm)].decode('utf-8', errors='replace')
+                cue = next(self._iter_ass_lines([line]), None)
+                return cue._replace(index=i + 1) if cue else None
+
+            # SRT: đọc từ dòng index (ngay trước timing) tới hết dòng timing của block kế tiếp,
+            # iter_srt_lines sẽ yield block hiện tại khi gặp dòng timing đó
+            line_start = mm.rfind(b'\n', 0, offset) + 1
+            block_start = mm.rfind(b'\n', 0, line_start - 1) + 1 if line_start > 0 else 0
+            line_end = mm.find(b'\n', offset)
+            next_timing = mm.find(b'-->', line_end) if line_end >= 0 else -1
+            block_end = mm.find(b'\n', next_timing) if next_timing >= 0 else -1
+            if block_end < 0:
+                block_end = len(mm)
+            text = mm[block_start:block_end].decode('utf-8', errors='replace').lstrip('\ufeff')
+            return next(iter_srt_lines(text.splitlines()), None)
+
+
+def get_subtitle_index(path: str) -> SubtitleIndex:
+    """Lấy SubtitleIndex cho file (cache theo path + mtime + size)"""
+    st = os.stat(path)
+    key = (os.path.abspath(path), st.st_mtime_ns, st.st_size)
+    index = _index_cache.get(key)
+    if index is None:
+        if len(_index_cache) >= _MAX_CACHED_INDEXES:
+            _index_cache.pop(next(iter(_index_cache)))
+        index = SubtitleIndex(path)
+        _index_cache[key] = index
+    return index
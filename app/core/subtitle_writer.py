@@ -0,0 +1,95 @@
+"""
+Subtitle Writer - Ghi SRT / ASS / TXT dạng streaming
+Nhận iterator cue và ghi thẳng vào file handle có buffer,
+không dựng toàn bộ nội dung output thành 1 chuỗi trong RAM.
+"""
+from typing import Iterable, Optional, Tuple
+
+try:
+    from app.core.utils import milliseconds_to_srt_time
+except ImportError:
+    from core.utils import milliseconds_to_srt_time
+
+# Buffer ghi file (64KB) - đủ lớn để gom nhiều cue vào 1 lần ghi xuống đĩa
+WRITE_BUFFER_SIZE = 1 << 16
+
+
+def open_text_writer(output_path: str):
+    """Mở file text UTF-8 để ghi với buffer lớn"""
+    return open(output_path, 'w', encoding='utf-8', buffering=WRITE_BUFFER_SIZE)
+
+
+def ms_to_ass_time(ms: int) -> str:
+    """Convert milliseconds to ASS timestamp (H:MM:SS.cs)"""
+    # ASS needs centiseconds (2 digits), cắt bớt giống srt_time_to_ass
+    cs = (ms // 10) % 100
+    s = (ms // 1000) % 60
+    m = (ms // 60000) % 60
+    h = ms // 3600000
+    return f"{h}:{m:02d}:{s:02d}.{cs:02d}"
+
+
+class _Counter:
+    """Đếm số phần tử đi qua generator khi ghi bằng writelines"""
+    def __init__(self):
+        self.count = 0
+
+
+def write_srt_blocks(output_path: str, blocks: Iterable[Tuple[int, str, str]]) -> int:
+    """
+    Ghi SRT từ các block (index, timing_line, text) đã format sẵn.
+    Trả về số block đã ghi.
+    """
+    counter = _Counter()
+
+    def render():
+        for index, timing, text in blocks:
+            counter.count += 1
+            yield f"{index}\n{timing}\n{text}\n\n"
+
+    with open_text_writer(output_path) as f:
+        f.writelines(render())
+    return counter.count
+
+
+def write_srt(output_path: str, cues: Iterable[Tuple[int, int, int, str]]) -> int:
+    """Ghi SRT từ các cue (index, start_ms, end_ms, text). Trả về số cue đã ghi."""
+    return write_srt_blocks(output_path, (
+        (index, f"{milliseconds_to_srt_time(start_ms)} --> {milliseconds_to_srt_time(end_ms)}", text)
+        for index, start_ms, end_ms, text in cues
+    ))
+
+
+def write_ass(output_path: str, header: str, cues: Iterable[Tuple[int, int, int, str]],
+              style: str = "Default", position: Optional[Tuple[int, int]] = None) -> int:
+    """
+    Ghi ASS: header (Script Info + Styles + Events Format) rồi từng dòng Dialogue.
+    Trả về số dialogue đã ghi.
+    """
+    counter = _Counter()
+    prefix = f"{{\\pos({position[0]},{position[1]})}}" if position else ""
+
+    def render():
+        for _, start_ms, end_ms, text in cues:
+            counter.count += 1
+            txt = text.replace('\n', '\\N')
+            yield f"Dialogue: 0,{ms_to_ass_time(start_ms)},{ms_to_ass_time(end_ms)},{style},,0,0,0,,{prefix}{txt}\n"
+
+    with open_text_writer(output_path) as f:
+        f.write(header)
+        f.writelines(render())
+    return counter.count
+
+
+def write_txt(output_path: str, lines: Iterable[str]) -> int:
+    """Ghi mỗi phần tử thành 1 dòng text. Trả về số dòng đã ghi."""
+    counter = _Counter()
+
+    def render():
+        for line in lines:
+            counter.count += 1
+            yield line + "\n"
+
+    with open_text_writer(output_path) as f:
+        f.writelines(render())
+    return counter.count
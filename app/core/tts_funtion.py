@@ -2,7 +2,9 @@ import os
 import re
 import asyncio
 import subprocess
+import shutil
 import logging
+import tempfile
 from pathlib import Path
 from typing import List, Tuple, Dict, Optional
 from dataclasses import dataclass
@@ -51,6 +53,54 @@ except ImportError:
         FFMPEG_PATH = 'ffmpeg'
         FFPROBE_PATH = 'ffprobe'
 
+try:
+    from app.core.subtitle_cache import get_cue_table
+    from app.core.utils import milliseconds_to_srt_time
+except ImportError:
+    from core.subtitle_cache import get_cue_table
+    from core.utils import milliseconds_to_srt_time
+
+try:
+    from app.core.audio_probe import (
+        get_duration_ms, get_durations_ms, index_audio_dir, invalidate_duration, refresh_duration_ms,
+    )
+except ImportError:
+    from core.audio_probe import (
+        get_duration_ms, get_durations_ms, index_audio_dir, invalidate_duration, refresh_duration_ms,
+    )
+
+try:
+    from app.core.ffmpeg_runner import run_ffmpeg
+    from app.core.audio_codecs import copy_or_encode_args
+    from app.core.wav_trim import trim_leading_silence_wav, leading_silence_filter, trims_in_place
+    from app.core.parallel_trim import trim_files_parallel
+    from app.core.audio_backup import AudioBackup
+    from app.core.audio_folder_cache import DurationCache, SilenceCache
+    from app.core.silence_analysis import analyze_silence, cached_silence, record_silence
+except ImportError:
+    from core.ffmpeg_runner import run_ffmpeg
+    from core.audio_codecs import copy_or_encode_args
+    from core.wav_trim import trim_leading_silence_wav, leading_silence_filter, trims_in_place
+    from core.parallel_trim import trim_files_parallel
+    from core.audio_backup import AudioBackup
+    from core.audio_folder_cache import DurationCache, SilenceCache
+    from core.silence_analysis import analyze_silence, cached_silence, record_silence
+
+try:
+    from app.core.cue_stretch import DEFAULT_MAX_TEMPO, StretchJob, local_tempos, stretch_cues, layout_timeline
+except ImportError:
+    from core.cue_stretch import DEFAULT_MAX_TEMPO, StretchJob, local_tempos, stretch_cues, layout_timeline
+
+# Engine ghép audio (ffmpeg / mixer NumPy / nối PCM) chọn theo chi phí ước lượng
+try:
+    from app.core.merge_engines import (
+        merge_timeline, default_engines, FfmpegFilterEngine, _merge_small_batch,
+    )
+except ImportError:
+    from core.merge_engines import (
+        merge_timeline, default_engines, FfmpegFilterEngine, _merge_small_batch,
+    )
+
 class SRTEntry:
     def __init__(self, index, start_ms, end_ms, text):
         self.index = index
@@ -67,42 +117,18 @@ def parse_srt_file(srt_path: str) -> List[SRTEntry]:
     if not os.path.exists(srt_path):
         return []
 
+    # Dùng cache: analyze -> merge -> suggest speed không parse lại file chưa đổi
+    table = get_cue_table(srt_path)
     entries = []
-    with open(srt_path, 'r', encoding='utf-8') as f:
-        content = f.read().strip()
-    
-    # Tách các block bằng 2 dòng trống (chuẩn SRT)
-    blocks = re.split(r'\n\s*\n', content)
-    
-    for block in blocks:
-        lines = block.strip().split('\n')
-        if len(lines) >= 3:
-            try:
-                index = int(lines[0])
-                # Parse timestamp: 00:00:01,500 --> 00:00:03,000
-                times = lines[1].split('-->')
-                start_ms = _srt_time_to_ms(times[0].strip())
-                end_ms = _srt_time_to_ms(times[1].strip())
-                # Text có thể nhiều dòng, nối lại
-                text = " ".join(lines[2:])
-                entries.append(SRTEntry(index, start_ms, end_ms, text))
-            except Exception as e:
-                logging.warning(f"Lỗi parse block SRT: {lines[0]} - {e}")
-                continue
-                
-    return entries
+    for i in range(len(table)):
+        text = table.text(i)
+        # Bỏ qua block không có text (chuẩn cũ yêu cầu >= 3 dòng)
+        if not text:
+            continue
+        # Text có thể nhiều dòng, nối lại
+        entries.append(SRTEntry(table.indices[i], table.starts[i], table.ends[i], text.replace('\n', ' ')))
 
-def _srt_time_to_ms(time_str: str) -> int:
-    """Chuyển 00:00:01,500 thành milliseconds"""
-    # Fix format if comma is dot
-    time_str = time_str.replace('.', ',')
-    hours, minutes, seconds = time_str.split(':')
-    seconds, millis = seconds.split(',')
-    
-    return (int(hours) * 3600000 + 
-            int(minutes) * 60000 + 
-            int(seconds) * 1000 + 
-            int(millis))
+    return entries
 
 def get_safe_filename(index: int, text: str) -> str:
     """Tạo tên file an toàn từ index và text"""
@@ -120,50 +146,79 @@ def validate_generated_files(entries: List[SRTEntry], output_dir: str) -> List[S
             failed.append(entry)
     return failed
 
-async def generate_single_audio(text, voice, rate, volume, pitch, output_path):
+async def _stream_mp3_to_wav(communicate, output_path: str, trim_leading_silence: bool) -> bool:
+    """
+    Đẩy MP3 của Edge TTS thẳng vào stdin ffmpeg -> WAV (không có file MP3 tạm).
+    trim_leading_silence: cắt khoảng lặng đầu ngay trong lần decode này.
+    """
+    # Helper for Windows to hide window in asyncio subprocess
+    startupinfo = None
+    creationflags = 0
+    if os.name == 'nt':
+        startupinfo = subprocess.STARTUPINFO()
+        startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+        startupinfo.wShowWindow = subprocess.SW_HIDE
+        creationflags = 0x08000000 # CREATE_NO_WINDOW
+    
+    cmd = [FFMPEG_PATH, '-y', '-f', 'mp3', '-i', 'pipe:0']
+    if trim_leading_silence:
+        cmd.extend(['-af', leading_silence_filter()])
+    cmd.extend(['-f', 'wav', output_path])
+    
+    # Async subprocess to avoid blocking
+    proc = await asyncio.create_subprocess_exec(
+        *cmd,
+        stdin=asyncio.subprocess.PIPE,
+        stdout=asyncio.subprocess.DEVNULL,
+        stderr=asyncio.subprocess.DEVNULL,
+        startupinfo=startupinfo,
+        creationflags=creationflags
+    )
+    try:
+        async for chunk in communicate.stream():
+            if chunk["type"] == "audio":
+                proc.stdin.write(chunk["data"])
+                await proc.stdin.drain()
+        proc.stdin.close()
+    except (BrokenPipeError, ConnectionResetError):
+        # ffmpeg đã thoát (lỗi decode) -> returncode != 0 bên dưới
+        pass
+    except BaseException:
+        # Edge TTS lỗi / bị huỷ: không để lại ffmpeg chạy dở và file WAV cụt
+        if proc.returncode is None:
+            proc.kill()
+        await proc.wait()
+        if os.path.exists(output_path):
+            os.remove(output_path)
+        raise
+    await proc.wait()
+    
+    if proc.returncode != 0:
+        logging.error(f"Failed to convert to wav: {output_path}")
+        if os.path.exists(output_path):
+            os.remove(output_path)
+        return False
+    return True
+
+async def generate_single_audio(text, voice, rate, volume, pitch, output_path, trim_leading_silence: bool = False):
+    """
+    Tạo 1 file audio bằng Edge TTS.
+    WAV: MP3 được stream thẳng vào ffmpeg, mỗi cue chỉ ghi đĩa 1 lần.
+    trim_leading_silence=True: cắt khoảng lặng đầu trong cùng lần decode (chỉ áp dụng cho WAV;
+    MP3 giữ nguyên bản Edge TTS, không encode lại).
+    """
     if not edge_tts:
         return False
     try:
         # Determine strict output format
         is_wav = output_path.lower().endswith(".wav")
         
-        # Temp path for raw edge-tts output (MP3)
-        temp_mp3 = output_path + ".temp.mp3" if is_wav else output_path
-        
         communicate = edge_tts.Communicate(text, voice, rate=rate, volume=volume, pitch=pitch)
-        await communicate.save(temp_mp3)
-        
         if is_wav:
-            # Convert MP3 to WAV using FFmpeg
-            
-            # Helper for Windows to hide window in asyncio subprocess
-            startupinfo = None
-            creationflags = 0
-            if os.name == 'nt':
-                startupinfo = subprocess.STARTUPINFO()
-                startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
-                startupinfo.wShowWindow = subprocess.SW_HIDE
-                creationflags = 0x08000000 # CREATE_NO_WINDOW
-            
-            # Async subprocess to avoid blocking
-            proc = await asyncio.create_subprocess_exec(
-                'ffmpeg', '-y', '-i', temp_mp3, '-f', 'wav', output_path,
-                stdout=asyncio.subprocess.DEVNULL,
-                stderr=asyncio.subprocess.DEVNULL,
-                startupinfo=startupinfo,
-                creationflags=creationflags
-            )
-            await proc.wait()
-            
-            # Clean temp
-            if os.path.exists(temp_mp3):
-                try:
-                    os.remove(temp_mp3)
-                except: pass
-                
-            if proc.returncode != 0:
-                logging.error(f"Failed to convert to wav: {output_path}")
+            if not await _stream_mp3_to_wav(communicate, output_path, trim_leading_silence):
                 return False
+        else:
+            await communicate.save(output_path)
 
         # Validate file size > 0
         if not os.path.exists(output_path) or os.path.getsize(output_path) == 0:
@@ -186,10 +241,13 @@ async def generate_batch_audio_logic(
     pitch="+0Hz",
     max_concurrent=5,
     stop_event=None,
-    progress_callback=None
+    progress_callback=None,
+    trim_leading_silence: bool = False
 ) -> List[Tuple[str, int]]:
     """
     Tạo audio cho toàn bộ danh sách entries.
+    trim_leading_silence: cắt khoảng lặng đầu ngay khi tạo (file đã có sẵn cũng được cắt),
+                          không cần chạy bước trim riêng sau đó.
     Trả về list: [(file_path, start_time_ms), ...]
     """
     if not os.path.exists(output_dir):
@@ -212,6 +270,9 @@ async def generate_batch_audio_logic(
             # Nếu file đã tồn tại và size > 0 thì bỏ qua (resume)
             if os.path.exists(path) and os.path.getsize(path) > 0:
                 logging.info(f"Skipped (Existed): {filename}")
+                if trim_leading_silence:
+                    # File của lần chạy trước có thể chưa cắt (WAV: chỉ sửa header)
+                    await asyncio.to_thread(trim_silence_from_audio_simple, path)
                 
                 # Update progress
                 completed_count[0] += 1
@@ -222,7 +283,8 @@ async def generate_batch_audio_logic(
 
             if stop_event and stop_event.is_set():
                 return None
-            success = await generate_single_audio(entry.text, voice, rate, volume, pitch, path)
+            success = await generate_single_audio(entry.text, voice, rate, volume, pitch, path,
+                                                  trim_leading_silence=trim_leading_silence)
             
             # Update progress
             completed_count[0] += 1
@@ -241,118 +303,45 @@ async def generate_batch_audio_logic(
     tasks = [generate_one(entry) for entry in entries]
     results = await asyncio.gather(*tasks)
     
+    # Trim lúc resume chỉ cập nhật cache trong RAM -> ghi sidecar 1 lần
+    if trim_leading_silence:
+        DurationCache.for_folder(output_dir).save()
+        SilenceCache.for_folder(output_dir).save()
+    
     # Filter None và sort theo thời gian
     valid_results = [r for r in results if r]
     valid_results.sort(key=lambda x: x[1])
     
     return valid_results
 
-def merge_audio_files_ffmpeg(file_list: List[Tuple[str, int]], output_path: str, stop_event=None):
+def merge_audio_files_ffmpeg(file_list: List[Tuple[str, int]], output_path: str, stop_event=None,
+                             low_memory: Optional[bool] = None, progress_callback=None):
     """
-    Ghép audio sử dụng FFmpeg adelay và amix.
-    Xử lý batching để tránh lỗi "Argument list too long" hoặc giới hạn input của ffmpeg.
+    Ghép audio theo timeline bằng engine rẻ nhất (xem merge_engines):
+    nối PCM + khoảng lặng nếu không có đoạn chồng nhau, mixer NumPy, hoặc FFmpeg adelay + amix
+    theo batch (tránh lỗi "Argument list too long"). Engine lỗi thì thử engine kế tiếp.
+    low_memory: True = mix vào file WAV qua memmap (RAM không tăng theo độ dài timeline),
+                None = tự bật khi timeline quá dài.
+    progress_callback(MergeProgress): thời lượng đã xử lý, tốc độ, ETA.
+    stop_event: tiến trình ffmpeg đang chạy bị dừng trong thời gian giới hạn.
     """
     if not file_list:
         return False
     
-    # Chia nhỏ thành các batch (ví dụ 32 file một lần) để tránh quá tải filter complex
-    BATCH_SIZE = 32
-    temp_files = []
-    
     try:
         # Nếu chỉ có 1 file, copy luôn
         if len(file_list) == 1:
-            cmd = [FFMPEG_PATH, '-y', '-i', file_list[0][0], '-c', 'copy', output_path]
-            subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-            return True
+            src = file_list[0][0]
+            cmd = [FFMPEG_PATH, '-y', '-i', src, *copy_or_encode_args(src, output_path), output_path]
+            return run_ffmpeg(cmd, stop_event=stop_event)
 
-        # Process từng batch
-        for i in range(0, len(file_list), BATCH_SIZE):
-            if stop_event and stop_event.is_set():
-                logging.warning("Merge stopped by user.")
-                return False
-            batch = file_list[i : i + BATCH_SIZE]
-            logging.info(f"Merging batch {i//BATCH_SIZE + 1} with {len(batch)} files...")
-            
-            root, ext = os.path.splitext(output_path)
-            temp_output = f"{root}_temp_batch_{i}{ext}"
-            _merge_small_batch(batch, temp_output)
-            temp_files.append(temp_output)
-        
-        # Merge các file temp lại với nhau
-        if len(temp_files) == 1:
-             if os.path.exists(output_path): os.remove(output_path)
-             os.rename(temp_files[0], output_path)
-             return True
-             
-        # Mix các temp files
-        logging.info("Mixing batch results...")
-        cmd_final = ['ffmpeg', '-y']
-        for tf in temp_files:
-            if stop_event and stop_event.is_set():
-                logging.warning("Merge stopped by user.")
-                return False
-            cmd_final.extend(['-i', tf])
-            
-        # amix tất cả temp files
-        mix_inputs = "".join([f"[{i}:a]" for i in range(len(temp_files))])
-        filter_complex = f"{mix_inputs}amix=inputs={len(temp_files)}:duration=longest:dropout_transition=0:normalize=0[out]"
-        
-        cmd_final.extend(['-filter_complex', filter_complex, '-map', '[out]'])
-        
-        if output_path.lower().endswith(".wav"):
-             cmd_final.extend(['-c:a', 'pcm_s16le'])
-        else:
-             cmd_final.extend(['-c:a', 'libmp3lame', '-b:a', '192k'])
-             
-        cmd_final.append(output_path)
-        
-        subprocess.run(cmd_final, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-        
-        # Clean temp
-        for tf in temp_files:
-            if os.path.exists(tf): os.remove(tf)
-            
-        return True
+        return merge_timeline(file_list, output_path, stop_event=stop_event, low_memory=low_memory,
+                              progress_callback=progress_callback)
 
     except Exception as e:
         logging.error(f"Lỗi merge ffmpeg: {e}")
         return False
 
-def _merge_small_batch(batch_list, output_file):
-    """
-    Hàm helper để merge 1 nhóm nhỏ audio file dùng adelay + amix
-    """
-    cmd = [FFMPEG_PATH, '-y']
-    filter_parts = []
-    
-    # Input files
-    for idx, (path, start_ms) in enumerate(batch_list):
-        cmd.extend(['-i', path])
-        # Delay: adelay=1000|1000 (cho cả channel trái phải nếu stereo, hoặc just 1000 if mono logic handles it automatically usually but explicit pipes safer)
-        # Lưu ý: adelay nhận duration in milliseconds
-        filter_parts.append(f"[{idx}:a]adelay={start_ms}|{start_ms}[a{idx}]")
-    
-    # Amix
-    mix_inputs = "".join([f"[a{i}]" for i in range(len(batch_list))])
-    # normalize=0 để tránh volume bị giảm khi mix nhiều file
-    filter_complex = ";".join(filter_parts) + \
-                     f";{mix_inputs}amix=inputs={len(batch_list)}:duration=longest:dropout_transition=0:normalize=0[out]"
-    
-    cmd.extend([
-        '-filter_complex', filter_complex,
-        '-map', '[out]'
-    ])
-    
-    if output_file.lower().endswith(".wav"):
-         cmd.extend(['-c:a', 'pcm_s16le'])
-    else:
-         cmd.extend(['-c:a', 'libmp3lame', '-b:a', '192k'])
-         
-    cmd.append(output_file)
-    
-    subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-
 @dataclass
 class AudioSegment:
     """Thông tin một đoạn audio"""
@@ -426,31 +415,22 @@ class MergeAnalysis:
 class IntelligentAudioMerger:
     """Công cụ ghép audio thông minh"""
     
-    def __init__(self, min_scale: float = 1.1, max_scale: float = 1.4):
+    def __init__(self, min_scale: float = 1.1, max_scale: float = 1.4,
+                 max_cue_tempo: float = DEFAULT_MAX_TEMPO):
         """
         Args:
             min_scale: Hệ số mở rộng tối thiểu (1.1 = +10%)
             max_scale: Hệ số mở rộng tối đa (1.4 = +40%)
+            max_cue_tempo: Tăng tốc tối đa cho 1 cue ở chế độ "local" (1.5 = nhanh hơn 50%)
         """
         self.min_scale = min_scale
         self.max_scale = max_scale
+        self.max_cue_tempo = max_cue_tempo
         self.batch_size = 32
         
     def get_audio_duration(self, audio_path: str) -> int:
-        """Lấy thời lượng thực tế của file audio (milliseconds)"""
-        try:
-            cmd = [
-                FFPROBE_PATH, '-v', 'error',
-                '-show_entries', 'format=duration',
-                '-of', 'default=noprint_wrappers=1:nokey=1',
-                audio_path
-            ]
-            result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-            duration_seconds = float(result.stdout.strip())
-            return int(duration_seconds * 1000)
-        except Exception as e:
-            logging.error(f"Không thể lấy thời lượng audio {audio_path}: {e}")
-            return 0
+        """Lấy thời lượng thực tế của file audio (milliseconds): header WAV, không thì ffprobe"""
+        return get_duration_ms(audio_path)
     
     def analyze_audio_files(self, audio_dir: str, srt_path: str) -> MergeAnalysis:
         """
@@ -459,31 +439,22 @@ class IntelligentAudioMerger:
         # Parse SRT
         srt_segments = parse_srt_file(srt_path)
         
+        # Quét thư mục 1 lần, đo thời lượng cả loạt (WAV đọc header, MP3 ffprobe song song)
+        file_index = index_audio_dir(audio_dir)
+        audio_paths = [
+            file_index.get(entry.index, os.path.join(audio_dir, f"{entry.index:03d}_unknown.wav"))
+            for entry in srt_segments
+        ]
+        durations = get_durations_ms(file_index[entry.index] for entry in srt_segments if entry.index in file_index)
+        
         # Phân tích từng đoạn
         audio_segments = []
         max_overflow_ratio = 1.0
         max_overflow_segment = None
         overflow_count = 0
         
-        for entry in srt_segments:
-            # Logic quét file
-            prefix_pattern = f"{entry.index:03d}_"
-            simple_pattern = f"{entry.index}.wav"
-            
-            audio_path = os.path.join(audio_dir, f"{entry.index:03d}_unknown.wav")
-            
-            if os.path.exists(audio_dir):
-                for f in os.listdir(audio_dir):
-                     if f.startswith(prefix_pattern) and (f.endswith(".mp3") or f.endswith(".wav")):
-                         audio_path = os.path.join(audio_dir, f)
-                         break
-                     elif f == simple_pattern:
-                         audio_path = os.path.join(audio_dir, f)
-                         break
-            
-            actual_duration = 0
-            if os.path.exists(audio_path):
-                actual_duration = self.get_audio_duration(audio_path)
+        for entry, audio_path in zip(srt_segments, audio_paths):
+            actual_duration = durations.get(audio_path, 0)
 
             srt_duration = entry.duration_ms
             overflow = actual_duration - srt_duration
@@ -569,11 +540,66 @@ class IntelligentAudioMerger:
         
         return adjusted_timeline
     
+    def calculate_local_timeline(
+        self,
+        analysis: MergeAnalysis,
+        work_dir: str,
+        stop_event=None,
+        max_workers: Optional[int] = None
+    ) -> Optional[List[Tuple[str, int]]]:
+        """
+        Timeline chế độ "local": chỉ tăng tốc (atempo) các cue bị tràn, tối đa max_cue_tempo,
+        giữ start gốc và chỉ đẩy cue sau khi cue trước chưa nói xong.
+        
+        Args:
+            analysis: Kết quả phân tích
+            work_dir: Thư mục ghi các file đã stretch (caller tự dọn)
+            stop_event: Event để dừng
+            max_workers: Số tiến trình ffmpeg chạy song song
+        
+        Returns:
+            List[(audio_path, start_ms)], None nếu bị dừng
+        """
+        present = [seg for seg in analysis.segments if os.path.exists(seg.audio_path)]
+        # Khoảng lặng cuối từ kho phân tích (chỉ đọc cache, không decode thêm)
+        trailing = {}
+        for pos, seg in enumerate(present):
+            silence = cached_silence(seg.audio_path)
+            if silence is not None and not silence.is_silent:
+                trailing[pos] = silence.trailing_ms
+        tempos = local_tempos(present, self.max_cue_tempo, trailing_ms=trailing)
+        jobs = [
+            StretchJob(pos, present[pos].audio_path,
+                       os.path.join(work_dir, f"{present[pos].index + 1:03d}_x{tempo:.3f}.wav"), tempo)
+            for pos, tempo in tempos.items()
+        ]
+        if jobs:
+            logging.info(f"⏩ Stretching {len(jobs)} overflowing cues (max {self.max_cue_tempo:.2f}x)...")
+        stretched = stretch_cues(jobs, stop_event, max_workers)
+        if stop_event and stop_event.is_set():
+            return None
+        
+        paths = [stretched.get(pos, seg.audio_path) for pos, seg in enumerate(present)]
+        durations = get_durations_ms(paths)
+        # Đuôi im lặng được phép chồng lên cue sau (mix cộng 0) -> chỉ đẩy khi phần có tiếng chồng nhau
+        spoken = [max(0, durations[p] - int(trailing.get(pos, 0) / (tempos[pos] if pos in stretched else 1.0)))
+                  for pos, p in enumerate(paths)]
+        starts, shifted = layout_timeline([seg.srt_start_ms for seg in present], spoken)
+        
+        if present:
+            last = len(present) - 1
+            drift = starts[last] - present[last].srt_start_ms
+            logging.info(f"Local timeline: {len(stretched)}/{len(jobs)} cues stretched, "
+                         f"{shifted} cues shifted, end drift {drift / 1000:.2f}s")
+        return list(zip(paths, starts))
+    
     def merge_with_adjusted_timeline(
         self,
         adjusted_timeline: List[Tuple[str, int]],
         output_path: str,
-        stop_event=None
+        stop_event=None,
+        low_memory: Optional[bool] = None,
+        progress_callback=None
     ) -> bool:
         """
         Ghép audio với timeline đã điều chỉnh
@@ -582,6 +608,8 @@ class IntelligentAudioMerger:
             adjusted_timeline: [(audio_path, start_ms)]
             output_path: Đường dẫn file output
             stop_event: Event để dừng quá trình
+            low_memory: Mix qua memmap theo cửa sổ (None = tự chọn)
+            progress_callback: Nhận MergeProgress (thời lượng đã xử lý, tốc độ, ETA)
         
         Returns:
             bool: True nếu thành công
@@ -590,104 +618,29 @@ class IntelligentAudioMerger:
             logging.error("No audio files to merge")
             return False
         
-        temp_files = []
-        
         try:
             # Nếu chỉ có 1 file
             if len(adjusted_timeline) == 1:
-                cmd = [FFMPEG_PATH, '-y', '-i', adjusted_timeline[0][0], '-c', 'copy', output_path]
-                subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-                return True
-            
-            # Chia thành batch
-            for i in range(0, len(adjusted_timeline), self.batch_size):
-                if stop_event and stop_event.is_set():
-                    logging.warning("Merge stopped by user")
-                    return False
-                
-                batch = adjusted_timeline[i:i + self.batch_size]
-                logging.info(f"Merging batch {i//self.batch_size + 1}/{(len(adjusted_timeline)-1)//self.batch_size + 1}...")
-                
-                root, ext = os.path.splitext(output_path)
-                temp_output = f"{root}_temp_batch_{i}{ext}"
-                self._merge_small_batch(batch, temp_output)
-                temp_files.append(temp_output)
-            
-            # Merge các batch lại
-            if len(temp_files) == 1:
-                if os.path.exists(output_path):
-                    os.remove(output_path)
-                os.rename(temp_files[0], output_path)
-                return True
-            
-            # Mix các temp files
-            logging.info("Mixing batch results...")
-            cmd_final = ['ffmpeg', '-y']
-            
-            for tf in temp_files:
-                if stop_event and stop_event.is_set():
-                    return False
-                cmd_final.extend(['-i', tf])
+                src = adjusted_timeline[0][0]
+                cmd = [FFMPEG_PATH, '-y', '-i', src, *copy_or_encode_args(src, output_path), output_path]
+                return run_ffmpeg(cmd, stop_event=stop_event)
             
-            # amix
-            mix_inputs = "".join([f"[{i}:a]" for i in range(len(temp_files))])
-            filter_complex = f"{mix_inputs}amix=inputs={len(temp_files)}:duration=longest:dropout_transition=0:normalize=0[out]"
-            
-            cmd_final.extend(['-filter_complex', filter_complex, '-map', '[out]'])
-            
-            if output_path.lower().endswith(".wav"):
-                 cmd_final.extend(['-c:a', 'pcm_s16le'])
-            else:
-                 cmd_final.extend(['-c:a', 'libmp3lame', '-b:a', '192k'])
-                 
-            cmd_final.append(output_path)
-            
-            subprocess.run(cmd_final, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-            
-            # Xóa temp files
-            for tf in temp_files:
-                if os.path.exists(tf):
-                    os.remove(tf)
-            
-            return True
+            # Engine ffmpeg dùng batch_size của merger
+            engines = [
+                FfmpegFilterEngine(batch_size=self.batch_size) if e.name == "ffmpeg" else e
+                for e in default_engines()
+            ]
+            return merge_timeline(adjusted_timeline, output_path, stop_event=stop_event,
+                                  low_memory=low_memory, engines=engines,
+                                  progress_callback=progress_callback)
             
         except Exception as e:
             logging.error(f"Error merging audio: {e}")
-            # Cleanup
-            for tf in temp_files:
-                if os.path.exists(tf):
-                    os.remove(tf)
             return False
     
     def _merge_small_batch(self, batch_list: List[Tuple[str, int]], output_file: str):
         """Merge một batch nhỏ audio files"""
-        cmd = [FFMPEG_PATH, '-y']
-        filter_parts = []
-        
-        # Input files và adelay
-
-        for idx, (path, start_ms) in enumerate(batch_list):
-            cmd.extend(['-i', path])
-            filter_parts.append(f"[{idx}:a]adelay={start_ms}|{start_ms}[a{idx}]")
-        
-        # Amix
-        mix_inputs = "".join([f"[a{i}]" for i in range(len(batch_list))])
-        filter_complex = ";".join(filter_parts) + \
-                        f";{mix_inputs}amix=inputs={len(batch_list)}:duration=longest:dropout_transition=0:normalize=0[out]"
-        
-        cmd.extend([
-            '-filter_complex', filter_complex,
-            '-map', '[out]'
-        ])
-        
-        if output_file.lower().endswith(".wav"):
-             cmd.extend(['-c:a', 'pcm_s16le'])
-        else:
-             cmd.extend(['-c:a', 'libmp3lame', '-b:a', '192k'])
-             
-        cmd.append(output_file)
-        
-        subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        _merge_small_batch(batch_list, output_file)
     
     def smart_merge(
         self,
@@ -696,7 +649,9 @@ class IntelligentAudioMerger:
         output_path: str,
         auto_adjust: bool = True,
         custom_scale: Optional[float] = None,
-        stop_event=None
+        stop_event=None,
+        mode: str = "global",
+        progress_callback=None
     ) -> Tuple[bool, Optional[MergeAnalysis]]:
         """
         Ghép audio thông minh với phân tích và điều chỉnh tự động
@@ -708,6 +663,9 @@ class IntelligentAudioMerger:
             auto_adjust: Tự động điều chỉnh timeline nếu có overflow
             custom_scale: Hệ số mở rộng tùy chỉnh (None = dùng recommended)
             stop_event: Event để dừng
+            mode: "global" = giãn cả timeline theo 1 hệ số,
+                  "local" = chỉ tăng tốc các cue bị tràn (custom_scale bị bỏ qua)
+            progress_callback: Nhận MergeProgress trong lúc ghép
         
         Returns:
             (success, analysis)
@@ -719,7 +677,12 @@ class IntelligentAudioMerger:
         logging.info(str(analysis))
         
         # Bước 2: Quyết định có điều chỉnh không
-        if analysis.overflow_segments > 0 and auto_adjust:
+        stretch_dir = None
+        if analysis.overflow_segments > 0 and auto_adjust and mode == "local":
+            logging.info(f"⚙️  Stretching overflowing cues only (max {self.max_cue_tempo:.2f}x per cue)")
+            stretch_dir = tempfile.mkdtemp(prefix="stretch_", dir=os.path.dirname(os.path.abspath(output_path)))
+            adjusted_timeline = self.calculate_local_timeline(analysis, stretch_dir, stop_event)
+        elif analysis.overflow_segments > 0 and auto_adjust:
             logging.info(f"⚙️  Adjusting timeline with scale factor: {analysis.recommended_time_scale:.2f}x")
             adjusted_timeline = self.calculate_adjusted_timeline(analysis, custom_scale)
         else:
@@ -727,8 +690,16 @@ class IntelligentAudioMerger:
             adjusted_timeline = self.calculate_adjusted_timeline(analysis, 1.0)
         
         # Bước 3: Ghép
-        logging.info("🎵 Merging audio files...")
-        success = self.merge_with_adjusted_timeline(adjusted_timeline, output_path, stop_event)
+        try:
+            if adjusted_timeline is None:
+                success = False
+            else:
+                logging.info("🎵 Merging audio files...")
+                success = self.merge_with_adjusted_timeline(adjusted_timeline, output_path, stop_event,
+                                                            progress_callback=progress_callback)
+        finally:
+            if stretch_dir:
+                shutil.rmtree(stretch_dir, ignore_errors=True)
         
         if success:
             logging.info(f"✅ Successfully merged to: {output_path}")
@@ -754,13 +725,15 @@ def analyze_before_merge(audio_dir: str, srt_path: str,
 def merge_audio_intelligent(audio_dir: str, srt_path: str, output_path: str,
                             auto_adjust: bool = True, 
                             custom_scale: Optional[float] = None,
-                            stop_event=None) -> bool:
+                            stop_event=None, mode: str = "global",
+                            max_cue_tempo: float = DEFAULT_MAX_TEMPO) -> bool:
     """
     Wrapper function: Ghép audio thông minh
+    mode: "global" (giãn cả timeline) hoặc "local" (chỉ tăng tốc cue bị tràn)
     """
-    merger = IntelligentAudioMerger()
+    merger = IntelligentAudioMerger(max_cue_tempo=max_cue_tempo)
     success, _ = merger.smart_merge(audio_dir, srt_path, output_path, 
-                                    auto_adjust, custom_scale, stop_event)
+                                    auto_adjust, custom_scale, stop_event, mode)
     return success
 
 def trim_silence_from_audio_simple(input_path: str, output_path: str = None) -> bool:
@@ -777,20 +750,29 @@ def trim_silence_from_audio_simple(input_path: str, output_path: str = None) ->
         temp_path = output_path
     
     try:
-        # Get duration before
-        dur_before = 0
-        try:
-            cmd_probe = ['ffprobe', '-v', 'error', '-show_entries', 'format=duration', '-of', 'default=noprint_wrappers=1:nokey=1', input_path]
-            res = subprocess.run(cmd_probe, capture_output=True, text=True, check=True)
-            dur_before = int(float(res.stdout.strip()) * 1000)
-        except: pass
+        # Get duration before (cache thư mục audio, WAV đọc header)
+        dur_before = get_duration_ms(input_path)
+
+        # WAV ghi đè tại chỗ: cắt native, không encode lại
+        if output_path is None:
+            # Kho phân tích báo file bắt đầu bằng tiếng -> không có gì để cắt
+            analysis = cached_silence(input_path)
+            if analysis is not None and analysis.leading_ms == 0:
+                return True
+            trimmed_ms = trim_leading_silence_wav(input_path, leading_ms=analysis.leading_ms if analysis else None)
+            if trimmed_ms is not None:
+                if analysis is not None and trimmed_ms:
+                    record_silence(input_path, analysis.after_leading_cut(trimmed_ms))
+                dur_after = refresh_duration_ms(input_path)
+                logging.info(f"✂️ Trimmed {os.path.basename(input_path)}: {dur_before}ms -> {dur_after}ms (Reduced: {dur_before - dur_after}ms)")
+                return True
 
         # Use validated filter from test script
         # Filter: remove start silence ONLY
-        filter_str = "silenceremove=start_periods=1:start_threshold=-50dB"
+        filter_str = leading_silence_filter()
         
         cmd = [
-            'ffmpeg', '-y',
+            FFMPEG_PATH, '-y',
             '-i', input_path,
             '-af', filter_str
         ]
@@ -812,13 +794,8 @@ def trim_silence_from_audio_simple(input_path: str, output_path: str = None) ->
         else:
             final_path = output_path
         
-        # Get duration after
-        dur_after = 0
-        try:
-            cmd_probe = ['ffprobe', '-v', 'error', '-show_entries', 'format=duration', '-of', 'default=noprint_wrappers=1:nokey=1', final_path]
-            res = subprocess.run(cmd_probe, capture_output=True, text=True, check=True)
-            dur_after = int(float(res.stdout.strip()) * 1000)
-        except: pass
+        # Get duration after (file vừa ghi lại -> đo lại và cập nhật cache)
+        dur_after = refresh_duration_ms(final_path)
         
         reduced = dur_before - dur_after
         logging.info(f"✂️ Trimmed {os.path.basename(input_path)}: {dur_before}ms -> {dur_after}ms (Reduced: {reduced}ms)")
@@ -831,18 +808,29 @@ def trim_silence_from_audio_simple(input_path: str, output_path: str = None) ->
             os.remove(temp_path)
         return False
 
-def batch_trim_audio_directory(audio_dir: str, backup: bool = True):
+def batch_trim_audio_directory(audio_dir: str, backup: bool = True, max_workers: Optional[int] = None,
+                               stop_event=None, backup_strategy: str = "auto"):
     """
-    Trim silence cho tất cả file trong thư mục
+    Trim silence cho tất cả file trong thư mục (song song)
     
     Args:
         audio_dir: Thư mục chứa audio
         backup: True = backup file gốc trước khi trim
+        max_workers: Số file xử lý cùng lúc (None = số core)
+        stop_event: Event để dừng (file đang xử lý được làm xong)
+        backup_strategy: "auto" | "reflink" | "hardlink" | "copy" | "archive" | "none"
+                         (auto = reflink nếu được, không thì hardlink cho file trim qua ffmpeg
+                          và copy cho WAV cắt tại chỗ)
+    
+    Returns:
+        int: Số file trim thành công
     """
     import glob
-    import shutil
     
     audio_files = glob.glob(os.path.join(audio_dir, "*.mp3")) + glob.glob(os.path.join(audio_dir, "*.wav"))
+    # Skip temp files or backup files if logic grabs them
+    audio_files = [p for p in audio_files
+                   if "_temp" not in os.path.basename(p) and "_merged" not in os.path.basename(p)]
     if not audio_files:
         logging.warning("No audio files (mp3/wav) found to trim.")
         return 0
@@ -850,104 +838,87 @@ def batch_trim_audio_directory(audio_dir: str, backup: bool = True):
     # Create backup directory outside (sibling)
     clean_audio_dir = os.path.normpath(audio_dir)
     backup_dir = f"{clean_audio_dir}_backup"
-    if backup:
-        os.makedirs(backup_dir, exist_ok=True)
-        logging.info(f"Backing up to: {backup_dir}")
-    
-    total = len(audio_files)
-    success_count = 0
     
-    logging.info(f"Trimming {total} audio files...")
-    
-    for idx, audio_path in enumerate(audio_files, 1):
-        filename = os.path.basename(audio_path)
+    with AudioBackup(backup_dir, backup_strategy if backup else "none") as backups:
+        if backups.location:
+            logging.info(f"Backing up to: {backups.location}")
         
-        # Skip temp files or backup files if logic grabs them
-        if "_temp" in filename or "_merged" in filename: 
-            continue
-
-        # Backup nếu cần
-        if backup:
-            backup_path = os.path.join(backup_dir, filename)
-            shutil.copy2(audio_path, backup_path)
-        
-        logging.info(f"Processing ({idx}/{total}): {filename}")
+        def trim_one(audio_path):
+            # Backup nếu cần (lỗi backup -> không trim file này)
+            backups.backup(audio_path, in_place=trims_in_place(audio_path))
+            # Sử dụng logic mới: Phân tích khoảng lặng đầu -> Cắt
+            return trim_silence_advanced(audio_path)
         
-        # Sử dụng logic mới: Phân tích silencedetect -> Cắt đoạn giữa
-        success = trim_silence_advanced(audio_path)
-        
-        if success:
-            success_count += 1
-            # Log mỗi 10 file hoặc log hết nếu cần
-            if idx % 5 == 0:
-                logging.info(f"⏳ Progress: {idx}/{total} ({success_count} success)")
-        else:
-            logging.warning(f"❌ Failed to trim: {filename}")
+        total = len(audio_files)
+        logging.info(f"Trimming {total} audio files...")
+        summary = trim_files_parallel(audio_files, trim_one, max_workers=max_workers, stop_event=stop_event)
+    
+    # Ghi sidecar 1 lần cho cả thư mục (phân tích khoảng lặng + thời lượng)
+    SilenceCache.for_folder(audio_dir).save()
+    DurationCache.for_folder(audio_dir).save()
     
-    logging.info(f"✅ DONE. Trimmed {success_count}/{total} files.")
-    return success_count
+    if backups.location:
+        logging.info(f"Backup ({backups.strategy}): {backups.summary()}")
+    logging.info(f"✅ DONE. Trimmed {summary.success}/{total} files "
+                 f"({summary.failed} failed, {summary.skipped} skipped).")
+    return summary.success
 
 def get_silence_intervals(file_path: str, threshold: str = "-50dB", duration: float = 0.1) -> List[Tuple[float, float, float]]:
     """
-    Phát hiện các khoảng lặng sử dụng ffmpeg silencedetect
-    Trả về: List[(start, end, duration)]
+    Các khoảng lặng của file (đầu, giữa, cuối) từ kho phân tích silence_analysis:
+    file chưa đổi thì đọc sidecar, không decode lại.
+    Trả về: List[(start, end, duration)] (giây, như ffmpeg silencedetect)
     """
-    cmd = [
-        FFMPEG_PATH,
-        '-i', file_path,
-        '-af', f'silencedetect=noise={threshold}:d={duration}',
-        '-f', 'null',
-        '-'
-    ]
-    
     try:
-        # ffmpeg output to stderr
-        result = subprocess.run(cmd, capture_output=True, text=True, encoding='utf-8')
-        output = result.stderr
-        
-        silences = []
-        current_start = None
-        
-        for line in output.split('\n'):
-            if 'silence_start' in line:
-                match = re.search(r'silence_start: (\d+(\.\d+)?)', line)
-                if match:
-                    current_start = float(match.group(1))
-            elif 'silence_end' in line:
-                match_end = re.search(r'silence_end: (\d+(\.\d+)?)', line)
-                match_dur = re.search(r'silence_duration: (\d+(\.\d+)?)', line)
-                if match_end and current_start is not None:
-                    end = float(match_end.group(1))
-                    dur = float(match_dur.group(1)) if match_dur else (end - current_start)
-                    silences.append((current_start, end, dur))
-                    current_start = None
-                    
-        return silences
-    except Exception as e:
-        logging.error(f"Error silencedetect {file_path}: {e}")
+        threshold_db = float(threshold.lower().replace("db", ""))
+    except ValueError:
+        logging.error(f"Ngưỡng silence không hợp lệ: {threshold}")
+        return []
+    info = analyze_silence(file_path, threshold_db)
+    if info is None:
         return []
+    return info.intervals(min_silence_ms=int(duration * 1000))
+
+# Khoảng lặng đầu ngắn hơn mức này thì trim_silence_advanced giữ nguyên
+ADVANCED_TRIM_MIN_SILENCE_MS = 100
 
 def trim_silence_advanced(input_path: str) -> bool:
     """
     Cắt khoảng lặng dựa trên phân tích (logic strictly from test script):
     - Tìm First Silence (nếu ở đầu file) và cắt bỏ.
     - Giữ nguyên phần đuôi (không cắt silence cuối).
+    Khoảng lặng đầu lấy từ kho silence_analysis nếu có (không đọc PCM);
+    chưa có thì WAV PCM 16-bit chỉ quét phần đầu file rồi cắt native (sửa header),
+    định dạng khác mới phân tích đầy đủ qua ffmpeg.
     """
     try:
-        # Detect intervals - High sensitivity
-        silences = get_silence_intervals(input_path, threshold="-50dB", duration=0.1)
+        # Kho phân tích: chỉ đọc cache, không phân tích cả file chỉ để lấy khoảng lặng đầu
+        analysis = cached_silence(input_path, -50.0)
+        if analysis is not None and (analysis.is_silent or analysis.leading_ms < ADVANCED_TRIM_MIN_SILENCE_MS):
+            return False
         
-        if not silences:
-            # logging.info(f"Skipped {os.path.basename(input_path)}: No silence detected.")
+        # WAV: cắt bằng cách sửa header
+        trimmed_ms = trim_leading_silence_wav(input_path, threshold_db=-50.0,
+                                              min_silence_ms=ADVANCED_TRIM_MIN_SILENCE_MS,
+                                              leading_ms=analysis.leading_ms if analysis else None)
+        if trimmed_ms is not None:
+            if not trimmed_ms:
+                return False
+            invalidate_duration(input_path)
+            if analysis is not None:
+                # Cập nhật kho theo file mới (lần chạy sau không phải phân tích lại)
+                record_silence(input_path, analysis.after_leading_cut(trimmed_ms))
+            logging.info(f"✅ Trimmed Start: {os.path.basename(input_path)} (Removed first {trimmed_ms / 1000:.2f}s)")
+            return True
+        
+        # Định dạng khác: 1 lần decode ffmpeg (silencedetect), kết quả được lưu vào kho
+        if analysis is None:
+            analysis = analyze_silence(input_path, -50.0)
+        if analysis is None or analysis.is_silent or analysis.leading_ms < ADVANCED_TRIM_MIN_SILENCE_MS:
             return False
-            
-        # 1. Check First Silence Segment
-        start_cut = 0.0
-        if silences:
-            first = silences[0] # (start, end, duration)
-            # Nếu silence bắt đầu ở 0 (cho phép sai số < 0.2s)
-            if first[0] < 0.2:
-                start_cut = first[1]
+        
+        # 1. First Silence Segment (silence bắt đầu ở 0, cho phép sai số < 0.2s)
+        start_cut = analysis.leading_ms / 1000
         
         if start_cut == 0.0:
             return False 
@@ -976,6 +947,7 @@ def trim_silence_advanced(input_path: str) -> bool:
             if os.path.exists(input_path):
                 os.remove(input_path)
             os.rename(temp_path, input_path)
+            invalidate_duration(input_path)
             
             logging.info(f"✅ Trimmed Start: {os.path.basename(input_path)} (Removed first {start_cut:.2f}s)")
             return True
@@ -994,54 +966,19 @@ def sort_srt_captions_by_duration(srt_path: str, output_report_path: str) -> boo
     """
     logging.info(f"Analyzing SRT Duration: {os.path.basename(srt_path)}")
     try:
-        with open(srt_path, "r", encoding="utf-8") as f:
-            content = f.read()
-            
-        # Parse blocks
-        blocks = re.split(r'\n\s*\n', content.strip())
+        table = get_cue_table(srt_path)
         parsed_data = [] # List of dict: {index, start, end, duration, text}
 
-        for block in blocks:
-            lines = block.strip().split("\n")
-            if len(lines) < 2: continue
-            
-            # Find timestamp line
-            timestamp_idx = -1
-            for idx, line in enumerate(lines):
-                if "-->" in line:
-                    timestamp_idx = idx
-                    break
-            
-            if timestamp_idx != -1:
-                # Get Index
-                try:
-                    seq_index = lines[timestamp_idx-1].strip() if timestamp_idx > 0 else "0"
-                except: seq_index = "?"
-
-                # Get Timing
-                time_line = lines[timestamp_idx]
-                match = re.search(r'(\d{2}:\d{2}:\d{2},\d{3})\s*-->\s*(\d{2}:\d{2}:\d{2},\d{3})', time_line)
-                if match:
-                    t_start = match.group(1)
-                    t_end = match.group(2)
-                    
-                    # Calculate duration
-                    def t_to_ms(t_str):
-                        h, m, s, ms = map(int, re.split('[:,]', t_str))
-                        return (h*3600 + m*60 + s) * 1000 + ms
-                        
-                    dur_ms = t_to_ms(t_end) - t_to_ms(t_start)
-                    
-                    # Get Text
-                    text_content = " ".join(lines[timestamp_idx+1:])
-                    
-                    parsed_data.append({
-                        "index": seq_index,
-                        "start": t_start,
-                        "end": t_end,
-                        "duration_ms": dur_ms,
-                        "text": text_content
-                    })
+        for i in range(len(table)):
+            start_ms = table.starts[i]
+            end_ms = table.ends[i]
+            parsed_data.append({
+                "index": str(table.indices[i]),
+                "start": milliseconds_to_srt_time(start_ms),
+                "end": milliseconds_to_srt_time(end_ms),
+                "duration_ms": end_ms - start_ms,
+                "text": table.text(i).replace("\n", " ")
+            })
 
         # Sort by duration ascending
         parsed_data.sort(key=lambda x: x["duration_ms"])
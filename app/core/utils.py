@@ -14,6 +14,14 @@ from pathlib import Path
 from copy import deepcopy
 from typing import List, Dict, Any
 
+try:
+    from app.core.interval_index import points_inside
+except ImportError:
+    try:
+        from core.interval_index import points_inside
+    except ImportError:
+        from interval_index import points_inside
+
 # ==============================================================================
 # CÁC HÀM ĐỌC/GHI FILE (FILE I/O)
 # ==============================================================================
@@ -195,20 +203,25 @@ def get_csv_timing_points(csv_file: str) -> List[int]:
 
 
 def split_segment_by_timing_points(
-    segment: Dict[str, Any], timing_points_us: List[int]
+    segment: Dict[str, Any], timing_points_us: List[int], presorted: bool = False
 ) -> List[Dict[str, Any]]:
-    """Cắt segment video dựa trên các điểm thời gian."""
+    """
+    Cắt segment video dựa trên các điểm thời gian.
+    presorted=True: timing_points_us đã sort tăng dần, không trùng (tìm điểm bằng bisect).
+    """
     source_timerange = segment.get("source_timerange", {})
     source_start = int(source_timerange.get("start", 0))
     source_duration = int(source_timerange.get("duration", 0))
     source_end = source_start + source_duration
 
-    valid_points = [p for p in timing_points_us if source_start < p < source_end]
+    if not presorted:
+        timing_points_us = sorted(set(timing_points_us))
+    valid_points = points_inside(timing_points_us, source_start, source_end)
 
     if not valid_points:
         return [deepcopy(segment)]
 
-    all_points = sorted(list(set([source_start] + valid_points + [source_end])))
+    all_points = [source_start, *valid_points, source_end]
 
     new_segments = []
     cursor_us = int(segment.get("target_timerange", {}).get("start", 0))
@@ -246,9 +259,11 @@ def split_video_track_by_text_timing(video_track: dict, timing_points: List[int]
         return
 
     final_segments = []
+    # Sort 1 lần, mỗi segment chỉ cần bisect thay vì lọc lại toàn bộ điểm
+    sorted_points = sorted(set(timing_points))
 
     for segment in original_segments:
-        new_sub_segments = split_segment_by_timing_points(segment, timing_points)
+        new_sub_segments = split_segment_by_timing_points(segment, sorted_points, presorted=True)
         final_segments.extend(new_sub_segments)
 
     final_segments.sort(key=lambda s: s.get("target_timerange", {}).get("start", 0))
@@ -41,6 +41,7 @@ try:
         extract_text_from_content,
         clean_text_from_html,
     )
+    from app.core.srt_parser import parse_srt_table
 except ImportError:
     # Fallback cho trường hợp chạy trực tiếp hoặc cấu trúc khác
     from utils import (
@@ -65,6 +66,7 @@ except ImportError:
         get_cn_texts,
         extract_text_from_content,
     )
+    from srt_parser import parse_srt_table
 
 
 # --- Hàm phụ trợ cho xử lý TEXT (riêng cho version này) ---
@@ -666,22 +668,7 @@ def get_srt_timing_points(srt_file: str) -> List[int]:
     """
     timing_points = []
     try:
-        with open(srt_file, 'r', encoding='utf-8') as f:
-            content = f.read()
-        
-        # Tách các entry SRT (mỗi entry bắt đầu bằng số, kết thúc bằng dòng trống)
-        entries = content.strip().split('\n\n')
-        
-        for entry in entries:
-            lines = entry.strip().split('\n')
-            if len(lines) >= 2:
-                # Dòng thứ 2 là timing: "00:00:01,000 --> 00:00:05,000"
-                timing_line = lines[1]
-                if '-->' in timing_line:
-                    start_str = timing_line.split('-->')[0].strip()
-                    # Chuyển "00:00:01,000" thành ms
-                    start_ms = time_to_ms_srt(start_str)
-                    timing_points.append(start_ms)
+        timing_points = parse_srt_table(srt_file).starts.tolist()
     except Exception as e:
         print(f"Lỗi khi đọc file SRT: {e}")
     
@@ -0,0 +1,139 @@
+"""
+WAV IO - Đọc / ghi header RIFF/WAV không cần ffprobe
+- read_wav_info(): duyệt chunk (fmt, data, bỏ qua LIST/JUNK/...) -> WavInfo
+- write_wav_header(): header PCM 44 byte chuẩn
+Chỉ hỗ trợ PCM / WAVE_FORMAT_EXTENSIBLE-PCM, file khác trả về None để caller
+quay về ffmpeg / ffprobe.
+"""
+import os
+import struct
+from typing import BinaryIO, NamedTuple, Optional
+
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+# Header PCM chuẩn: RIFF(12) + fmt(8+16) + data(8) = 44 byte
+WAV_HEADER_SIZE = 44
+
+
+class WavInfo(NamedTuple):
+    sample_rate: int
+    channels: int
+    sample_width: int          # byte / sample / channel
+    data_offset: int           # vị trí byte đầu tiên của PCM
+    data_size: int             # số byte PCM (đã kẹp theo kích thước file thật)
+    data_header_offset: int    # vị trí header 'data' (8 byte trước data_offset)
+
+    @property
+    def block_align(self) -> int:
+        return self.channels * self.sample_width
+
+    @property
+    def frames(self) -> int:
+        return self.data_size // self.block_align if self.block_align else 0
+
+    @property
+    def duration_ms(self) -> int:
+        return self.frames * 1000 // self.sample_rate if self.sample_rate else 0
+
+    @property
+    def is_pcm16(self) -> bool:
+        return self.sample_width == 2
+
+
+def parse_wav_header(f: BinaryIO, file_size: int) -> Optional[WavInfo]:
+    """Đọc chunk RIFF từ file đang mở (đọc header, không đọc PCM)"""
+    f.seek(0)
+    riff = f.read(12)
+    if len(riff) < 12 or riff[0:4] != b'RIFF' or riff[8:12] != b'WAVE':
+        return None
+
+    fmt = None
+    pos = 12
+    while pos + 8 <= file_size:
+        f.seek(pos)
+        chunk_id, chunk_size = struct.unpack('<4sI', f.read(8))
+        body = pos + 8
+
+        if chunk_id == b'fmt ':
+            raw = f.read(min(chunk_size, 40))
+            if len(raw) < 16:
+                return None
+            format_tag, channels, sample_rate, _, _, bits = struct.unpack('<HHIIHH', raw[:16])
+            if format_tag == WAVE_FORMAT_EXTENSIBLE and len(raw) >= 26:
+                # SubFormat GUID: 2 byte đầu là format tag thật
+                format_tag = struct.unpack('<H', raw[24:26])[0]
+            fmt = (format_tag, channels, sample_rate, bits)
+
+        elif chunk_id == b'data':
+            if fmt is None:
+                return None
+            format_tag, channels, sample_rate, bits = fmt
+            if format_tag != WAVE_FORMAT_PCM or bits % 8 or not channels or not sample_rate:
+                return None
+            # ffmpeg ghi qua pipe để size = 0 / 0xFFFFFFFF -> lấy tới hết file
+            available = file_size - body
+            data_size = chunk_size if 0 < chunk_size <= available else available
+            block = channels * (bits // 8)
+            data_size -= data_size % block
+            return WavInfo(sample_rate, channels, bits // 8, body, data_size, pos)
+
+        # Chunk luôn căn theo word (2 byte)
+        pos = body + chunk_size + (chunk_size & 1)
+    return None
+
+
+def read_wav_info(path: str) -> Optional[WavInfo]:
+    """WavInfo của file WAV PCM, None nếu không phải WAV PCM hợp lệ"""
+    try:
+        with open(path, 'rb') as f:
+            return parse_wav_header(f, os.fstat(f.fileno()).st_size)
+    except (OSError, struct.error):
+        return None
+
+
+def wav_header_bytes(sample_rate: int, channels: int, frames: int, sample_width: int = 2) -> bytes:
+    """Header PCM 44 byte cho số frame cho trước"""
+    block_align = channels * sample_width
+    data_size = frames * block_align
+    return struct.pack(
+        '<4sI4s4sIHHIIHH4sI',
+        b'RIFF', 36 + data_size, b'WAVE',
+        b'fmt ', 16, WAVE_FORMAT_PCM, channels, sample_rate,
+        sample_rate * block_align, block_align, sample_width * 8,
+        b'data', data_size,
+    )
+
+
+def write_wav_header(f: BinaryIO, sample_rate: int, channels: int, frames: int, sample_width: int = 2):
+    """Ghi header 44 byte vào đầu file (dùng lại để cập nhật size sau khi ghi xong PCM)"""
+    f.seek(0)
+    f.write(wav_header_bytes(sample_rate, channels, frames, sample_width))
+
+
+# Kích thước header 1 chunk RIFF (id + size)
+CHUNK_HEADER_SIZE = 8
+
+
+def drop_leading_bytes(path: str, info: WavInfo, cut_bytes: int) -> bool:
+    """
+    Bỏ cut_bytes đầu phần PCM chỉ bằng cách sửa header (không ghi lại dữ liệu):
+    header 'data' cũ + phần bị cắt trở thành chunk JUNK, header 'data' mới đặt ngay trước điểm cắt.
+    Kích thước file và RIFF size giữ nguyên. cut_bytes phải chẵn (chunk căn theo word)
+    và >= 8 (đủ chỗ cho header JUNK); không thoả thì trả về False, không sửa gì.
+    """
+    if cut_bytes < CHUNK_HEADER_SIZE or cut_bytes % 2 or cut_bytes % info.block_align:
+        return False
+    if cut_bytes >= info.data_size:
+        return False
+
+    # JUNK phủ [header data cũ, điểm cắt - 8): thân JUNK dài đúng cut_bytes - 8
+    junk_size = cut_bytes - CHUNK_HEADER_SIZE
+    new_header_offset = info.data_offset + cut_bytes - CHUNK_HEADER_SIZE
+    with open(path, 'r+b') as f:
+        # Ghi header data mới trước: nếu dừng giữa chừng file vẫn đọc được (JUNK chưa có)
+        f.seek(new_header_offset)
+        f.write(struct.pack('<4sI', b'data', info.data_size - cut_bytes))
+        f.seek(info.data_header_offset)
+        f.write(struct.pack('<4sI', b'JUNK', junk_size))
+    return True
@@ -0,0 +1,117 @@
+"""
+WAV Trim - Cắt khoảng lặng đầu file WAV ngay trong process
+- Đọc PCM bằng NumPy theo từng khối, tính RMS theo cửa sổ (vector hoá),
+  tìm cửa sổ đầu tiên vượt ngưỡng
+- Cắt bằng cách sửa header (wav_io.drop_leading_bytes): không encode lại,
+  không tạo tiến trình, không ghi lại PCM (trừ khi phải tách hardlink backup)
+File không phải WAV PCM 16-bit: trả về None để caller dùng ffmpeg như cũ.
+"""
+import logging
+from typing import Optional
+
+import numpy as np
+
+try:
+    from app.core.wav_io import CHUNK_HEADER_SIZE, read_wav_info, drop_leading_bytes
+    from app.core.audio_backup import break_hardlink
+except ImportError:
+    from core.wav_io import CHUNK_HEADER_SIZE, read_wav_info, drop_leading_bytes
+    from core.audio_backup import break_hardlink
+
+# Cùng ngưỡng với silencedetect / silenceremove của bản ffmpeg
+DEFAULT_THRESHOLD_DB = -50.0
+
+def leading_silence_filter(threshold_db: float = DEFAULT_THRESHOLD_DB) -> str:
+    """Filter ffmpeg tương đương (file không phải WAV PCM, hoặc cắt ngay khi decode)"""
+    return f"silenceremove=start_periods=1:start_threshold={threshold_db:g}dB"
+
+
+# Độ dài cửa sổ RMS
+RMS_WINDOW_MS = 10
+
+# Số cửa sổ đọc mỗi lần (khoảng lặng đầu thường ngắn -> không đọc cả file)
+SCAN_BLOCK_WINDOWS = 200
+
+
+def trims_in_place(path: str) -> bool:
+    """File sẽ được cắt native (sửa header tại chỗ, cùng inode) thay vì ghi file mới qua ffmpeg"""
+    info = read_wav_info(path) if path.lower().endswith('.wav') else None
+    return info is not None and info.is_pcm16
+
+
+def find_leading_silence_frames(path: str, info=None, threshold_db: float = DEFAULT_THRESHOLD_DB,
+                                window_ms: int = RMS_WINDOW_MS) -> Optional[int]:
+    """
+    Số frame im lặng ở đầu file (tới cửa sổ RMS đầu tiên vượt threshold_db dBFS).
+    Cả file im lặng -> số frame của file. None nếu không phải WAV PCM 16-bit.
+    """
+    info = info or read_wav_info(path)
+    if info is None or not info.is_pcm16:
+        return None
+
+    window = max(1, info.sample_rate * window_ms // 1000)
+    # So sánh tổng bình phương với ngưỡng (tránh căn bậc hai / log cho từng cửa sổ)
+    limit = (32768.0 * 10 ** (threshold_db / 20.0)) ** 2 * window * info.channels
+    block_frames = window * SCAN_BLOCK_WINDOWS
+
+    with open(path, 'rb') as f:
+        pos = 0
+        while pos < info.frames:
+            f.seek(info.data_offset + pos * info.block_align)
+            count = min(block_frames, info.frames - pos)
+            pcm = np.fromfile(f, dtype='<i2', count=count * info.channels)
+            n = len(pcm) // (window * info.channels)
+            if n == 0:
+                break
+            energy = np.square(pcm[:n * window * info.channels].astype(np.float64))
+            energy = energy.reshape(n, -1).sum(axis=1)
+            loud = np.flatnonzero(energy > limit)
+            if len(loud):
+                return pos + int(loud[0]) * window
+            pos += n * window
+    return info.frames
+
+
+def leading_ms_to_frames(leading_ms: int, sample_rate: int, window_ms: int = RMS_WINDOW_MS) -> int:
+    """
+    Đổi khoảng lặng đầu (ms, đã làm tròn xuống từ số frame) về lại số frame:
+    khoảng lặng đầu luôn là bội số cửa sổ RMS -> làm tròn về bội số cửa sổ gần nhất là chính xác.
+    """
+    window = max(1, sample_rate * window_ms // 1000)
+    return int(round(leading_ms * sample_rate / 1000 / window)) * window
+
+
+def trim_leading_silence_wav(path: str, threshold_db: float = DEFAULT_THRESHOLD_DB,
+                             min_silence_ms: int = 0, leading_ms: Optional[int] = None) -> Optional[int]:
+    """
+    Cắt khoảng lặng đầu file WAV tại chỗ (chỉ sửa header).
+    min_silence_ms: khoảng lặng ngắn hơn thì giữ nguyên.
+    leading_ms: khoảng lặng đầu đã biết (kho silence_analysis, cùng threshold_db) -> không quét lại PCM.
+    Trả về số ms đã cắt (0 = không cắt), None nếu file không hỗ trợ (caller dùng ffmpeg).
+    """
+    info = read_wav_info(path)
+    if info is None or not info.is_pcm16:
+        return None
+
+    if leading_ms is not None:
+        frames = min(info.frames, leading_ms_to_frames(leading_ms, info.sample_rate))
+    else:
+        frames = find_leading_silence_frames(path, info, threshold_db)
+    if frames is None:
+        return None
+    # Không cắt hết file (file im lặng hoàn toàn giữ nguyên như silencedetect)
+    if frames >= info.frames or frames * 1000 < min_silence_ms * info.sample_rate:
+        return 0
+
+    cut_bytes = frames * info.block_align
+    cut_bytes -= cut_bytes % 2                    # Chunk căn theo word
+    cut_bytes -= cut_bytes % info.block_align
+    if cut_bytes >= CHUNK_HEADER_SIZE:
+        # Sửa tại chỗ: không được đụng vào bản backup hardlink cùng inode
+        break_hardlink(path)
+    if not drop_leading_bytes(path, info, cut_bytes):
+        # Dưới 8 byte (vài sample): không đáng cắt
+        return 0
+    trimmed_ms = cut_bytes // info.block_align * 1000 // info.sample_rate
+    logging.debug(f"Native trim {path}: {trimmed_ms}ms")
+    return trimmed_ms
@@ -4,6 +4,7 @@ import sys
 import os
 import json
 import logging
+import multiprocessing
 
 # Thêm thư mục gốc vào đường dẫn hệ thống để Python tìm thấy các module trong app
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -212,4 +213,6 @@ def main():
     root.mainloop()
 
 if __name__ == "__main__":
+    # Cần cho process pool (batch convert) khi đóng gói bằng PyInstaller
+    multiprocessing.freeze_support()
     main()
@@ -433,7 +433,11 @@ class TTSTab:
         output_wav = srt_path.replace(".srt", "_merged.wav")
         logging.info(f"Merging {len(file_list)} files into {output_wav}...")
         
-        success = tts_core.merge_audio_files_ffmpeg(file_list, output_wav, stop_event=self.stop_event)
+        def on_progress(progress):
+            self.parent.after(0, lambda: self.lbl_status.config(text=str(progress), foreground="blue"))
+
+        success = tts_core.merge_audio_files_ffmpeg(file_list, output_wav, stop_event=self.stop_event,
+                                                    progress_callback=on_progress)
         
         if success:
              logging.info(f"Merge success: {output_wav}")
@@ -566,7 +570,7 @@ class TTSTab:
         """Task cắt silence riêng biệt"""
         try:
             logging.info(f"Start trimming silence in: {audio_dir}")
-            count = tts_core.batch_trim_audio_directory(audio_dir, backup=True)
+            count = tts_core.batch_trim_audio_directory(audio_dir, backup=True, stop_event=self.stop_event)
             logging.info(f"Hoàn tất cắt khoảng lặng cho {count} file.")
             if count > 0:
                  messagebox.showinfo("Thông báo", f"Đã cắt khoảng lặng thành công {count} file.\nFile gốc được lưu trong thư mục _backup.")
@@ -0,0 +1,110 @@
+import logging
+import wave
+
+import numpy as np
+import pytest
+
+from app.core import audio_mixer
+from app.core.audio_mixer import (PcmFormat, PcmWriter, mix_segments, mix_segments_streaming,
+                                  mix_segments_to_wav_memmap, mix_timeline_to_file, open_segments,
+                                  saturate_to_int16)
+
+RATE = 24000
+FMT = PcmFormat(RATE, 1)
+
+
+def _write_wav(path, pcm):
+    with wave.open(str(path), "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(RATE)
+        w.writeframes(np.ascontiguousarray(pcm, dtype="<i2").tobytes())
+
+
+def _timeline(tmp_path, starts_ms, length_ms=400, amplitude=12000):
+    rng = np.random.default_rng(len(starts_ms))
+    timeline = []
+    for i, start in enumerate(starts_ms):
+        path = tmp_path / f"seg{i:03d}.wav"
+        pcm = rng.integers(-amplitude, amplitude, RATE * length_ms // 1000).astype(np.int16)
+        _write_wav(path, pcm)
+        timeline.append((str(path), start))
+    return timeline
+
+
+def _mix_bytes(tmp_path, timeline, name, **kwargs):
+    out = tmp_path / f"{name}.wav"
+    assert mix_timeline_to_file(timeline, str(out), **kwargs)
+    return out.read_bytes()
+
+
+def _reference(timeline):
+    """Mix tham chiếu: cộng int32 toàn bộ rồi kẹp int16"""
+    segments = open_segments(timeline, FMT)
+    total = max(s.end_frame for s in segments)
+    acc = np.zeros((total, 1), dtype=np.int32)
+    for s in segments:
+        acc[s.start_frame:s.end_frame] += s.read()
+    return saturate_to_int16(acc)
+
+
+@pytest.fixture
+def gapped(tmp_path):
+    # Không chồng nhau, có khoảng lặng giữa các đoạn
+    return _timeline(tmp_path, [0, 500, 1200, 1700, 3000])
+
+
+@pytest.fixture
+def overlapping(tmp_path):
+    # Chồng nhau và đủ lớn để bị kẹp biên
+    return _timeline(tmp_path, [0, 150, 300, 900, 1000, 2500], amplitude=30000)
+
+
+def test_concat_ram_memmap_identical(tmp_path, gapped):
+    concat = _mix_bytes(tmp_path, gapped, "concat", allow_concat=True, low_memory=False)
+    ram = _mix_bytes(tmp_path, gapped, "ram", allow_concat=False, low_memory=False)
+    memmap = _mix_bytes(tmp_path, gapped, "memmap", allow_concat=False, low_memory=True)
+    assert concat == ram == memmap
+
+    with wave.open(str(tmp_path / "ram.wav"), "rb") as w:
+        pcm = np.frombuffer(w.readframes(w.getnframes()), dtype="<i2").reshape(-1, 1)
+    assert np.array_equal(pcm, _reference(gapped))
+
+
+def test_overlap_ram_memmap_identical(tmp_path, overlapping):
+    ram = _mix_bytes(tmp_path, overlapping, "ram", low_memory=False)
+    memmap = _mix_bytes(tmp_path, overlapping, "memmap", low_memory=True)
+    assert ram == memmap
+
+    with wave.open(str(tmp_path / "memmap.wav"), "rb") as w:
+        pcm = np.frombuffer(w.readframes(w.getnframes()), dtype="<i2").reshape(-1, 1)
+    reference = _reference(overlapping)
+    assert np.array_equal(pcm, reference)
+    assert reference.max() == 32767 and reference.min() == -32768
+
+
+def test_auto_low_memory_matches_ram(tmp_path, overlapping, monkeypatch, caplog):
+    ram = _mix_bytes(tmp_path, overlapping, "ram", low_memory=False)
+    monkeypatch.setattr(audio_mixer, "MEMMAP_THRESHOLD_BYTES", 0)
+    with caplog.at_level(logging.INFO):
+        auto = _mix_bytes(tmp_path, overlapping, "auto", low_memory=None)
+    assert "memmap" in caplog.text
+    assert auto == ram
+
+
+@pytest.mark.parametrize("window_frames", [997, 4800, 1 << 20])
+def test_windowed_paths_match_ram(tmp_path, overlapping, window_frames):
+    segments = open_segments(overlapping, FMT)
+    expected = saturate_to_int16(mix_segments(segments, 1))
+
+    wav_path = tmp_path / "memmap.wav"
+    assert mix_segments_to_wav_memmap(segments, str(wav_path), FMT, window_frames=window_frames)
+    with wave.open(str(wav_path), "rb") as w:
+        memmap_pcm = np.frombuffer(w.readframes(w.getnframes()), dtype="<i2").reshape(-1, 1)
+    assert np.array_equal(memmap_pcm, expected)
+
+    stream_path = tmp_path / "stream.wav"
+    writer = PcmWriter(str(stream_path), FMT)
+    assert mix_segments_streaming(segments, writer, window_frames=window_frames)
+    writer.close()
+    assert stream_path.read_bytes() == wav_path.read_bytes()
@@ -0,0 +1,81 @@
+import os
+
+from app.core import cue_sidecar
+from app.core.cue_sidecar import load_cue_table, read_sidecar, sidecar_path, write_sidecar
+from app.core.srt_parser import parse_srt_table
+
+SRT = (
+    "1\n00:00:01,000 --> 00:00:02,500\nXin chào\n\n"
+    "2\n00:00:03,000 --> 00:00:04,000\nDòng 1\nDòng 2\n\n"
+    "7\n01:02:03,004 --> 01:02:05,000\n\U0001F600 emoji\n"
+)
+
+
+def _rows(table):
+    return [(c.index, c.start_ms, c.end_ms, c.text) for c in table]
+
+
+def _srt(tmp_path, content=SRT):
+    path = tmp_path / "sub.srt"
+    path.write_text(content, encoding="utf-8")
+    return str(path)
+
+
+def test_round_trip(tmp_path):
+    path = _srt(tmp_path)
+    parsed = parse_srt_table(path)
+    assert write_sidecar(path, parsed)
+
+    table = read_sidecar(path)
+    assert table is not None
+    assert _rows(table) == _rows(parsed)
+    assert list(table.text_offsets) == list(parsed.text_offsets)
+    # Không còn file tạm cạnh sidecar
+    assert sorted(os.listdir(tmp_path)) == ["sub.srt", "sub.srt.cues"]
+
+
+def test_load_uses_sidecar_second_time(tmp_path, monkeypatch):
+    path = _srt(tmp_path)
+    first = load_cue_table(path)
+    assert os.path.exists(sidecar_path(path))
+
+    def fail(_):
+        raise AssertionError("không được parse lại text khi sidecar còn hợp lệ")
+    monkeypatch.setattr(cue_sidecar, "parse_srt_table", fail)
+    assert _rows(load_cue_table(path)) == _rows(first)
+
+
+def test_stale_sidecar_ignored_when_size_changes(tmp_path):
+    path = _srt(tmp_path)
+    load_cue_table(path)
+    st = os.stat(path)
+
+    changed = SRT.replace("Xin chào", "Tạm biệt nhé")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(changed)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns))
+    assert read_sidecar(path) is None
+    assert _rows(load_cue_table(path))[0][3] == "Tạm biệt nhé"
+
+
+def test_stale_sidecar_ignored_when_mtime_changes(tmp_path):
+    path = _srt(tmp_path)
+    load_cue_table(path)
+    st = os.stat(path)
+
+    # Cùng kích thước, khác nội dung và mtime
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(SRT.replace("Xin chào", "Xin chàO"))
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+    assert os.path.getsize(path) == st.st_size
+    assert read_sidecar(path) is None
+    assert _rows(load_cue_table(path))[0][3] == "Xin chàO"
+
+
+def test_corrupt_sidecar_ignored(tmp_path):
+    path = _srt(tmp_path)
+    load_cue_table(path)
+    with open(sidecar_path(path), "r+b") as f:
+        f.truncate(os.path.getsize(sidecar_path(path)) - 3)
+    assert read_sidecar(path) is None
+    assert len(load_cue_table(path)) == 3
@@ -0,0 +1,73 @@
+import numpy as np
+
+from app.core import merge_engines
+from app.core.merge_engines import COST_FEATURES, fit_costs
+
+KNOWN = {
+    "ffmpeg": {"startup": 120.0, "segments": 12.0, "audio_seconds": 0.4, "decode_segments": 3.0,
+               "overlap_segments": 1.5, "encode_seconds": 2.2},
+    "mix": {"startup": 8.0, "segments": 0.7, "audio_seconds": 0.25, "decode_segments": 35.0,
+            "overlap_segments": 2.5, "encode_seconds": 2.8},
+}
+
+
+def _features(segments, decode, overlap, seconds, weight):
+    return {"startup": 1.0, "segments": float(segments), "audio_seconds": float(seconds),
+            "decode_segments": float(decode), "overlap_segments": float(overlap),
+            "encode_seconds": seconds * weight}
+
+
+def _samples(costs, noise=None):
+    rng = np.random.default_rng(0)
+    samples = []
+    for engine, coef in costs.items():
+        for segments in (40, 160, 640):
+            for overlap_ratio in (0.0, 0.3):
+                for decode_ratio in (0.0, 1.0):
+                    for weight, per_segment in ((0.0, 1.5), (0.0, 4.0), (1.0, 1.5), (1.0, 4.0)):
+                        seconds = segments * per_segment
+                        f = _features(segments, int(segments * decode_ratio),
+                                      int(segments * overlap_ratio), seconds, weight)
+                        ms = sum(coef[k] * f[k] for k in COST_FEATURES)
+                        if noise:
+                            ms += rng.normal(0, noise)
+                        samples.append({"engine": engine, "features": f, "seconds": ms / 1000.0})
+    return samples
+
+
+def test_fit_recovers_known_costs():
+    fitted = fit_costs(_samples(KNOWN))
+    for engine, coef in KNOWN.items():
+        for k in COST_FEATURES:
+            assert abs(fitted[engine][k] - coef[k]) < 1e-3, (engine, k)
+
+
+def test_fit_is_nonnegative_and_refits_remaining_columns():
+    # decode_segments thật = 0: có nhiễu thì lstsq không ràng buộc cho hệ số âm
+    truth = {"mix": dict(KNOWN["mix"], decode_segments=0.0)}
+    samples = _samples(truth, noise=200.0)
+    fitted = fit_costs(samples)["mix"]
+    assert all(fitted[k] >= 0 for k in COST_FEATURES)
+
+    rows = [s for s in samples if s["features"]["encode_seconds"] == 0.0]
+    base = [k for k in COST_FEATURES if k != "encode_seconds"]
+    X = np.array([[r["features"][k] for k in base] for r in rows])
+    y = np.array([r["seconds"] * 1000.0 for r in rows])
+    unconstrained, *_ = np.linalg.lstsq(X, y, rcond=None)
+    negative = [k for k, c in zip(base, unconstrained) if c < 0]
+    assert negative, "mẫu test phải tạo ra ít nhất 1 hệ số âm"
+
+    # Cột bị loại = 0, các cột còn lại đúng bằng nghiệm của mô hình đã bỏ cột đó
+    kept = [i for i, k in enumerate(base) if fitted[k] > 0]
+    expected, *_ = np.linalg.lstsq(X[:, kept], y, rcond=None)
+    for i, c in zip(kept, expected):
+        assert abs(fitted[base[i]] - round(float(c), 4)) < 1e-3
+    for k in negative:
+        assert fitted[k] == 0.0
+
+
+def test_constant_features_keep_prior():
+    samples = [s for s in _samples(KNOWN) if s["features"]["overlap_segments"] == 0.0]
+    fitted = fit_costs(samples)
+    for engine in KNOWN:
+        assert fitted[engine]["overlap_segments"] == merge_engines.DEFAULT_COSTS[engine]["overlap_segments"]
@@ -0,0 +1,54 @@
+import os
+
+import pytest
+
+from app.core import srt_batch
+
+SRT = "1\n00:00:01,000 --> 00:00:02,000\n{text}\n"
+
+
+def _write(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(SRT.format(text=text))
+
+
+def test_output_dir_mirrors_input_tree(tmp_path):
+    a, b = str(tmp_path / "a" / "ep.srt"), str(tmp_path / "b" / "ep.srt")
+    _write(a, "A")
+    _write(b, "B")
+    out = str(tmp_path / "out")
+
+    jobs = srt_batch.build_jobs("scale", [[a], [b]], out, {"factor": 1.2})
+    assert [j.output_path for j in jobs] == [os.path.join(out, "a", "ep_x1.2.srt"),
+                                             os.path.join(out, "b", "ep_x1.2.srt")]
+
+    report = srt_batch.run_batch(jobs, workers=1)
+    assert report["succeeded"] == 2
+    with open(jobs[0].output_path, encoding="utf-8") as f:
+        assert "A" in f.read()
+    with open(jobs[1].output_path, encoding="utf-8") as f:
+        assert "B" in f.read()
+
+
+def test_same_directory_inputs_keep_flat_output(tmp_path):
+    a, b = str(tmp_path / "in" / "x.srt"), str(tmp_path / "in" / "y.srt")
+    out = str(tmp_path / "out")
+    jobs = srt_batch.build_jobs("extract", [[a], [b]], out)
+    assert [j.output_path for j in jobs] == [os.path.join(out, "x.txt"), os.path.join(out, "y.txt")]
+
+
+def test_duplicate_outputs_rejected(tmp_path):
+    a, b = str(tmp_path / "ep.srt"), str(tmp_path / "ep.SRT")
+    with pytest.raises(ValueError):
+        srt_batch.build_jobs("scale", [[a], [b]], str(tmp_path / "out"), {"factor": 1.2})
+
+
+def test_progress_counts_each_job_once(tmp_path):
+    paths = [str(tmp_path / f"{i}.srt") for i in range(3)]
+    for p in paths:
+        _write(p, "x")
+    jobs = srt_batch.build_jobs("extract", [[p] for p in paths])
+    seen = []
+    srt_batch.run_batch(jobs, workers=1, progress_callback=lambda done, total, r: seen.append((done, total)))
+    assert seen == [(1, 3), (2, 3), (3, 3)]
@@ -0,0 +1,70 @@
+from app.core.srt_parser import iter_srt_lines, parse_srt_table
+
+
+def _parse_text(tmp_path, content: str, newline="\n", encoding="utf-8"):
+    path = tmp_path / "sub.srt"
+    path.write_bytes(content.replace("\n", newline).encode(encoding))
+    return [(c.index, c.start_ms, c.end_ms, c.text) for c in parse_srt_table(str(path))]
+
+
+BASIC = (
+    "1\n00:00:01,000 --> 00:00:02,500\nXin chào\n\n"
+    "2\n00:00:03,000 --> 00:00:04,000\nDòng 1\nDòng 2\n"
+)
+EXPECTED = [(1, 1000, 2500, "Xin chào"), (2, 3000, 4000, "Dòng 1\nDòng 2")]
+
+
+def test_basic(tmp_path):
+    assert _parse_text(tmp_path, BASIC) == EXPECTED
+
+
+def test_bom(tmp_path):
+    assert _parse_text(tmp_path, BASIC, encoding="utf-8-sig") == EXPECTED
+    # Dòng đã decode mà còn BOM (đọc bằng utf-8)
+    cues = list(iter_srt_lines(("\ufeff" + BASIC).splitlines(True)))
+    assert [(c.index, c.start_ms, c.end_ms, c.text) for c in cues] == EXPECTED
+
+
+def test_crlf(tmp_path):
+    assert _parse_text(tmp_path, BASIC, newline="\r\n") == EXPECTED
+
+
+def test_missing_blank_line_between_cues(tmp_path):
+    content = (
+        "1\n00:00:01,000 --> 00:00:02,000\nA\n"
+        "2\n00:00:03,000 --> 00:00:04,000\nB\n"
+    )
+    assert _parse_text(tmp_path, content) == [(1, 1000, 2000, "A"), (2, 3000, 4000, "B")]
+
+
+def test_malformed_timing_skips_only_that_block(tmp_path):
+    content = (
+        "1\n00:00:01,000 --> 00:00:02,000\nA\n\n"
+        "2\n00:00:xx,000 --> 00:00:04,000\nhỏng\n\n"
+        "3\n00:00:05,000 --> 00:00:06,000 X1:10 X2:20\nC\n"
+    )
+    assert _parse_text(tmp_path, content) == [(1, 1000, 2000, "A"), (3, 5000, 6000, "C")]
+
+
+def test_digit_only_text_line(tmp_path):
+    content = (
+        "1\n00:00:01,000 --> 00:00:02,000\n100\n\n"
+        "2\n00:00:03,000 --> 00:00:04,000\n2024\n"
+    )
+    assert _parse_text(tmp_path, content) == [(1, 1000, 2000, "100"), (2, 3000, 4000, "2024")]
+
+
+def test_digit_only_text_line_without_blank_line(tmp_path):
+    # Text "100" không phải index kế tiếp (2) -> giữ làm text, block sau đánh số tự động
+    content = (
+        "1\n00:00:01,000 --> 00:00:02,000\n100\n"
+        "00:00:03,000 --> 00:00:04,000\nB\n"
+    )
+    assert _parse_text(tmp_path, content) == [(1, 1000, 2000, "100"), (2, 3000, 4000, "B")]
+
+    # Text số + index block sau, đều thiếu dòng trống
+    content = (
+        "1\n00:00:01,000 --> 00:00:02,000\n100\n2\n"
+        "00:00:03,000 --> 00:00:04,000\nB\n"
+    )
+    assert _parse_text(tmp_path, content) == [(1, 1000, 2000, "100"), (2, 3000, 4000, "B")]
@@ -0,0 +1,37 @@
+from app.core.subtitle_index import SubtitleIndex
+
+ASS = (
+    "\ufeffDialogue: 0,0:00:01.00,0:00:09.50,Default,,0,0,0,,a\n"
+    "\n"
+    "   Dialogue: 0,0:00:02.00,0:00:03.00,Default,,0,0,0,,b\n"
+    "\tDialogue: 0,0:00:04.00,0:00:05.00,Default,,0,0,0,,c\n"
+)
+
+
+def _ass(tmp_path, content=ASS):
+    path = tmp_path / "sub.ass"
+    path.write_bytes(content.encode("utf-8"))
+    return SubtitleIndex(str(path))
+
+
+def test_indented_and_bom_dialogue_lines(tmp_path):
+    index = _ass(tmp_path)
+    assert [c.text for c in index.iter_cues()] == ["a", "b", "c"]
+    assert len(index) == 3
+    assert index.cue_at(4500).text == "c"
+    assert index.cue_at(2500).text == "b"
+
+
+def test_last_end_vs_max_end(tmp_path):
+    index = _ass(tmp_path)
+    # Quét ngược: cue cuối trong file; max_end: mọi cue (file không theo thứ tự)
+    assert index.last_end_ms() == 5000
+    assert index.max_end_ms() == 9500
+    len(index)
+    assert index.max_end_ms() == 9500
+
+
+def test_empty_file(tmp_path):
+    index = _ass(tmp_path, "")
+    assert index.last_end_ms() is None
+    assert index.max_end_ms() is None
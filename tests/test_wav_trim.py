@@ -0,0 +1,113 @@
+import os
+import wave
+
+import numpy as np
+
+from app.core.wav_io import read_wav_info
+from app.core.wav_trim import find_leading_silence_frames, trim_leading_silence_wav
+
+RATE = 24000
+
+
+def _write_wav(path, pcm: np.ndarray, channels: int = 1):
+    with wave.open(str(path), "wb") as w:
+        w.setnchannels(channels)
+        w.setsampwidth(2)
+        w.setframerate(RATE)
+        w.writeframes(np.ascontiguousarray(pcm, dtype="<i2").tobytes())
+
+
+def _read_wave(path):
+    with wave.open(str(path), "rb") as w:
+        frames = w.getnframes()
+        pcm = np.frombuffer(w.readframes(frames), dtype="<i2")
+        return frames, w.getnchannels(), pcm
+
+
+def _tone(frames: int, channels: int = 1) -> np.ndarray:
+    t = np.arange(frames) / RATE
+    mono = (8000 * np.sin(2 * np.pi * 440 * t)).astype(np.int16)
+    return np.repeat(mono, channels)
+
+
+def test_trim_leading_zeros(tmp_path):
+    path = tmp_path / "a.wav"
+    silence, sound = RATE * 300 // 1000, RATE // 2
+    tone = _tone(sound)
+    _write_wav(path, np.concatenate([np.zeros(silence, np.int16), tone]))
+    size = os.path.getsize(path)
+
+    assert trim_leading_silence_wav(str(path)) == 300
+
+    info = read_wav_info(str(path))
+    assert info.frames == sound
+    assert info.duration_ms == 500
+    frames, channels, pcm = _read_wave(path)
+    assert (frames, channels) == (sound, 1)
+    assert np.array_equal(pcm, tone)
+    # Chỉ sửa header: kích thước file giữ nguyên
+    assert os.path.getsize(path) == size
+
+
+def test_trim_stereo(tmp_path):
+    path = tmp_path / "s.wav"
+    silence, sound = RATE // 10, RATE // 4
+    tone = _tone(sound, channels=2)
+    _write_wav(path, np.concatenate([np.zeros(silence * 2, np.int16), tone]), channels=2)
+
+    assert trim_leading_silence_wav(str(path)) == 100
+    frames, channels, pcm = _read_wave(path)
+    assert (frames, channels) == (sound, 2)
+    assert np.array_equal(pcm, tone)
+
+
+def test_second_trim_is_noop(tmp_path):
+    path = tmp_path / "a.wav"
+    _write_wav(path, np.concatenate([np.zeros(RATE // 5, np.int16), _tone(RATE // 5)]))
+    assert trim_leading_silence_wav(str(path)) == 200
+    before = path.read_bytes()
+
+    assert trim_leading_silence_wav(str(path)) == 0
+    assert path.read_bytes() == before
+
+
+def test_fully_silent_file_unchanged(tmp_path):
+    path = tmp_path / "silent.wav"
+    _write_wav(path, np.zeros(RATE, np.int16))
+    before = path.read_bytes()
+
+    assert trim_leading_silence_wav(str(path)) == 0
+    assert path.read_bytes() == before
+    assert read_wav_info(str(path)).frames == RATE
+
+
+def test_min_silence_keeps_short_gap(tmp_path):
+    path = tmp_path / "a.wav"
+    _write_wav(path, np.concatenate([np.zeros(RATE // 20, np.int16), _tone(RATE // 5)]))
+    before = path.read_bytes()
+
+    assert trim_leading_silence_wav(str(path), min_silence_ms=100) == 0
+    assert path.read_bytes() == before
+
+
+def test_known_leading_ms_matches_scan(tmp_path):
+    scanned, cached = tmp_path / "a.wav", tmp_path / "b.wav"
+    pcm = np.concatenate([np.zeros(RATE * 370 // 1000, np.int16), _tone(RATE // 5)])
+    _write_wav(scanned, pcm)
+    _write_wav(cached, pcm)
+    frames = find_leading_silence_frames(str(scanned))
+
+    trimmed = trim_leading_silence_wav(str(scanned))
+    assert trim_leading_silence_wav(str(cached), leading_ms=frames * 1000 // RATE) == trimmed
+    assert scanned.read_bytes() == cached.read_bytes()
+
+
+def test_hardlinked_backup_untouched(tmp_path):
+    path, backup = tmp_path / "a.wav", tmp_path / "backup.wav"
+    _write_wav(path, np.concatenate([np.zeros(RATE // 5, np.int16), _tone(RATE // 5)]))
+    os.link(path, backup)
+    original = backup.read_bytes()
+
+    assert trim_leading_silence_wav(str(path)) == 200
+    assert backup.read_bytes() == original
+    assert os.stat(path).st_nlink == 1